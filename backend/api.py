@@ -1,7 +1,15 @@
+import asyncio
 import os
 from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from backend.auth import setup_auth_routes
+from backend.database.db_utils import validate_sql_registry
+from backend.database.base import get_pooled_connection
+from backend.database.crud import jobs as crud_jobs
+from backend.database.preference_buffer import preference_buffer
+from backend.database.live_session_store import live_session_store
+from backend.utils.jobs import job_runner
+from backend.utils.live_events import live_session_hub
 from starlette.middleware.sessions import SessionMiddleware
 
 # Load environment variables
@@ -28,12 +36,62 @@ api.add_middleware(
 # Authentication
 setup_auth_routes(api)
 
+@api.on_event("startup")
+def check_sql_registry():
+    # Surface query-key typos at boot instead of on the first request that hits them
+    validate_sql_registry()
+
+@api.on_event("startup")
+def fail_interrupted_jobs():
+    # Jobs queued or running in a process that is gone died with it; don't leave pollers waiting forever.
+    # Other workers' jobs are left alone (see crud_jobs.fail_unfinished_jobs).
+    connection = None
+    try:
+        connection = get_pooled_connection()
+        cursor = connection.cursor(dictionary=True)
+        interrupted = crud_jobs.fail_unfinished_jobs(connection, cursor)
+        connection.commit()
+        cursor.close()
+        if interrupted:
+            print(f"Marked {interrupted} interrupted background job(s) as failed")
+    except Exception as e:
+        print(f"❌ Could not clean up interrupted background jobs: {e}")
+    finally:
+        if connection: connection.close()
+
+@api.on_event("startup")
+def start_preference_buffer():
+    # Replays edits acknowledged before a crash, then flushes on an interval
+    preference_buffer.start()
+
+@api.on_event("startup")
+def start_live_session_store():
+    # Replays live session events journalled before a crash, then checkpoints on an interval
+    live_session_store.start()
+
+@api.on_event("startup")
+async def attach_live_session_hub():
+    # Events published from DB executor threads are handed to SSE subscribers on this loop
+    live_session_hub.attach(asyncio.get_running_loop())
+
+@api.on_event("shutdown")
+def stop_job_workers():
+    job_runner.shutdown()
+
+@api.on_event("shutdown")
+def stop_preference_buffer():
+    preference_buffer.stop()
+
+@api.on_event("shutdown")
+def stop_live_session_store():
+    live_session_store.stop()
+
 @api.get("/testos")
 def test_os_route(): # Renamed to avoid conflict if test_os is imported elsewhere
     return {"message": "OS test route is alive"}
 
 # API Routes (import from routes folder)
-from backend.routes import users, classes, custom_requests, facilities, finance, training_blueprints, training_execution, scheduling, notifications 
+from backend.routes import users, classes, custom_requests, facilities, finance, training_blueprints, training_execution, scheduling, notifications, internal, jobs
 # Add other route modules here as they are refactored/created
 # e.g., from backend.routes import facilities, memberships, analytics_routes, etc.
 
@@ -48,6 +106,8 @@ api.include_router(training_execution.router)
 api.include_router(training_execution.training_router)  # Additional router for /training paths
 api.include_router(scheduling.router)
 api.include_router(notifications.router)
+api.include_router(internal.router)
+api.include_router(jobs.router)
 
 # Run API
 if __name__ == "__main__":
@@ -1,11 +1,15 @@
 from datetime import date, datetime
+import hashlib
+import time
 from fastapi import FastAPI, Depends, HTTPException, status, Request
 from fastapi.responses import RedirectResponse
-import requests
-from backend.database.base import get_db_connection
+from starlette.concurrency import run_in_threadpool
+from backend.database.base import get_db_connection, get_pooled_connection, run_in_db_executor
 from backend.database.crud import user as crud_user
 from backend.utils.oauth import get_oauth
-from frontend.config import API_HOST, UI_PORT, AUTH0_CLIENT_ID, AUTH0_DOMAIN, AUTH0_AUDIENCE
+from backend.utils.jwks import JWKSKeyStore, file_jwks_source, http_jwks_source
+from backend.utils.cache import TTLCache
+from frontend.config import API_HOST, UI_PORT, AUTH0_CLIENT_ID, AUTH0_DOMAIN, AUTH0_AUDIENCE, AUTH0_JWKS_FILE, AUTH0_JWKS_TTL_SECONDS
 from jose import jwt, JWTError, ExpiredSignatureError
 from mysql.connector import Error as DBError
 import os
@@ -13,18 +17,43 @@ import os
 
 oauth = get_oauth()
 
+# Signing keys are cached in-process; set AUTH0_JWKS_FILE to verify against a local JWKS file instead of Auth0
+jwks_store = JWKSKeyStore(
+    file_jwks_source(AUTH0_JWKS_FILE) if AUTH0_JWKS_FILE else http_jwks_source(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json'),
+    ttl_seconds=AUTH0_JWKS_TTL_SECONDS,
+)
+
+# Claims of already verified tokens, keyed by token hash and kept until the token's exp
+verified_token_cache = TTLCache("verified_tokens", maxsize=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "2048")))
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def get_cached_jwt_payload(token: str):
+    """Claims of a token verified earlier, or None; never blocks"""
+    cached_payload = verified_token_cache.get(_token_hash(token))
+    return dict(cached_payload) if cached_payload is not None else None
+
 def verify_jwt(token: str):
+    # Blocking on a cache miss (signature check, maybe a JWKS fetch): call it off the event loop
+    token_hash = _token_hash(token)
+    cached_payload = verified_token_cache.get(token_hash)
+    if cached_payload is not None:
+        return dict(cached_payload)
+
     try:
-        jwks_url = f'https://{AUTH0_DOMAIN}/.well-known/jwks.json'
-        jwks = requests.get(jwks_url).json()
         unverified_header = jwt.get_unverified_header(token)
-        rsa_key = next((key for key in jwks["keys"] if key["kid"] == unverified_header["kid"]), None)
-        if rsa_key:
-            payload = jwt.decode(
-                token, rsa_key, algorithms=['RS256'],
-                audience=AUTH0_AUDIENCE, issuer=f'https://{AUTH0_DOMAIN}/'
-            )
-            return payload
+        rsa_key = jwks_store.get_key(unverified_header.get("kid"))
+        if not rsa_key:
+            raise JWTError("Unable to find a signing key matching the token kid")
+        payload = jwt.decode(
+            token, rsa_key, algorithms=['RS256'],
+            audience=AUTH0_AUDIENCE, issuer=f'https://{AUTH0_DOMAIN}/'
+        )
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)) and exp > time.time():
+            verified_token_cache.set(token_hash, dict(payload), expires_at=exp)
+        return payload
     except ExpiredSignatureError:
         print("❌ Token expired")
         raise
@@ -32,46 +61,71 @@ def verify_jwt(token: str):
         print(f"❌ Token verification failed: {e}")
         raise
 
-async def get_current_user_data(request: Request, db_conn = Depends(get_db_connection)):
+# Resolved session data per auth_id; short TTL, invalidated by the user update/delete routes
+current_user_cache = TTLCache(
+    "current_users",
+    maxsize=int(os.getenv("CURRENT_USER_CACHE_SIZE", "2048")),
+    ttl_seconds=float(os.getenv("CURRENT_USER_CACHE_TTL_SECONDS", "30")),
+)
+
+def invalidate_current_user_cache(auth_id: str):
+    current_user_cache.invalidate(auth_id)
+
+def _load_current_user_data(auth_id: str) -> dict:
+    """Session data for auth_id from the database (blocking); cached in current_user_cache"""
+    db_conn = None
+    cursor = None
+    try:
+        db_conn = get_pooled_connection()
+        cursor = db_conn.cursor(dictionary=True)
+        user = crud_user.get_user_session_profile_by_auth_id(db_conn, cursor, auth_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found in database")
+
+        user_data_for_session = {
+            "auth_id": user["auth_id"], # Changed
+            "user_id": user["user_id"],
+            "email": user["email"],
+            "first_name": user["first_name"],
+            "last_name": user["last_name"],
+            "user_type": user["user_type"],
+        }
+        if user["user_type"] == "member" and user["member_id"] is not None:
+            user_data_for_session["member_id_pk"] = user["member_id"]
+        elif user["user_type"] == "trainer" and user["trainer_id"] is not None:
+            user_data_for_session["trainer_id_pk"] = user["trainer_id"] # PK of trainer table itself
+        elif user["user_type"] == "manager" and user["manager_id"] is not None:
+            user_data_for_session["manager_id_pk"] = user["manager_id"]
+
+        current_user_cache.set(auth_id, dict(user_data_for_session))
+        return user_data_for_session
+
+    finally:
+        if cursor:
+            cursor.close()
+        if db_conn:
+            db_conn.close()
+
+async def get_current_user_data(request: Request):
     auth_header = request.headers.get('Authorization', '')
     token_str = auth_header.split(" ")[1] if " " in auth_header else None # Renamed to avoid conflict
     if not token_str:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     try:
-        jwt_payload = verify_jwt(token_str)
+        jwt_payload = get_cached_jwt_payload(token_str)
+        if jwt_payload is None:
+            jwt_payload = await run_in_threadpool(verify_jwt, token_str)
         auth_id = jwt_payload.get("sub") # Changed firebase_uid to auth_id
         if not auth_id:
             raise HTTPException(status_code=401, detail="Invalid token: missing sub (auth_id)")
 
-        cursor = None
-        try:
-            cursor = db_conn.cursor(dictionary=True)
-            user = crud_user.get_user_by_auth_id(db_conn, cursor, auth_id) # Changed
-            if not user:
-                raise HTTPException(status_code=404, detail="User not found in database")
-            
-            user_data_for_session = {
-                "auth_id": user["auth_id"], # Changed
-                "user_id": user["user_id"],
-                "email": user["email"],
-                "first_name": user["first_name"],
-                "last_name": user["last_name"],
-                "user_type": user["user_type"],
-            }
-            if user["user_type"] == "member":
-                member_details = crud_user.get_member_by_user_id_pk(db_conn, cursor, user["user_id"])
-                if member_details: user_data_for_session["member_id_pk"] = member_details["member_id"]
-            elif user["user_type"] == "trainer":
-                trainer_details = crud_user.get_trainer_by_user_id_pk(db_conn, cursor, user["user_id"])
-                if trainer_details: user_data_for_session["trainer_id_pk"] = trainer_details["trainer_id"] # PK of trainer table itself
-            # Add manager details similarly
-
-            return user_data_for_session
-
-        finally:
-            if cursor:
-                cursor.close()
+        cached_user = current_user_cache.get(auth_id)
+        if cached_user is not None:
+            return dict(cached_user)
+
+        # A connection is only checked out from the pool on a cache miss, on the DB executor
+        return await run_in_db_executor(_load_current_user_data, auth_id)
 
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
@@ -80,6 +134,11 @@ async def get_current_user_data(request: Request, db_conn = Depends(get_db_conne
 
 
 def setup_auth_routes(api: FastAPI):
+    @api.on_event("startup")
+    async def warm_jwks_cache():
+        # Load signing keys before the first authenticated request arrives
+        jwks_store.refresh_in_background()
+
     @api.get("/login")
     async def login(request: Request):
         api_port = os.getenv("API_PORT", 8000) # Get API_PORT for redirect_url
@@ -0,0 +1,131 @@
+"""Concurrency stress test: hundreds of simultaneous bookings for one class or schedule slot.
+
+Every thread takes its own pooled connection, waits on a barrier and then books a different
+member through the CRUD layer (create_class_booking / add_member_to_schedule) in its own
+transaction. Afterwards the capacity invariants are checked against the database: never more
+seat-holding bookings than the capacity, and the stored current_participants equal to the real count.
+The bookings it made are deleted again unless --keep is given.
+
+    MYSQL_POOL_MAX_SIZE=300 python -m backend.benchmarks.booking_capacity --class-id 12 --first-member-id 1 --bookings 300
+    MYSQL_POOL_MAX_SIZE=300 python -m backend.benchmarks.booking_capacity --schedule-id 40 --first-member-id 1 --bookings 300
+"""
+import argparse
+import threading
+import time
+from collections import Counter
+
+from fastapi import HTTPException
+
+from backend.database.base import get_pooled_connection
+from backend.database.crud import class_mgmt as crud_class
+from backend.database.crud import scheduling as crud_scheduling
+from backend.database.db_utils import get_sql
+
+
+_results_lock = threading.Lock()
+
+
+def _book(book, barrier, outcomes, created, latencies):
+    connection = get_pooled_connection()
+    cursor = connection.cursor(dictionary=True)
+    try:
+        barrier.wait()
+        started = time.perf_counter()
+        result, outcome = None, "booked"
+        try:
+            result = book(connection, cursor)
+            connection.commit()
+        except HTTPException as e:
+            connection.rollback()
+            outcome = e.status_code
+        except Exception as e:
+            connection.rollback()
+            outcome = type(e).__name__
+        with _results_lock:
+            outcomes[outcome] += 1
+            latencies.append(time.perf_counter() - started)
+            if result is not None:
+                created.append(result)
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def _run_threads(books):
+    barrier = threading.Barrier(len(books))
+    outcomes, created, latencies = Counter(), [], []
+    threads = [threading.Thread(target=_book, args=(book, barrier, outcomes, created, latencies)) for book in books]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes, created, latencies, time.perf_counter() - started
+
+
+def _class_booker(class_id, member_id):
+    payload = {"class_id": class_id, "member_id": member_id, "payment_status": "Free", "amount_paid": 0}
+    return lambda connection, cursor: crud_class.create_class_booking(connection, cursor, payload)
+
+
+def _schedule_booker(schedule_id, member_id):
+    payload = {"schedule_id": schedule_id, "member_id": member_id}
+    return lambda connection, cursor: crud_scheduling.add_member_to_schedule(connection, cursor, payload)
+
+
+def _check_and_clean_up(class_id, schedule_id, created, keep):
+    connection = get_pooled_connection()
+    cursor = connection.cursor(dictionary=True)
+    try:
+        if class_id is not None:
+            info = crud_class.get_class_by_id(connection, cursor, class_id)
+            cursor.execute(get_sql("class_bookings_get_count_by_class_id_active_booking"), (class_id,))
+            holding = cursor.fetchone()["booking_count"]
+            print(f"Class {class_id}: {holding} seat-holding bookings, current_participants {info['current_participants']}, "
+                  f"max_participants {info['max_participants']}")
+            assert holding <= info["max_participants"], "class overbooked"
+            assert holding == info["current_participants"], "current_participants drifted from the bookings"
+            if not keep:
+                for booking in created:
+                    crud_class.delete_class_booking(connection, cursor, booking["booking_id"])
+        else:
+            info = crud_scheduling.get_weekly_schedule_by_id(connection, cursor, schedule_id)
+            cursor.execute(get_sql("schedule_members_get_count_by_schedule_id_active_status"), (schedule_id,))
+            holding = cursor.fetchone()["member_count"]
+            print(f"Schedule {schedule_id}: {holding} members, current_participants {info['current_participants']}, "
+                  f"max_capacity {info['max_capacity']}")
+            assert holding <= info["max_capacity"], "schedule slot overbooked"
+            assert holding == info["current_participants"], "current_participants drifted from the schedule members"
+            if not keep:
+                for link in created:
+                    crud_scheduling.remove_member_from_schedule(connection, cursor, link["id"])
+        connection.commit()
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def run_stress_test(class_id, schedule_id, first_member_id, bookings, keep):
+    if class_id is not None:
+        books = [_class_booker(class_id, first_member_id + i) for i in range(bookings)]
+    else:
+        books = [_schedule_booker(schedule_id, first_member_id + i) for i in range(bookings)]
+    outcomes, created, latencies, elapsed = _run_threads(books)
+    latencies.sort()
+    print(f"{bookings} simultaneous bookings in {elapsed:.2f}s")
+    print(f"  latency p50 {latencies[len(latencies) // 2] * 1000:.1f}ms, max {latencies[-1] * 1000:.1f}ms")
+    print(f"  outcomes: {dict(outcomes)} (409 = full or already booked)")
+    _check_and_clean_up(class_id, schedule_id, created, keep)
+    print("Capacity invariants hold")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent booking capacity stress test")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--class-id", type=int)
+    target.add_argument("--schedule-id", type=int)
+    parser.add_argument("--first-member-id", type=int, default=1, help="Bookings use member ids first..first+bookings-1")
+    parser.add_argument("--bookings", type=int, default=300, help="Also the number of threads; size MYSQL_POOL_MAX_SIZE to match")
+    parser.add_argument("--keep", action="store_true", help="Leave the bookings in place")
+    args = parser.parse_args()
+    run_stress_test(args.class_id, args.schedule_id, args.first_member_id, args.bookings, args.keep)
@@ -0,0 +1,87 @@
+"""Load benchmark for concurrent class bookings against a running API.
+
+Fires POST /classes/bookings with many members in parallel while probing GET /testos,
+so both booking throughput and event-loop responsiveness under load are visible.
+
+    python -m backend.benchmarks.booking_load --class-id 12 --first-member-id 1 --requests 400 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from collections import Counter
+
+import httpx
+
+API_URL = f"http://{os.getenv('API_HOST', '127.0.0.1')}:{os.getenv('API_PORT', '8000')}"
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _book(client, semaphore, class_id, member_id, latencies, statuses):
+    payload = {"class_id": class_id, "member_id": member_id, "payment_status": "Free", "amount_paid": 0}
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            response = await client.post("/classes/bookings", json=payload)
+            statuses[response.status_code] += 1
+        except httpx.HTTPError as e:
+            statuses[type(e).__name__] += 1
+        latencies.append(time.perf_counter() - started)
+
+
+async def _probe(client, stop_event, probe_latencies):
+    # A cheap route: if the event loop is blocked by DB work its latency jumps with booking load
+    while not stop_event.is_set():
+        started = time.perf_counter()
+        try:
+            await client.get("/testos")
+            probe_latencies.append(time.perf_counter() - started)
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.05)
+
+
+async def run_benchmark(class_id, first_member_id, total_requests, concurrency, api_url=API_URL):
+    latencies, probe_latencies, statuses = [], [], Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency + 1, max_keepalive_connections=concurrency + 1)
+    async with httpx.AsyncClient(base_url=api_url, timeout=60, limits=limits) as client:
+        stop_event = asyncio.Event()
+        probe_task = asyncio.create_task(_probe(client, stop_event, probe_latencies))
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            _book(client, semaphore, class_id, first_member_id + i, latencies, statuses)
+            for i in range(total_requests)
+        ])
+        elapsed = time.perf_counter() - started
+        stop_event.set()
+        await probe_task
+
+    print(f"Requests:        {total_requests} (concurrency {concurrency})")
+    print(f"Elapsed:         {elapsed:.2f}s")
+    print(f"Throughput:      {total_requests / elapsed:.1f} req/s")
+    print(f"Booking latency: p50 {_percentile(latencies, 50) * 1000:.1f}ms, "
+          f"p95 {_percentile(latencies, 95) * 1000:.1f}ms, p99 {_percentile(latencies, 99) * 1000:.1f}ms")
+    if probe_latencies:
+        print(f"/testos latency: mean {statistics.mean(probe_latencies) * 1000:.1f}ms, "
+              f"max {max(probe_latencies) * 1000:.1f}ms over {len(probe_latencies)} probes")
+    print(f"Status codes:    {dict(statuses)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent class booking load benchmark")
+    parser.add_argument("--class-id", type=int, required=True)
+    parser.add_argument("--first-member-id", type=int, default=1, help="Bookings use member ids first..first+requests-1")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--api-url", default=API_URL)
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.class_id, args.first_member_id, args.requests, args.concurrency, args.api_url))
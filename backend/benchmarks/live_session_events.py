@@ -0,0 +1,83 @@
+"""Latency of live session events: a MySQL transaction per event vs the in-memory live session store.
+
+Toggles one member's attendance status in an active live session N times, first through
+update_live_session_attendance_status in its own transaction (the path used when
+LIVE_SESSION_CHECKPOINT_SECONDS=0), then through LiveSessionStore.update_attendance, and
+finally times the checkpoint that writes the store's changes. The attendance row ends with the
+status it started with. The store journals to a temporary file.
+
+    python -m backend.benchmarks.live_session_events --live-session-id 3 --member-id 12 --events 2000
+    python -m backend.benchmarks.live_session_events --live-session-id 3 --member-id 12 --no-fsync
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from backend.database.base import get_pooled_connection
+from backend.database.crud import training_execution as crud_exec
+from backend.database.live_session_store import LiveSessionStore
+
+TOGGLE = {"Checked In": "No Show", "No Show": "Checked In", "Checked Out": "Checked In"}
+
+
+def _percentiles(latencies):
+    latencies = sorted(latencies)
+    return latencies[len(latencies) // 2] * 1e6, latencies[int(len(latencies) * 0.99)] * 1e6
+
+
+def run_benchmark(live_session_id, member_id, events, fsync):
+    connection = get_pooled_connection()
+    cursor = connection.cursor(dictionary=True)
+    journal_path = os.path.join(tempfile.mkdtemp(), "live_session_journal.log")
+    try:
+        attendance = crud_exec.get_attendance_for_live_session(connection, cursor, live_session_id)
+        row = next((row for row in attendance if row["member_id"] == member_id), None)
+        if row is None:
+            raise SystemExit(f"Member {member_id} has no attendance record in live session {live_session_id}")
+        original_status = row["status"]
+        connection.commit()
+
+        latencies, current = [], original_status
+        for _ in range(events):
+            current = TOGGLE[current]
+            started = time.perf_counter()
+            crud_exec.update_live_session_attendance_status(connection, cursor, row["id"], current)
+            connection.commit()
+            latencies.append(time.perf_counter() - started)
+        p50, p99 = _percentiles(latencies)
+        print(f"{events} events, one transaction each: p50 {p50:8.1f} us, p99 {p99:8.1f} us")
+
+        store = LiveSessionStore(checkpoint_seconds=3600, journal_path=journal_path, fsync=fsync)
+        if not store.load(connection, cursor, live_session_id):
+            raise SystemExit(f"Live session {live_session_id} is not active")
+        connection.commit()
+        latencies = []
+        for _ in range(events):
+            current = TOGGLE[current]
+            started = time.perf_counter()
+            store.update_attendance(live_session_id, member_id, current)
+            latencies.append(time.perf_counter() - started)
+        p50, p99 = _percentiles(latencies)
+        print(f"{events} events, live session store (fsync={fsync}): p50 {p50:8.1f} us, p99 {p99:8.1f} us")
+
+        store.update_attendance(live_session_id, member_id, original_status)
+        started = time.perf_counter()
+        written = store.flush()
+        print(f"Checkpoint: {written} row(s) in {(time.perf_counter() - started) * 1000:.1f} ms")
+        store.stop()
+    finally:
+        cursor.close()
+        connection.close()
+        if os.path.exists(journal_path):
+            os.remove(journal_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Live session event latency: per-event transactions vs the in-memory store")
+    parser.add_argument("--live-session-id", type=int, required=True, help="An active ('Started'/'In Progress') live session")
+    parser.add_argument("--member-id", type=int, required=True, help="A member with an attendance record in that session")
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--no-fsync", action="store_true", help="Journal without fsync (LIVE_SESSION_JOURNAL_FSYNC=0)")
+    args = parser.parse_args()
+    run_benchmark(args.live_session_id, args.member_id, args.events, not args.no_fsync)
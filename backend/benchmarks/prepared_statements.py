@@ -0,0 +1,57 @@
+"""Microbenchmark: text-protocol queries vs cached server-side prepared statements.
+
+Runs the same registry query N times on one pooled connection, once through the plain
+cursor(dictionary=True) and once through the PreparingCursor used when MYSQL_STMT_CACHE_SIZE > 0.
+
+    python -m backend.benchmarks.prepared_statements --iterations 5000 --week 2025-06-01 --class-id 1
+"""
+import argparse
+import time
+
+from backend.database.base import db_pool
+from backend.database.db_utils import get_sql
+from backend.database.prepared import PreparedStatementCache, PreparingCursor
+
+
+def _time_queries(cursor, sql, params, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        cursor.execute(sql, params)
+        cursor.fetchall()
+    return time.perf_counter() - started
+
+
+def run_benchmark(iterations, week_start_date, class_id):
+    cases = [
+        ("weekly_schedule_get_by_week", (week_start_date,)),
+        ("class_bookings_get_count_by_class_id_active_booking", (class_id,)),
+    ]
+    connection = db_pool.get_connection()
+    try:
+        raw_connection = connection._cnx  # Bypass the pool's cursor() so both paths are explicit
+        text_cursor = raw_connection.cursor(dictionary=True)
+        prepared_cursor = PreparingCursor(raw_connection.cursor(dictionary=True), PreparedStatementCache(raw_connection, 16))
+        for key, params in cases:
+            sql = get_sql(key)
+            # Warm up both paths (first prepared execution pays for the PREPARE)
+            _time_queries(text_cursor, sql, params, 10)
+            _time_queries(prepared_cursor, sql, params, 10)
+            text_seconds = _time_queries(text_cursor, sql, params, iterations)
+            prepared_seconds = _time_queries(prepared_cursor, sql, params, iterations)
+            print(f"{key}:")
+            print(f"  text protocol: {text_seconds / iterations * 1e6:8.1f} us/query")
+            print(f"  prepared:      {prepared_seconds / iterations * 1e6:8.1f} us/query "
+                  f"({text_seconds / prepared_seconds:.2f}x)")
+        text_cursor.close()
+        prepared_cursor.close()
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prepared statement cache microbenchmark")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--week", default="2025-06-01", help="week_start_date for weekly_schedule_get_by_week")
+    parser.add_argument("--class-id", type=int, default=1)
+    args = parser.parse_args()
+    run_benchmark(args.iterations, args.week, args.class_id)
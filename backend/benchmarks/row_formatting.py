@@ -0,0 +1,91 @@
+"""Benchmark: format_records vs the column-wise formatter over synthetic result sets.
+
+Fixtures mimic weekly_schedule_get_by_week and logged workout history rows (dates, TIME columns
+as timedelta, Decimals, strings), so no database is needed.
+
+    python -m backend.benchmarks.row_formatting --rows 100000
+"""
+import argparse
+import copy
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from backend.database.db_utils import dumps_json, format_records, format_rows_by_columns
+
+# Shaped like cursor.description: (name, type_code, ..., flags). Type codes: 3=LONG, 8=LONGLONG, 10=DATE,
+# 11=TIME, 12=DATETIME, 246=NEWDECIMAL, 247=ENUM, 252=BLOB/TEXT, 253=VAR_STRING. Flags 0 = text (non-binary) column.
+def _column(name, type_code, flags=0):
+    return (name, type_code, None, None, None, None, True, flags)
+
+SCHEDULE_DESCRIPTION = [
+    _column("schedule_id", 3), _column("week_start_date", 10), _column("day_of_week", 247), _column("start_time", 11),
+    _column("end_time", 11), _column("hall_id", 3), _column("trainer_id", 3), _column("max_capacity", 3),
+    _column("status", 247), _column("created_by", 3), _column("created_at", 12), _column("updated_at", 12),
+    _column("hall_name", 253), _column("trainer_name", 253), _column("current_participants", 8),
+]
+WORKOUT_DESCRIPTION = [
+    _column("logged_workout_id", 3), _column("member_id", 3), _column("workout_date", 12),
+    _column("duration_minutes_actual", 3), _column("calories_burned_estimate", 246),
+    _column("notes_overall_session", 252), _column("source", 247), _column("live_session_id", 3),
+    _column("member_active_plan_id", 3), _column("training_plan_day_id", 3), _column("created_at", 12),
+    _column("updated_at", 12),
+]
+
+
+def make_schedule_rows(count):
+    base = datetime(2025, 6, 1, 8, 0)
+    return [{
+        "schedule_id": i, "week_start_date": date(2025, 6, 1), "day_of_week": "Sunday",
+        "start_time": timedelta(hours=8 + i % 10), "end_time": timedelta(hours=9 + i % 10),
+        "hall_id": i % 7, "trainer_id": i % 13, "max_capacity": 20, "status": "Scheduled", "created_by": 1,
+        "created_at": base, "updated_at": base, "hall_name": "Main Hall", "trainer_name": "Dana Levi",
+        "current_participants": i % 20,
+    } for i in range(count)]
+
+
+def make_workout_rows(count):
+    base = datetime(2025, 6, 1, 8, 0)
+    return [{
+        "logged_workout_id": i, "member_id": i % 500, "workout_date": base + timedelta(days=i % 365),
+        "duration_minutes_actual": 60, "calories_burned_estimate": Decimal("412.50"),
+        "notes_overall_session": "Felt strong" if i % 3 else None, "source": "from_live_session",
+        "live_session_id": i, "member_active_plan_id": None, "training_plan_day_id": None,
+        "created_at": base, "updated_at": base,
+    } for i in range(count)]
+
+
+def _best_of(func, fixture, repeats):
+    best = None
+    for _ in range(repeats):
+        rows = copy.deepcopy(fixture)  # Both formatters mutate rows in place
+        started = time.perf_counter()
+        func(rows)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_benchmark(row_count, repeats):
+    for label, description, fixture in [
+        ("weekly_schedule_get_by_week", SCHEDULE_DESCRIPTION, make_schedule_rows(row_count)),
+        ("logged_workouts_get_by_member_id", WORKOUT_DESCRIPTION, make_workout_rows(row_count)),
+    ]:
+        # Both paths must produce identical output
+        assert format_records(copy.deepcopy(fixture)) == format_rows_by_columns(description, copy.deepcopy(fixture))
+
+        old = _best_of(format_records, fixture, repeats)
+        new = _best_of(lambda rows: format_rows_by_columns(description, rows), fixture, repeats)
+        raw_json = _best_of(dumps_json, fixture, repeats)
+        print(f"{label} ({row_count} rows, best of {repeats}):")
+        print(f"  format_records:         {old * 1000:8.1f} ms")
+        print(f"  format_rows_by_columns: {new * 1000:8.1f} ms ({old / new:.2f}x)")
+        print(f"  dumps_json (raw rows):  {raw_json * 1000:8.1f} ms, formatting + encoding in one pass")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Row formatting benchmark")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    run_benchmark(args.rows, args.repeats)
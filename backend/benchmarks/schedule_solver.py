@@ -0,0 +1,122 @@
+"""Benchmark: WeeklyScheduleSolver over a synthetic week, with a constraint check of the result.
+
+Fixtures mimic the rows generate_weekly_schedule_for_week loads (TIME columns as timedelta,
+the 1.5-hour slot grid of the training preferences page), so no database is needed. Classes
+that week block some trainers and halls, and members' 'Not Available' rows block them; the
+check fails if the solver books over either.
+
+    python -m backend.benchmarks.schedule_solver --members 5000 --halls 40 --trainers 60
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from backend.utils.intervals import IntervalSet, time_to_seconds
+from backend.utils.schedule_solver import WeeklyScheduleSolver
+
+DAYS = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday"]
+SLOT_HOURS = range(8, 21)  # 08:00-09:30 ... 20:00-21:30, as on the training preferences page
+
+
+def make_fixture(member_count, hall_count, trainer_count, slots_per_day, class_count, seed):
+    rng = random.Random(seed)
+    halls = [{"hall_id": i, "max_capacity": rng.choice([10, 15, 20, 30]), "is_active": True} for i in range(1, hall_count + 1)]
+    trainers = [{"trainer_id": i, "is_active": True} for i in range(1, trainer_count + 1)]
+    gym_hours = [{"day_of_week": day, "opening_time": timedelta(hours=7), "closing_time": timedelta(hours=22), "is_closed": False}
+                 for day in DAYS]
+    preferences = []
+    for member_id in range(1, member_count + 1):
+        for day in DAYS:
+            for hour in rng.sample(SLOT_HOURS, slots_per_day):
+                preferences.append({
+                    "member_id": member_id, "day_of_week": day,
+                    "start_time": timedelta(hours=hour), "end_time": timedelta(hours=hour + 1, minutes=30),
+                    "preference_type": rng.choice(["Preferred", "Available", "Available", "Not Available"]),
+                    "trainer_id": rng.randint(1, trainer_count) if rng.random() < 0.25 else None,
+                })
+    classes, taken = [], set()
+    while len(classes) < class_count:  # One-hour classes on the hour; a trainer or hall teaches one at a time
+        day, hour = rng.choice(DAYS), rng.choice(SLOT_HOURS)
+        trainer_id, hall_id = rng.randint(1, trainer_count), rng.randint(1, hall_count)
+        if ("trainer", day, hour, trainer_id) in taken or ("hall", day, hour, hall_id) in taken:
+            continue
+        taken.update({("trainer", day, hour, trainer_id), ("hall", day, hour, hall_id)})
+        classes.append({"day_of_week": day, "start_time": timedelta(hours=hour), "end_time": timedelta(hours=hour + 1),
+                        "trainer_id": trainer_id, "hall_id": hall_id})
+    return halls, trainers, gym_hours, preferences, classes
+
+
+def _overlaps(intervals, start, end):
+    return any(other_start < end and start < other_end for other_start, other_end in intervals)
+
+
+def check_interval_set():
+    """Intervals stored without a ref (class blocks, 'Not Available' ranges) must count as overlaps"""
+    intervals = IntervalSet()
+    intervals.add(28800, 32400)
+    assert intervals.find_overlap(28800, 32400) == (28800, 32400), "unreferenced interval ignored"
+    intervals.add(36000, 39600, ref=7)
+    assert intervals.find_overlap(36000, 39600, exclude_ref=7) is None
+    assert intervals.find_overlap(30000, 39600, exclude_ref=7) == (28800, 32400)
+
+
+def check_constraints(solver, new_assignments, preferences, classes, stats):
+    """Raise AssertionError if a hall or trainer is double-booked, a session overfilled, a member over-assigned
+    or a request neither assigned nor counted as skipped/unplaced"""
+    booked = defaultdict(list)
+    for event in classes:
+        interval = (time_to_seconds(event["start_time"]), time_to_seconds(event["end_time"]))
+        booked[("hall", event["day_of_week"], event["hall_id"])].append(interval)
+        booked[("trainer", event["day_of_week"], event["trainer_id"])].append(interval)
+    for session in solver.sessions:
+        assert session["member_count"] <= session["max_capacity"], session
+        booked[("hall", session["day_of_week"], session["hall_id"])].append((session["start"], session["end"]))
+        booked[("trainer", session["day_of_week"], session["trainer_id"])].append((session["start"], session["end"]))
+    for resource, intervals in booked.items():
+        intervals.sort()
+        for (_, previous_end), (next_start, _) in zip(intervals, intervals[1:]):
+            assert previous_end <= next_start, f"{resource} double-booked"
+    per_member_day = defaultdict(int)
+    for ref, member_id in new_assignments:
+        per_member_day[(member_id, solver.sessions[ref]["day_of_week"])] += 1
+    assert all(count == 1 for count in per_member_day.values()), "member booked twice on one day"
+    not_available = defaultdict(list)
+    for pref in preferences:
+        if pref["preference_type"] == "Not Available":
+            not_available[(pref["member_id"], pref["day_of_week"])].append(
+                (time_to_seconds(pref["start_time"]), time_to_seconds(pref["end_time"])))
+    for ref, member_id in new_assignments:
+        session = solver.sessions[ref]
+        assert not _overlaps(not_available[(member_id, session["day_of_week"])], session["start"], session["end"]), \
+            "member booked while 'Not Available'"
+    requests = sum(1 for pref in preferences if pref["preference_type"] != "Not Available")
+    accounted = len(new_assignments) + stats["skipped_outside_gym_hours"] + stats["unplaced_requests"]
+    assert accounted == requests, f"{requests} requests but {accounted} assigned, skipped or unplaced"
+
+
+def run_benchmark(member_count, hall_count, trainer_count, slots_per_day, class_count, seed):
+    check_interval_set()
+    halls, trainers, gym_hours, preferences, classes = make_fixture(member_count, hall_count, trainer_count, slots_per_day, class_count, seed)
+    started = time.perf_counter()
+    solver = WeeklyScheduleSolver(halls, trainers, gym_hours, blocking_events=classes)
+    new_sessions, new_assignments, stats = solver.solve(preferences)
+    elapsed = time.perf_counter() - started
+    check_constraints(solver, new_assignments, preferences, classes, stats)
+    print(f"{len(preferences)} preference rows, {member_count} members, {hall_count} halls, {trainer_count} trainers, {class_count} classes")
+    print(f"  solve: {elapsed * 1000:.1f} ms")
+    for key, value in stats.items():
+        print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Weekly schedule solver benchmark")
+    parser.add_argument("--members", type=int, default=5000)
+    parser.add_argument("--halls", type=int, default=40)
+    parser.add_argument("--trainers", type=int, default=60)
+    parser.add_argument("--slots-per-day", type=int, default=4, help="Preference rows per member per day")
+    parser.add_argument("--classes", type=int, default=100, help="Classes that week, blocking a trainer and a hall each")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    run_benchmark(args.members, args.halls, args.trainers, args.slots_per_day, args.classes, args.seed)
@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+
+from backend.database.db_utils import get_sql, fetch_all_formatted
+from backend.database.pool import after_commit
+
+ACTIVE_SESSION_INDEX_TTL_SECONDS = float(os.getenv("ACTIVE_SESSION_INDEX_TTL_SECONDS", "30"))  # 0 disables the index (SQL lookup instead)
+
+
+class ActiveSessionIndex:
+    """Active live sessions by member_id and trainer_id, mirroring the active_live_sessions table.
+
+    start_live_session and update_live_session_status keep the table in step in their own
+    transaction, as do check-ins and booking changes for the members of a running session, and
+    update this copy once it commits, so /live-sessions/current is two dict
+    lookups. The copy is rebuilt from the table (one query) once it is older than
+    `ttl_seconds`, which picks up sessions started or ended by other processes.
+    """
+
+    def __init__(self, ttl_seconds: float = ACTIVE_SESSION_INDEX_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._sessions = {}  # live_session_id -> session row
+        self._by_member = {}  # member_id -> {live_session_id}
+        self._by_trainer = {}  # trainer_id -> {live_session_id}
+        self._loaded_at = None
+        self._changes = 0  # Bumped by every in-process update; a rebuild that raced one is not trusted
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.rebuilds = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def fresh(self) -> bool:
+        loaded_at = self._loaded_at
+        return loaded_at is not None and time.monotonic() - loaded_at < self.ttl_seconds
+
+    def _add_rows_locked(self, rows):
+        for row in rows:
+            member_id, trainer_id = row.pop("member_id"), row.pop("trainer_id")
+            live_session_id = row["live_session_id"]
+            self._sessions.setdefault(live_session_id, row)
+            if member_id is not None:
+                self._by_member.setdefault(member_id, set()).add(live_session_id)
+            if trainer_id is not None:
+                self._by_trainer.setdefault(trainer_id, set()).add(live_session_id)
+
+    def _remove_locked(self, live_session_id):
+        self._sessions.pop(live_session_id, None)
+        for by_person in (self._by_member, self._by_trainer):
+            for person_id in [p for p, ids in by_person.items() if live_session_id in ids]:
+                by_person[person_id].discard(live_session_id)
+                if not by_person[person_id]:
+                    del by_person[person_id]
+
+    def rebuild(self, db_conn, cursor):
+        """Reload the whole index from the active_live_sessions table with `cursor`"""
+        with self._lock:
+            changes = self._changes
+        cursor.execute(get_sql("active_live_sessions_get_all"))
+        rows = fetch_all_formatted(cursor)
+        with self._lock:
+            self._sessions, self._by_member, self._by_trainer = {}, {}, {}
+            self._add_rows_locked(rows)
+            self.rebuilds += 1
+            # An update committed while the rows were read may be missing from them: rebuild again next time
+            self._loaded_at = time.monotonic() if changes == self._changes else None
+
+    def lookup(self, member_id: int = None, trainer_id: int = None):
+        """The most recently started active session of a member or trainer, or None"""
+        with self._lock:
+            self.lookups += 1
+            by_person, person_id = (self._by_member, member_id) if member_id is not None else (self._by_trainer, trainer_id)
+            sessions = [self._sessions[i] for i in by_person.get(person_id, ()) if i in self._sessions]
+            if not sessions:
+                return None
+            return dict(max(sessions, key=lambda session: session["start_time"] or ""))
+
+    def add_on_commit(self, db_conn, cursor, live_session_id: int):
+        """Index a session whose active_live_sessions rows were just written in db_conn's transaction"""
+        cursor.execute(get_sql("active_live_sessions_get_by_live_session_id"), (live_session_id,))
+        rows = fetch_all_formatted(cursor)
+
+        def add():
+            with self._lock:
+                self._changes += 1
+                self._remove_locked(live_session_id)
+                self._add_rows_locked(rows)
+        after_commit(db_conn, add)
+
+    def add_member(self, live_session_id: int, member_id: int):
+        """Index a member who joined an indexed session, e.g. a check-in held by the live session store"""
+        with self._lock:
+            self._changes += 1
+            if live_session_id in self._sessions:
+                self._by_member.setdefault(member_id, set()).add(live_session_id)
+
+    def add_member_on_commit(self, db_conn, live_session_id: int, member_id: int):
+        after_commit(db_conn, lambda: self.add_member(live_session_id, member_id))
+
+    def remove_on_commit(self, db_conn, live_session_id: int):
+        def remove():
+            with self._lock:
+                self._changes += 1
+                self._remove_locked(live_session_id)
+        after_commit(db_conn, remove)
+
+    def set_status(self, live_session_id: int, new_status: str):
+        with self._lock:
+            self._changes += 1
+            session = self._sessions.get(live_session_id)
+            if session is not None:
+                self._sessions[live_session_id] = {**session, "status": new_status}
+
+    def set_status_on_commit(self, db_conn, live_session_id: int, new_status: str):
+        after_commit(db_conn, lambda: self.set_status(live_session_id, new_status))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "ttl_seconds": self.ttl_seconds,
+                "active_sessions": len(self._sessions),
+                "members_indexed": len(self._by_member),
+                "trainers_indexed": len(self._by_trainer),
+                "lookups": self.lookups,
+                "rebuilds": self.rebuilds,
+            }
+
+
+active_session_index = ActiveSessionIndex()
@@ -1,7 +1,10 @@
-import mysql.connector
-from mysql.connector import pooling
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import os
 from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from backend.database.pool import InstrumentedConnectionPool, PoolTimeoutError
 
 # Load environment variables from .env
 load_dotenv()
@@ -13,10 +16,22 @@ DB_PASSWORD = os.getenv('MYSQL_PASSWORD')
 DB_NAME = os.getenv('MYSQL_DATABASE')
 DB_PORT = os.getenv('MYSQL_PORT', 3306) # Default MySQL port
 
+# Pool sizing/behaviour (see backend/database/pool.py)
+DB_POOL_MIN_SIZE = int(os.getenv('MYSQL_POOL_MIN_SIZE', 2))
+DB_POOL_MAX_SIZE = int(os.getenv('MYSQL_POOL_MAX_SIZE', 10))
+DB_POOL_WAIT_TIMEOUT = float(os.getenv('MYSQL_POOL_WAIT_TIMEOUT', 10)) # Seconds a request waits for a free connection
+DB_POOL_RECYCLE_SECONDS = int(os.getenv('MYSQL_POOL_RECYCLE_SECONDS', 1800))
+DB_POOL_HEALTH_CHECK_SECONDS = int(os.getenv('MYSQL_POOL_HEALTH_CHECK_SECONDS', 30)) # Ping connections idle longer than this
+DB_STMT_CACHE_SIZE = int(os.getenv('MYSQL_STMT_CACHE_SIZE', 0)) # Server-side prepared statements per connection (0 = text protocol only)
+
 # Create a connection pool
-db_pool = mysql.connector.pooling.MySQLConnectionPool(
-    pool_name="mypool",
-    pool_size=10,  # Adjust pool size as needed
+db_pool = InstrumentedConnectionPool(
+    min_size=DB_POOL_MIN_SIZE,
+    max_size=DB_POOL_MAX_SIZE,
+    wait_timeout=DB_POOL_WAIT_TIMEOUT,
+    recycle_seconds=DB_POOL_RECYCLE_SECONDS,
+    health_check_seconds=DB_POOL_HEALTH_CHECK_SECONDS,
+    stmt_cache_size=DB_STMT_CACHE_SIZE,
     host=DB_HOST,
     user=DB_USER,
     password=DB_PASSWORD,
@@ -25,32 +40,122 @@ db_pool = mysql.connector.pooling.MySQLConnectionPool(
     auth_plugin='mysql_native_password' # Or caching_sha2_password depending on your MySQL version
 )
 
+def get_pooled_connection():
+    """Check a connection out of the pool; the caller must close() it to return it"""
+    try:
+        return db_pool.get_connection()
+    except PoolTimeoutError as e:
+        # Every connection stayed busy for the whole wait timeout: ask the client to retry instead of a 500
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Database busy: {e}")
+
 # Dependency to get DB connection and cursor from the pool
 def get_db_cursor():
     connection = None
     cursor = None
     try:
-        connection = db_pool.get_connection()
+        connection = get_pooled_connection()
         # dictionary=True returns rows as dictionaries {column_name: value}
         cursor = connection.cursor(dictionary=True) 
         yield connection, cursor
     finally:
         if cursor:
             cursor.close()
-        if connection and connection.is_connected():
-            connection.close()
+        if connection:
+            connection.close() # Returns it to the pool (broken connections are discarded there)
 
 # Dependency to get DB connection (for transactions spanning multiple cursor operations)
 def get_db_connection():
     connection = None
     try:
-        connection = db_pool.get_connection()
+        connection = get_pooled_connection()
         yield connection
     finally:
-        if connection and connection.is_connected():
+        if connection:
             connection.close()
 
 
+# === Async access ===
+# mysql.connector is blocking, so async routes run their DB work on a bounded executor instead of the event loop.
+# Sizing it to the pool means a burst of requests queues here rather than fighting over connections.
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", DB_POOL_MAX_SIZE))
+db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db-worker")
+
+async def run_in_db_executor(func, *args, **kwargs):
+    """Run a blocking callable on the DB executor and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, functools.partial(func, *args, **kwargs))
+
+def _execute_and_fetch(db_conn, cursor, sql, params, many):
+    cursor.execute(sql, params)
+    return cursor.fetchall() if many else cursor.fetchone()
+
+class AsyncDBSession:
+    """Async facade over one pooled connection. Every driver call is made on db_executor.
+
+    Existing CRUD functions keep their (db_conn, cursor, ...) signature and are passed to run()
+    or run_in_transaction(); a whole transaction runs in a single executor hop.
+    """
+
+    def __init__(self):
+        self._connection = None
+
+    async def _get_connection(self):
+        if self._connection is None:
+            self._connection = await run_in_db_executor(get_pooled_connection)
+        return self._connection
+
+    def _call_with_cursor(self, connection, func, args, kwargs, commit):
+        cursor = connection.cursor(dictionary=True)
+        try:
+            result = func(connection, cursor, *args, **kwargs)
+            if commit:
+                connection.commit()
+            return result
+        except Exception:
+            if commit:
+                connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    async def run(self, func, *args, **kwargs):
+        """Call func(db_conn, cursor, *args, **kwargs) without committing"""
+        connection = await self._get_connection()
+        return await run_in_db_executor(self._call_with_cursor, connection, func, args, kwargs, False)
+
+    async def run_in_transaction(self, func, *args, **kwargs):
+        """Call func(db_conn, cursor, *args, **kwargs), commit on success and roll back on any exception"""
+        connection = await self._get_connection()
+        return await run_in_db_executor(self._call_with_cursor, connection, func, args, kwargs, True)
+
+    async def fetch_all(self, sql, params=None):
+        return await self.run(_execute_and_fetch, sql, params, True)
+
+    async def fetch_one(self, sql, params=None):
+        return await self.run(_execute_and_fetch, sql, params, False)
+
+    async def commit(self):
+        if self._connection is not None:
+            await run_in_db_executor(self._connection.commit)
+
+    async def rollback(self):
+        if self._connection is not None:
+            await run_in_db_executor(self._connection.rollback)
+
+    async def close(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            await run_in_db_executor(connection.close)
+
+# Async dependency: yields an AsyncDBSession whose connection is taken from the pool on first use
+async def get_async_db():
+    session = AsyncDBSession()
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
 # Test function to check database connection (optional)
 def test_db_connection():
     try:
@@ -1,4 +1,6 @@
-from backend.database.db_utils import get_sql, format_records, validate_payload
+from backend.database.db_utils import get_sql, format_records, fetch_all_formatted, validate_payload
+from backend.database.pagination import KeysetSpec, fetch_keyset_page
+from backend.database.crud import miscellaneous as crud_misc # Waitlist promotion notifications
 from mysql.connector import Error as MySQLError
 from fastapi import HTTPException, status
 
@@ -18,7 +20,7 @@ def get_all_class_types(db_conn, cursor):
     sql = get_sql("class_types_get_all")
     try:
         cursor.execute(sql)
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error getting all class types: {str(e)}")
 
@@ -111,12 +113,23 @@ def get_class_detailed_by_id(db_conn, cursor, class_id: int):
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error getting detailed class: {str(e)}")
 
-def get_all_classes(db_conn, cursor, detailed: bool = False):
+def get_all_classes(db_conn, cursor, detailed: bool = False, formatted: bool = True):
     sql_key = "classes_get_all_detailed" if detailed else "classes_get_all"
     sql = get_sql(sql_key)
     try:
         cursor.execute(sql)
-        return format_records(cursor.fetchall())
+        # formatted=False keeps raw DB values for routes that respond with FastJSONResponse
+        return fetch_all_formatted(cursor) if formatted else cursor.fetchall()
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error getting classes: {str(e)}")
+
+CLASSES_KEYSET = KeysetSpec("classes", [("c.date", "date", True), ("c.start_time", "start_time", False), ("c.class_id", "class_id", False)])
+
+def get_classes_page(db_conn, cursor, page_token: str = None, limit: int = None, formatted: bool = True):
+    """One keyset page of detailed classes, in the same order as get_all_classes(detailed=True)"""
+    sql = get_sql("classes_get_page_detailed")
+    try:
+        return fetch_keyset_page(cursor, sql, CLASSES_KEYSET, None, page_token, limit, formatted)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error getting classes: {str(e)}")
 
@@ -189,7 +202,7 @@ def get_classes_by_filter(db_conn, cursor, filter_by: str, filter_id: int):
     sql = get_sql(sql_key)
     try:
         cursor.execute(sql, (filter_id,))
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error getting classes by {filter_by}: {str(e)}")
 
@@ -198,7 +211,7 @@ def get_classes_by_date_range(db_conn, cursor, start_date: str, end_date: str):
     sql = get_sql("classes_get_by_date_range")
     try:
         cursor.execute(sql, {"start_date": start_date, "end_date": end_date})
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error getting classes by date range: {str(e)}")
 
@@ -215,12 +228,24 @@ def get_class_booking_by_id(db_conn, cursor, booking_id: int):
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error getting booking: {str(e)}")
 
+def _get_class_booking_for_update(db_conn, cursor, booking_id: int):
+    """get_class_booking_by_id, holding the row lock until the caller's transaction ends"""
+    sql = get_sql("class_bookings_get_by_id_for_update")
+    try:
+        cursor.execute(sql, (booking_id,))
+        result = format_records(cursor.fetchone())
+        if not result:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Booking ID {booking_id} not found.")
+        return result
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error getting booking: {str(e)}")
+
 def get_class_bookings_by_class_id(db_conn, cursor, class_id: int):
     get_class_by_id(db_conn, cursor, class_id) # Ensure class exists
     sql = get_sql("class_bookings_get_by_class_id")
     try:
         cursor.execute(sql, (class_id,))
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
@@ -229,7 +254,7 @@ def get_class_bookings_by_member_id(db_conn, cursor, member_id: int):
     sql = get_sql("class_bookings_get_by_member_id")
     try:
         cursor.execute(sql, (member_id,))
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
@@ -244,17 +269,14 @@ def create_class_booking(db_conn, cursor, booking_data: dict):
     validated_data.setdefault('attendance_status', 'Not Attended')
     validated_data.setdefault('email_notification_sent', False)
     
-    # Capacity Check & FK Validation
+    # FK validation; capacity is enforced by the atomic seat counter below
     class_info = get_class_by_id(db_conn, cursor, validated_data['class_id'])
     # crud_user.get_member_by_id_pk(db_conn, cursor, validated_data['member_id'])
 
-    count_sql = get_sql("class_bookings_get_count_by_class_id_active_booking")
-    cursor.execute(count_sql, (validated_data['class_id'],))
-    booking_count_result = cursor.fetchone()
-    current_active_bookings = booking_count_result['booking_count'] if booking_count_result else 0
-    
-    if current_active_bookings >= class_info['max_participants']:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Class is full ({current_active_bookings}/{class_info['max_participants']}).")
+    if _booking_holds_seat(validated_data):
+        reserve_class_seat(db_conn, cursor, validated_data['class_id'])
+    elif class_info['current_participants'] >= class_info['max_participants']:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Class is full ({class_info['current_participants']}/{class_info['max_participants']}).")
         
     sql = get_sql("class_bookings_create")
     try:
@@ -262,8 +284,6 @@ def create_class_booking(db_conn, cursor, booking_data: dict):
         booking_id = cursor.lastrowid
         if not booking_id:
              raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create booking.")
-        # Update class current_participants
-        update_class_participant_count(db_conn, cursor, validated_data['class_id'])
         return get_class_booking_by_id(db_conn, cursor, booking_id)
     except MySQLError as e:
         if e.errno == 1062: # UNIQUE (class_id, member_id)
@@ -288,40 +308,63 @@ def update_class_booking(db_conn, cursor, booking_id: int, booking_data: dict):
     update_params = {**validated_data, "booking_id": booking_id}
     
     try:
-        # Get class_id before update if attendance status changes, to update participant count
-        original_booking = get_class_booking_by_id(db_conn, cursor, booking_id)
-        original_attendance = original_booking.get('attendance_status')
-        class_id_for_count_update = original_booking.get('class_id')
+        # A payment or attendance change can take or give back a seat
+        original_booking = _get_class_booking_for_update(db_conn, cursor, booking_id)
+        held_seat = _booking_holds_seat(original_booking)
+        holds_seat = _booking_holds_seat({**original_booking, **validated_data})
+        if holds_seat and not held_seat:
+            reserve_class_seat(db_conn, cursor, original_booking['class_id'])
+        elif held_seat and not holds_seat:
+            release_class_seat(db_conn, cursor, original_booking['class_id'])
 
         cursor.execute(formatted_sql, update_params)
-        
-        # If attendance status changed, update class participant count
-        new_attendance = validated_data.get('attendance_status')
-        if new_attendance and new_attendance != original_attendance and class_id_for_count_update:
-            update_class_participant_count(db_conn, cursor, class_id_for_count_update)
-
+        if held_seat and not holds_seat:
+            promote_from_class_waitlist(db_conn, cursor, original_booking['class_id'])
         return get_class_booking_by_id(db_conn, cursor, booking_id)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error updating booking: {str(e)}")
 
 def delete_class_booking(db_conn, cursor, booking_id: int):
-    booking_to_delete = get_class_booking_by_id(db_conn, cursor, booking_id) # Existence and get class_id
+    booking_to_delete = _get_class_booking_for_update(db_conn, cursor, booking_id) # Existence, class_id and a row lock
     sql = get_sql("class_bookings_delete_by_id")
     try:
         cursor.execute(sql, (booking_id,))
         if cursor.rowcount == 0:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Booking ID {booking_id} not found for deletion.")
-        # Update class current_participants
-        if booking_to_delete and booking_to_delete.get('class_id'):
-            # Only decrement if the booking was counted (e.g., not already 'Cancelled')
-            if booking_to_delete.get('attendance_status') != 'Cancelled' and booking_to_delete.get('payment_status') in ('Paid', 'Free'):
-                 update_class_participant_count(db_conn, cursor, booking_to_delete['class_id'])
+        # Only give the seat back if the booking was counted (e.g., not already 'Cancelled')
+        if _booking_holds_seat(booking_to_delete):
+            release_class_seat(db_conn, cursor, booking_to_delete['class_id'])
+            promote_from_class_waitlist(db_conn, cursor, booking_to_delete['class_id'])
         return True
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error deleting booking: {str(e)}")
 
+def _booking_holds_seat(booking: dict) -> bool:
+    """Whether a booking counts towards class capacity (same rule as class_bookings_get_count_by_class_id_active_booking)"""
+    return booking.get('payment_status') in ('Paid', 'Free') and booking.get('attendance_status') != 'Cancelled'
+
+def reserve_class_seat(db_conn, cursor, class_id: int):
+    """Take one seat with a conditional increment of classes.current_participants; 409 if the class is full.
+
+    The UPDATE locks the class row until the caller's transaction ends, so concurrent bookings
+    queue on it and each re-checks the committed count: no overbooking, and no COUNT(*) per booking.
+    """
+    try:
+        cursor.execute(get_sql("classes_reserve_seat"), (class_id,))
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error reserving class seat: {str(e)}")
+    if cursor.rowcount == 0:
+        class_info = get_class_by_id(db_conn, cursor, class_id) # 404 if it does not exist
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Class is full ({class_info['current_participants']}/{class_info['max_participants']}).")
+
+def release_class_seat(db_conn, cursor, class_id: int):
+    try:
+        cursor.execute(get_sql("classes_release_seat"), (class_id,))
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error releasing class seat: {str(e)}")
+
 def update_class_participant_count(db_conn, cursor, class_id: int):
-    """Helper to recalculate and update current_participants for a class."""
+    """Recount current_participants for a class from its bookings (repairs a counter edited by hand)."""
     count_sql = get_sql("class_bookings_get_count_by_class_id_active_booking")
     try:
         cursor.execute(count_sql, (class_id,))
@@ -333,4 +376,124 @@ def update_class_participant_count(db_conn, cursor, class_id: int):
     except MySQLError as e:
         # Log this error but don't necessarily halt the primary operation if it's just a count update
         print(f"Error updating participant count for class {class_id}: {e}")
-        # raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error updating participant count: {str(e)}")
\ No newline at end of file
+        # raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error updating participant count: {str(e)}")
+
+# --- ClassWaitlist Operations ---
+def get_class_waitlist_entry_by_id(db_conn, cursor, waitlist_id: int):
+    sql = get_sql("class_waitlist_get_by_id")
+    try:
+        cursor.execute(sql, (waitlist_id,))
+        result = format_records(cursor.fetchone())
+        if not result:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Waitlist entry ID {waitlist_id} not found.")
+        return result
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error getting waitlist entry: {str(e)}")
+
+def get_class_waitlist(db_conn, cursor, class_id: int):
+    """Members waiting for a class, first in line first, with their 1-based position"""
+    get_class_by_id(db_conn, cursor, class_id) # Ensure class exists
+    sql = get_sql("class_waitlist_get_waiting_by_class_id")
+    try:
+        cursor.execute(sql, (class_id,))
+        entries = fetch_all_formatted(cursor)
+        for position, entry in enumerate(entries, start=1):
+            entry['position'] = position
+        return entries
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error getting waitlist: {str(e)}")
+
+def join_class_waitlist(db_conn, cursor, waitlist_data: dict):
+    # No payment fields: what the promoted booking owes is decided from the class price at promotion
+    required_fields = ['class_id', 'member_id']
+    try:
+        validated_data = validate_payload(waitlist_data, required_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Waitlist data validation error: {str(e)}")
+
+    class_info = get_class_by_id(db_conn, cursor, validated_data['class_id'])
+    if class_info['current_participants'] < class_info['max_participants']:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Class has free seats; book it directly.")
+
+    sql = get_sql("class_waitlist_create")
+    try:
+        cursor.execute(sql, validated_data)
+        waitlist_id = cursor.lastrowid
+        if not waitlist_id:
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to join waitlist.")
+        entry = get_class_waitlist_entry_by_id(db_conn, cursor, waitlist_id)
+        cursor.execute(get_sql("class_waitlist_get_position"), {"class_id": entry['class_id'], "waitlist_id": waitlist_id})
+        entry['position'] = cursor.fetchone()['position']
+        return entry
+    except MySQLError as e:
+        if e.errno == 1062: # UNIQUE (class_id, member_id)
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Member is already on the waitlist for this class.")
+        if e.errno == 1452: # FK
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid class_id or member_id.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error joining waitlist: {str(e)}")
+
+def leave_class_waitlist(db_conn, cursor, waitlist_id: int):
+    sql = get_sql("class_waitlist_delete_by_id")
+    try:
+        cursor.execute(sql, (waitlist_id,))
+        if cursor.rowcount == 0:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Waitlist entry ID {waitlist_id} not found.")
+        return True
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error leaving waitlist: {str(e)}")
+
+def promote_from_class_waitlist(db_conn, cursor, class_id: int):
+    """Offer a seat that was just freed to the head of the class waitlist, in the caller's transaction.
+
+    Call it after release_class_seat: that UPDATE holds the class row lock, so concurrent
+    cancellations promote one after another and never pick the same entry. The head is one
+    index seek. For a free class the head is booked into the seat ('Free'). For a paid class
+    nothing has been paid yet, so the head gets a 'Pending' booking, which takes a seat only
+    once it is updated to 'Paid' (see update_class_booking). A 'Pending' email notification
+    is queued for the promoted member. Returns the new booking, or None if nobody is waiting.
+    """
+    try:
+        class_info = get_class_by_id(db_conn, cursor, class_id)
+        is_free = float(class_info['price'] or 0) == 0
+        while True:
+            cursor.execute(get_sql("class_waitlist_get_head_for_update"), (class_id,))
+            head = cursor.fetchone()
+            if not head:
+                return None
+            if is_free:
+                try:
+                    reserve_class_seat(db_conn, cursor, class_id)
+                except HTTPException as e:
+                    if e.status_code == status.HTTP_409_CONFLICT:
+                        return None # No seat after all (the counter was already at capacity)
+                    raise
+            booking_data = {
+                'class_id': class_id, 'member_id': head['member_id'], 'payment_status': 'Free' if is_free else 'Pending',
+                'amount_paid': 0, 'attendance_status': 'Not Attended', 'email_notification_sent': False,
+            }
+            try:
+                cursor.execute(get_sql("class_bookings_create"), booking_data)
+            except MySQLError as e:
+                if e.errno != 1062:
+                    raise
+                # Booked the class directly meanwhile: drop the stale entry and try the next one
+                if is_free:
+                    release_class_seat(db_conn, cursor, class_id)
+                cursor.execute(get_sql("class_waitlist_delete_by_id"), (head['waitlist_id'],))
+                continue
+            booking_id = cursor.lastrowid
+            cursor.execute(get_sql("class_waitlist_mark_promoted"), {"booking_id": booking_id, "waitlist_id": head['waitlist_id']})
+
+            class_when = f"class #{class_id} on {class_info['date']} at {class_info['start_time']}"
+            crud_misc.create_email_notification(db_conn, cursor, {
+                "user_id": head['user_id'],
+                "subject": "A spot opened up - you're booked" if is_free else "A spot opened up - pay to confirm",
+                "message": (f"You moved up from the waitlist and are now booked for {class_when}." if is_free else
+                            f"You moved up from the waitlist for {class_when}. Pay ${class_info['price']} to confirm your seat; "
+                            f"until then it can still be taken by another booking."),
+                "related_type": "Class Booking",
+                "related_id": booking_id,
+            })
+            return get_class_booking_by_id(db_conn, cursor, booking_id)
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error promoting from waitlist: {str(e)}")
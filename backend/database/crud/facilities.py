@@ -1,4 +1,4 @@
-from backend.database.db_utils import get_sql, format_records, validate_payload
+from backend.database.db_utils import get_sql, format_records, fetch_all_formatted, validate_payload
 from mysql.connector import Error as MySQLError
 from fastapi import HTTPException, status
 
@@ -34,7 +34,7 @@ def get_all_gym_hours(db_conn, cursor):
     sql = get_sql("gym_hours_get_all")
     try:
         cursor.execute(sql)
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
@@ -158,7 +158,7 @@ def get_all_halls(db_conn, cursor, is_active: bool = None):
 
     try:
         cursor.execute(sql, params) # params might be empty if is_active is None
-        results = format_records(cursor.fetchall())
+        results = fetch_all_formatted(cursor)
         if is_active is False: # Manual filter if SQL for active=FALSE not present
             results = [r for r in results if not r.get('is_active')]
         return results
@@ -0,0 +1,85 @@
+import json
+import os
+import socket
+import uuid
+from backend.database.db_utils import get_sql, format_records, dumps_json
+from mysql.connector import Error as MySQLError
+from fastapi import HTTPException, status
+
+# API process that queued a job, "host:pid:instance"; startup only fails jobs whose owner is gone
+JOB_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "3600"))  # Jobs of other hosts failed after this long without progress
+
+# --- BackgroundJob Operations ---
+def get_job_by_id(db_conn, cursor, job_id: str):
+    sql = get_sql("background_jobs_get_by_id")
+    try:
+        cursor.execute(sql, (job_id,))
+        job = format_records(cursor.fetchone())
+        if not job:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found.")
+        # JSON columns come back as text
+        for field in ("params", "result"):
+            if isinstance(job.get(field), (str, bytes, bytearray)):
+                job[field] = json.loads(job[field])
+        return job
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
+
+def create_job(db_conn, cursor, job_type: str, params: dict, created_by: int = None):
+    job_id = uuid.uuid4().hex
+    sql = get_sql("background_jobs_create")
+    try:
+        cursor.execute(sql, {"job_id": job_id, "job_type": job_type, "params": dumps_json(params).decode("utf-8"),
+                             "created_by": created_by, "owner": JOB_OWNER})
+        return get_job_by_id(db_conn, cursor, job_id)
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error creating job: {str(e)}")
+
+def mark_job_running(db_conn, cursor, job_id: str):
+    cursor.execute(get_sql("background_jobs_mark_running"), (job_id,))
+
+def update_job_progress(db_conn, cursor, job_id: str, progress: int, message: str = None):
+    cursor.execute(get_sql("background_jobs_update_progress"),
+                   {"job_id": job_id, "progress": max(0, min(int(progress), 100)), "progress_message": (message or "")[:255]})
+
+def mark_job_succeeded(db_conn, cursor, job_id: str, result):
+    cursor.execute(get_sql("background_jobs_mark_succeeded"), {"job_id": job_id, "result": dumps_json(result).decode("utf-8")})
+
+def mark_job_failed(db_conn, cursor, job_id: str, error: str):
+    cursor.execute(get_sql("background_jobs_mark_failed"), {"job_id": job_id, "error": error})
+
+def _owner_is_gone(owner: str) -> bool:
+    """Whether the API process named by a job's owner has certainly exited"""
+    host, pid, instance = (owner.split(":") + ["", ""])[:3]
+    if host != socket.gethostname():
+        return False  # Unknown here; left to the stale-job rule
+    if owner == JOB_OWNER:
+        return False
+    if int(pid) == os.getpid():
+        return True  # An earlier process with our pid (e.g. PID 1 in a restarted container)
+    if os.name != "posix":
+        return False  # os.kill(pid, 0) is not a liveness probe on Windows
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass  # Exists, owned by someone else
+    return False
+
+def fail_unfinished_jobs(db_conn, cursor, stale_seconds: int = JOB_STALE_SECONDS):
+    """Mark Queued/Running jobs that can no longer complete as failed; returns how many.
+
+    Jobs queued by an API process on this host that has exited died with it. Other unfinished
+    jobs may belong to a live worker (another uvicorn worker or host), so they are only failed
+    once they have reported no progress for `stale_seconds`.
+    """
+    cursor.execute(get_sql("background_jobs_get_unfinished_owners"))
+    failed = 0
+    for row in cursor.fetchall():
+        if _owner_is_gone(row["owner"]):
+            cursor.execute(get_sql("background_jobs_fail_unfinished_by_owner"), (row["owner"],))
+            failed += cursor.rowcount
+    cursor.execute(get_sql("background_jobs_fail_unfinished_stale"), (stale_seconds,))
+    return failed + cursor.rowcount
@@ -1,5 +1,6 @@
 from typing import Optional
-from backend.database.db_utils import get_sql, format_records, validate_payload
+from backend.database.db_utils import get_sql, format_records, fetch_all_formatted, validate_payload
+from backend.database.pagination import KeysetSpec, fetch_keyset_page
 from mysql.connector import Error as MySQLError
 from fastapi import HTTPException, status
 import datetime
@@ -24,7 +25,16 @@ def get_email_notifications_by_user_id(db_conn, cursor, user_id: int):
     sql = get_sql("email_notifications_get_by_user_id")
     try:
         cursor.execute(sql, (user_id,))
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
+
+EMAIL_NOTIFICATIONS_KEYSET = KeysetSpec("email_notifications", [("sent_at", "sent_at", True), ("notification_id", "notification_id", True)])
+
+def get_email_notifications_page_by_user_id(db_conn, cursor, user_id: int, page_token: str = None, limit: int = None):
+    sql = get_sql("email_notifications_get_page_by_user_id")
+    try:
+        return fetch_keyset_page(cursor, sql, EMAIL_NOTIFICATIONS_KEYSET, {"user_id": user_id}, page_token, limit)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
@@ -80,7 +90,7 @@ def get_custom_plan_requests_by_member(db_conn, cursor, member_id: int):
     sql = get_sql("custom_plan_requests_get_by_member_id")
     try:
         cursor.execute(sql, (member_id,))
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
@@ -89,7 +99,7 @@ def get_custom_plan_requests_by_assignee(db_conn, cursor, trainer_id: int):
     sql = get_sql("custom_plan_requests_get_by_trainer_id")
     try:
         cursor.execute(sql, (trainer_id,))
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
@@ -166,7 +176,16 @@ def get_financial_transactions_by_member_id(db_conn, cursor, member_id: int):
     sql = get_sql("financial_transactions_get_by_member_id")
     try:
         cursor.execute(sql, (member_id,))
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
+
+FINANCIAL_TRANSACTIONS_KEYSET = KeysetSpec("financial_transactions", [("transaction_date", "transaction_date", True), ("transaction_id", "transaction_id", True)])
+
+def get_financial_transactions_page_by_member_id(db_conn, cursor, member_id: int, page_token: str = None, limit: int = None):
+    sql = get_sql("financial_transactions_get_page_by_member_id")
+    try:
+        return fetch_keyset_page(cursor, sql, FINANCIAL_TRANSACTIONS_KEYSET, {"member_id": member_id}, page_token, limit)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
@@ -1,10 +1,26 @@
+import os
+import time
+from collections import Counter
+from datetime import date, timedelta
 from typing import Dict, List
-from backend.database.db_utils import get_sql, format_records, validate_payload
+from backend.database.db_utils import get_sql, format_records, fetch_all_formatted, validate_payload
+from backend.database.pool import after_commit
+from backend.database.active_session_index import active_session_index
+from backend.database.schedule_index import schedule_index, WeekScheduleIndex, load_week_index, slot_of, week_key
+from backend.database.week_schedule_cache import week_schedule_cache
+from backend.utils.intervals import time_to_seconds
+from backend.utils.schedule_solver import WeeklyScheduleSolver, session_to_row
 from mysql.connector import Error as MySQLError
 from fastapi import HTTPException, status
 from backend.database.crud import training_blueprints as crud_blueprints # For validating training_plan_day_id
+from backend.database.crud import miscellaneous as crud_misc # Waitlist promotion notifications
 # from backend.database.crud import user as crud_user # For validating member_id, trainer_id if needed explicitly
 
+GENERATION_INSERT_CHUNK_SIZE = int(os.getenv("SCHEDULE_INSERT_CHUNK_SIZE", "1000"))  # Rows per multi-row INSERT
+BULK_SCHEDULE_MAX_ROWS = int(os.getenv("SCHEDULE_BULK_MAX_ROWS", "2000"))
+SCHEDULE_DAYS = ("Sunday", "Monday", "Tuesday", "Wednesday", "Thursday") # weekly_schedule.day_of_week ENUM
+SCHEDULE_MEMBER_FREE_STATUSES = ("Cancelled", "No Show") # schedule_members statuses that don't take a seat
+
 # --- TrainingPreference Operations ---
 def get_training_preference_by_id(db_conn, cursor, preference_id: int):
     sql = get_sql("training_preferences_get_by_id")
@@ -22,7 +38,7 @@ def get_training_preferences_by_member_and_week(db_conn, cursor, member_id: int,
     sql = get_sql("training_preferences_get_by_member_and_week")
     try:
         cursor.execute(sql, {"member_id": member_id, "week_start_date": week_start_date})
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
@@ -110,6 +126,22 @@ def _check_schedule_overlap(cursor, schedule_data: dict, schedule_id_to_exclude:
     if overlap:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Schedule overlap detected for trainer or hall at this time. Conflicting schedule ID: {overlap['schedule_id']}")
 
+def _reserve_schedule_slot(db_conn, cursor, schedule_data: dict, schedule_id: int = None, previous: dict = None):
+    """Overlap check: the in-memory week index (when enabled) rejects most conflicts and holds the slot in
+    this process, then the SQL check (a locking read) catches sessions committed by other processes"""
+    reservation = None
+    if schedule_index.enabled:
+        reservation = schedule_index.reserve(db_conn, cursor, schedule_data, schedule_id, previous)
+    try:
+        _check_schedule_overlap(cursor, schedule_data, schedule_id_to_exclude=schedule_id)
+    except HTTPException:
+        if reservation is not None:
+            # The index missed a session committed elsewhere: drop the hold and reload the week next time
+            schedule_index.release(reservation)
+            schedule_index.invalidate(schedule_data["week_start_date"])
+        raise
+    return reservation
+
 
 def get_weekly_schedule_by_id(db_conn, cursor, schedule_id: int):
     sql = get_sql("weekly_schedule_get_by_id") # Base get without joins for simple fetch
@@ -134,7 +166,7 @@ def get_weekly_schedule_by_week(db_conn, cursor, week_start_date: str, trainer_i
         params = (week_start_date,)
     try:
         cursor.execute(sql, params)
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
@@ -152,7 +184,7 @@ def create_weekly_schedule(db_conn, cursor, schedule_data: dict):
     # crud_user.get_trainer_by_id_pk(...)
     # crud_user.get_user_by_id_pk(...)
 
-    _check_schedule_overlap(cursor, validated_data) # Check for overlaps before creating
+    reservation = _reserve_schedule_slot(db_conn, cursor, validated_data) # Check for overlaps before creating
 
     sql = get_sql("weekly_schedule_create")
     try:
@@ -160,8 +192,13 @@ def create_weekly_schedule(db_conn, cursor, schedule_data: dict):
         schedule_id = cursor.lastrowid
         if not schedule_id:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create weekly schedule.")
+        if reservation:
+            schedule_index.confirm(reservation, schedule_id)
+        week_schedule_cache.invalidate_on_commit(db_conn, validated_data["week_start_date"])
         return get_weekly_schedule_by_id(db_conn, cursor, schedule_id) # Return simple version
     except MySQLError as e:
+        if reservation:
+            schedule_index.release(reservation)
         if e.errno == 1452: # FK violation
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid hall_id, trainer_id, or created_by user_id.")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
@@ -184,8 +221,9 @@ def update_weekly_schedule(db_conn, cursor, schedule_id: int, schedule_data: dic
         "end_time": validated_data.get("end_time", existing_schedule["end_time"]),
         "hall_id": validated_data.get("hall_id", existing_schedule["hall_id"]),
         "trainer_id": validated_data.get("trainer_id", existing_schedule["trainer_id"]),
+        "status": validated_data.get("status", existing_schedule["status"]),
     }
-    _check_schedule_overlap(cursor, overlap_check_data, schedule_id_to_exclude=schedule_id)
+    reservation = _reserve_schedule_slot(db_conn, cursor, overlap_check_data, schedule_id=schedule_id, previous=existing_schedule)
 
     set_clauses = ", ".join([f"{key} = %({key})s" for key in validated_data])
     sql_template = get_sql("weekly_schedule_update_by_id")
@@ -194,26 +232,127 @@ def update_weekly_schedule(db_conn, cursor, schedule_id: int, schedule_data: dic
 
     try:
         cursor.execute(formatted_sql, update_params)
+        week_schedule_cache.invalidate_on_commit(db_conn, existing_schedule["week_start_date"], overlap_check_data["week_start_date"])
         return get_weekly_schedule_by_id(db_conn, cursor, schedule_id)
     except MySQLError as e:
+        if reservation:
+            schedule_index.release(reservation)
         if e.errno == 1452:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid hall_id or trainer_id during update.")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
 def delete_weekly_schedule(db_conn, cursor, schedule_id: int):
-    get_weekly_schedule_by_id(db_conn, cursor, schedule_id) # Existence check
+    existing_schedule = get_weekly_schedule_by_id(db_conn, cursor, schedule_id) # Existence check
     # ON DELETE CASCADE should handle schedule_members, live_sessions, live_session_attendance
     sql = get_sql("weekly_schedule_delete_by_id")
     try:
         cursor.execute(sql, (schedule_id,))
         if cursor.rowcount == 0:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Weekly schedule ID {schedule_id} not found.")
+        schedule_index.remove_on_commit(db_conn, existing_schedule["week_start_date"], schedule_id)
+        week_schedule_cache.invalidate_on_commit(db_conn, existing_schedule["week_start_date"])
         return True
     except MySQLError as e:
         if e.errno == 1451: # Should be handled by CASCADE if setup correctly
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Cannot delete schedule ID {schedule_id}: referenced by other records (ensure ON DELETE CASCADE is setup for child tables like schedule_members).")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
+def create_weekly_schedules_bulk(db_conn, cursor, slots: List[Dict], created_by: int = None):
+    """Create many weekly_schedule rows in one transaction (the commit is handled by the route).
+
+    Every row is validated and checked for overlaps in memory, against the week's existing
+    sessions and against the other rows of the batch, before anything is written. Any problem
+    rejects the whole batch with a list of per-row errors. The rows are then written with
+    multi-row INSERTs, so a 300-slot week takes a few round trips instead of ~900.
+    """
+    if not slots:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No schedule slots provided.")
+    if len(slots) > BULK_SCHEDULE_MAX_ROWS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {BULK_SCHEDULE_MAX_ROWS} slots per request (got {len(slots)}).")
+
+    required_fields = ["week_start_date", "day_of_week", "start_time", "end_time", "hall_id", "trainer_id", "max_capacity", "created_by"]
+    rows = []
+    errors = []
+    for row_number, slot_data in enumerate(slots, start=1):
+        # CSV cells arrive as strings; blank cells mean "not given"
+        slot_data = {key: value for key, value in slot_data.items() if value not in ("", None)}
+        if created_by is not None:
+            slot_data.setdefault("created_by", created_by)
+        try:
+            validated_data = validate_payload(slot_data, required_fields, [])
+            validated_data["status"] = "Scheduled" # Imported slots are always new, live sessions
+            validated_data["week_start_date"] = date.fromisoformat(week_key(validated_data["week_start_date"])).isoformat()
+            if validated_data["day_of_week"] not in SCHEDULE_DAYS:
+                raise ValueError(f"day_of_week must be one of {', '.join(SCHEDULE_DAYS)}")
+            slot = slot_of(validated_data)
+            if slot[2] <= slot[1]:
+                raise ValueError("end_time must be after start_time")
+        except (ValueError, TypeError) as e:
+            errors.append({"row": row_number, "error": str(e)})
+            continue
+        rows.append((row_number, validated_data, slot))
+    if errors:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={"message": "Invalid schedule slots; nothing was created.", "errors": errors})
+
+    # Overlaps between rows of the batch
+    batch_indexes = {}
+    for row_number, validated_data, slot in rows:
+        batch_index = batch_indexes.setdefault(validated_data["week_start_date"], WeekScheduleIndex())
+        conflict = batch_index.find_conflict(slot)
+        if conflict is not None:
+            errors.append({"row": row_number, "error": f"Overlaps row {conflict} (same trainer or hall at this time)."})
+        else:
+            batch_index.add(row_number, slot)
+
+    # Overlaps with existing sessions: hold every slot in the shared index (released on rollback) when it
+    # is enabled, then check a locked snapshot of each week, which also has what other processes committed
+    reservations = []
+    snapshots = {}
+    if not errors:
+        for row_number, validated_data, slot in rows:
+            if schedule_index.enabled:
+                try:
+                    reservations.append(schedule_index.reserve(db_conn, cursor, validated_data))
+                except HTTPException as e:
+                    errors.append({"row": row_number, "error": e.detail})
+                    continue
+            week = validated_data["week_start_date"]
+            if week not in snapshots:
+                snapshots[week] = load_week_index(cursor, week, for_update=True)
+            conflict = snapshots[week].find_conflict(slot)
+            if conflict is not None:
+                errors.append({"row": row_number, "error": f"Schedule overlap detected for trainer or hall at this time. Conflicting schedule ID: {conflict}"})
+                schedule_index.invalidate(week)
+    if errors:
+        for reservation in reservations:
+            schedule_index.release(reservation)
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail={"message": "Schedule overlaps; nothing was created.", "errors": errors})
+
+    try:
+        _executemany_in_chunks(cursor, get_sql("weekly_schedule_create"), [validated_data for _, validated_data, _ in rows])
+        # A multi-row INSERT only reports its first id; a hall never has two live sessions starting
+        # at the same time, so (week, day, start, hall) identifies each new row
+        ids_by_slot = {}
+        for week in {validated_data["week_start_date"] for _, validated_data, _ in rows}:
+            cursor.execute(get_sql("weekly_schedule_get_intervals_by_week"), (week,))
+            for row in cursor.fetchall():
+                ids_by_slot[(week, row["day_of_week"], time_to_seconds(row["start_time"]), row["hall_id"])] = row["schedule_id"]
+    except MySQLError as e:
+        for reservation in reservations:
+            schedule_index.release(reservation)
+        if e.errno == 1452: # FK violation
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid hall_id, trainer_id, or created_by user_id in batch.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error creating schedules: {str(e)}")
+
+    week_schedule_cache.invalidate_on_commit(db_conn, *{validated_data["week_start_date"] for _, validated_data, _ in rows})
+    created = []
+    for position, (_, validated_data, slot) in enumerate(rows):
+        schedule_id = ids_by_slot.get((validated_data["week_start_date"], slot[0], slot[1], slot[3]))
+        if reservations and schedule_id is not None:
+            schedule_index.confirm(reservations[position], schedule_id)
+        created.append({"schedule_id": schedule_id, **validated_data})
+    return created
+
 
 # --- ScheduleMembers Operations ---
 def get_schedule_member_by_id(db_conn, cursor, sm_id: int): # sm_id is the PK of schedule_members
@@ -231,7 +370,7 @@ def get_schedule_members_by_schedule_id(db_conn, cursor, schedule_id: int):
     sql = get_sql("schedule_members_get_by_schedule_id")
     try:
         cursor.execute(sql, (schedule_id,))
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
@@ -240,10 +379,41 @@ def get_schedule_members_by_member_id_and_week(db_conn, cursor, member_id: int,
     sql = get_sql("schedule_members_get_by_member_id_and_week")
     try:
         cursor.execute(sql, {"member_id": member_id, "week_start_date": week_start_date})
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
+def _reserve_schedule_seat(db_conn, cursor, schedule_id: int):
+    """Take one seat with a conditional increment of weekly_schedule.current_participants; 409 if full.
+
+    The UPDATE locks the session row until the caller's transaction ends, so concurrent bookings
+    queue on it and each re-checks the committed counter: the session can't be overbooked.
+    """
+    try:
+        cursor.execute(get_sql("weekly_schedule_reserve_seat"), (schedule_id,))
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
+    if cursor.rowcount == 0:
+        get_weekly_schedule_by_id(db_conn, cursor, schedule_id) # 404 if it does not exist
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Schedule slot ID {schedule_id} is full.")
+    week_schedule_cache.invalidate_schedule_on_commit(db_conn, schedule_id)
+
+def _release_schedule_seat(db_conn, cursor, schedule_id: int):
+    try:
+        cursor.execute(get_sql("weekly_schedule_release_seat"), (schedule_id,))
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
+    week_schedule_cache.invalidate_schedule_on_commit(db_conn, schedule_id)
+
+def _sync_active_live_session_member(db_conn, cursor, schedule_id: int, member_id: int):
+    """Re-apply the active_live_sessions membership rule to a member whose booking changed while the slot is live"""
+    cursor.execute(get_sql("active_live_sessions_get_live_session_ids_by_schedule"), (schedule_id,))
+    for row in cursor.fetchall(): # Usually none: a slot is only live while it is running
+        params = {"live_session_id": row["live_session_id"], "member_id": member_id}
+        cursor.execute(get_sql("active_live_sessions_delete_member_by_live_session_id"), params)
+        cursor.execute(get_sql("active_live_sessions_add_member"), params)
+        active_session_index.add_on_commit(db_conn, cursor, row["live_session_id"])
+
 def add_member_to_schedule(db_conn, cursor, sm_data: dict):
     required_fields = ["schedule_id", "member_id"]
     optional_fields = ["status", "training_plan_day_id"]
@@ -254,19 +424,14 @@ def add_member_to_schedule(db_conn, cursor, sm_data: dict):
 
     validated_data.setdefault("status", "Assigned")
     
-    schedule_info = get_weekly_schedule_by_id(db_conn, cursor, validated_data['schedule_id'])
     # crud_user.get_member_by_id_pk(db_conn, cursor, validated_data['member_id']) # Validate member
     if validated_data.get('training_plan_day_id'):
         crud_blueprints.get_training_plan_day_by_id(db_conn, cursor, validated_data['training_plan_day_id'])
 
-    # Check capacity
-    count_sql = get_sql("schedule_members_get_count_by_schedule_id_active_status")
-    cursor.execute(count_sql, (validated_data['schedule_id'],))
-    count_result = cursor.fetchone()
-    current_members = count_result['member_count'] if count_result else 0
-
-    if current_members >= schedule_info['max_capacity']:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Schedule slot ID {schedule_info['schedule_id']} is full.")
+    if validated_data["status"] not in SCHEDULE_MEMBER_FREE_STATUSES:
+        _reserve_schedule_seat(db_conn, cursor, validated_data['schedule_id'])
+    else:
+        get_weekly_schedule_by_id(db_conn, cursor, validated_data['schedule_id']) # Existence check
 
     sql = get_sql("schedule_members_create")
     try:
@@ -274,6 +439,7 @@ def add_member_to_schedule(db_conn, cursor, sm_data: dict):
         sm_id = cursor.lastrowid
         if not sm_id:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to add member to schedule.")
+        _sync_active_live_session_member(db_conn, cursor, validated_data["schedule_id"], validated_data["member_id"])
         return get_schedule_member_by_id(db_conn, cursor, sm_id)
     except MySQLError as e:
         if e.errno == 1062: # UNIQUE (schedule_id, member_id)
@@ -283,7 +449,7 @@ def add_member_to_schedule(db_conn, cursor, sm_data: dict):
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
 def update_schedule_member(db_conn, cursor, sm_id: int, sm_data: dict):
-    get_schedule_member_by_id(db_conn, cursor, sm_id) # Existence check
+    current = get_schedule_member_by_id(db_conn, cursor, sm_id) # Existence check
     optional_fields = ["status", "training_plan_day_id"] # Member & schedule usually not changed here
     try:
         validated_data = validate_payload(sm_data, [], optional_fields)
@@ -295,6 +461,10 @@ def update_schedule_member(db_conn, cursor, sm_id: int, sm_data: dict):
     if validated_data.get('training_plan_day_id'):
         crud_blueprints.get_training_plan_day_by_id(db_conn, cursor, validated_data['training_plan_day_id'])
 
+    # Moving back from Cancelled/No Show takes a seat again
+    if current["status"] in SCHEDULE_MEMBER_FREE_STATUSES and validated_data.get("status", current["status"]) not in SCHEDULE_MEMBER_FREE_STATUSES:
+        _reserve_schedule_seat(db_conn, cursor, current["schedule_id"])
+
     set_clauses = ", ".join([f"{key} = %({key})s" for key in validated_data])
     sql_template = get_sql("schedule_members_update_by_id")
     formatted_sql = sql_template.replace("{set_clauses}", set_clauses)
@@ -302,6 +472,12 @@ def update_schedule_member(db_conn, cursor, sm_id: int, sm_data: dict):
 
     try:
         cursor.execute(formatted_sql, update_params)
+        # Cancelled or No Show frees the seat for the next member in line
+        if current["status"] not in SCHEDULE_MEMBER_FREE_STATUSES and validated_data.get("status", current["status"]) in SCHEDULE_MEMBER_FREE_STATUSES:
+            _release_schedule_seat(db_conn, cursor, current["schedule_id"])
+            promote_from_schedule_waitlist(db_conn, cursor, current["schedule_id"])
+        if validated_data.get("status", current["status"]) != current["status"]:
+            _sync_active_live_session_member(db_conn, cursor, current["schedule_id"], current["member_id"])
         return get_schedule_member_by_id(db_conn, cursor, sm_id)
     except MySQLError as e:
         if e.errno == 1452 and 'training_plan_day_id' in validated_data:
@@ -309,43 +485,172 @@ def update_schedule_member(db_conn, cursor, sm_id: int, sm_data: dict):
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
 def remove_member_from_schedule(db_conn, cursor, sm_id: int):
-    get_schedule_member_by_id(db_conn, cursor, sm_id) # Existence check
+    removed = get_schedule_member_by_id(db_conn, cursor, sm_id) # Existence check
     sql = get_sql("schedule_members_delete_by_id")
     try:
         cursor.execute(sql, (sm_id,))
         if cursor.rowcount == 0:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Schedule member link ID {sm_id} not found.")
+        if removed["status"] not in SCHEDULE_MEMBER_FREE_STATUSES:
+            _release_schedule_seat(db_conn, cursor, removed["schedule_id"])
+            promote_from_schedule_waitlist(db_conn, cursor, removed["schedule_id"])
+        _sync_active_live_session_member(db_conn, cursor, removed["schedule_id"], removed["member_id"])
         return True
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")  
 
+def reconcile_schedule_participant_counts(db_conn, cursor, week_start_date: str = None, progress=None):
+    """Repair weekly_schedule.current_participants wherever it drifted from schedule_members.
 
-def batch_upsert_training_preferences(db_conn, cursor, member_id: int, week_start_date: str, preferences_list: List[Dict]):
-    # This function will delete all existing preferences for the member and week,
-    # then insert all new ones. This is a common "replace all" strategy for batch.
-    # Alternatively, one could try to update existing and insert new, which is more complex.
+    Drift comes from edits that bypass the booking CRUD (manual SQL, restored backups, older
+    code). Each drifted session is recounted under its row lock, so bookings made meanwhile
+    are not lost. Runs as a background job; pass a week to check only that week.
+    """
+    progress = progress or (lambda percent, message=None: None)
+    try:
+        progress(10, "Looking for drifted participant counts")
+        cursor.execute(get_sql("weekly_schedule_get_participant_count_drift"), {"week_start_date": week_start_date})
+        drifted = cursor.fetchall()
+        repaired = []
+        for position, row in enumerate(drifted, start=1):
+            cursor.execute(get_sql("weekly_schedule_recount_participants"), {"schedule_id": row["schedule_id"]})
+            week_schedule_cache.invalidate_on_commit(db_conn, row["week_start_date"])
+            repaired.append({"schedule_id": row["schedule_id"], "stored": row["current_participants"], "actual": row["actual_participants"]})
+            if position % 100 == 0:
+                progress(10 + 85 * position // len(drifted), f"Repaired {position}/{len(drifted)} sessions")
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error reconciling participant counts: {str(e)}")
+    return {"week_start_date": week_start_date, "sessions_repaired": len(repaired), "repairs": repaired[:1000]}
 
-    # Validate member_id
-    # crud_user.get_member_by_id_pk(db_conn, cursor, member_id) 
 
-    # Step 1: Delete existing preferences for this member and week
-    delete_sql = get_sql("training_preferences_delete_by_member_and_week")
+# --- ScheduleWaitlist Operations ---
+def get_schedule_waitlist_entry_by_id(db_conn, cursor, waitlist_id: int):
+    sql = get_sql("schedule_waitlist_get_by_id")
+    try:
+        cursor.execute(sql, (waitlist_id,))
+        record = format_records(cursor.fetchone())
+        if not record:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Schedule waitlist entry ID {waitlist_id} not found.")
+        return record
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
+
+def get_schedule_waitlist(db_conn, cursor, schedule_id: int):
+    """Members waiting for a session, first in line first, with their 1-based position"""
+    get_weekly_schedule_by_id(db_conn, cursor, schedule_id) # Existence check
+    sql = get_sql("schedule_waitlist_get_waiting_by_schedule_id")
+    try:
+        cursor.execute(sql, (schedule_id,))
+        entries = fetch_all_formatted(cursor)
+        for position, entry in enumerate(entries, start=1):
+            entry["position"] = position
+        return entries
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
+
+def join_schedule_waitlist(db_conn, cursor, waitlist_data: dict):
+    required_fields = ["schedule_id", "member_id"]
+    optional_fields = ["training_plan_day_id"]
+    try:
+        validated_data = validate_payload(waitlist_data, required_fields, optional_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    validated_data.setdefault("training_plan_day_id", None)
+
+    schedule_info = get_weekly_schedule_by_id(db_conn, cursor, validated_data["schedule_id"])
+    if schedule_info["status"] == "Cancelled":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Schedule slot ID {schedule_info['schedule_id']} is cancelled.")
+    if schedule_info["current_participants"] < schedule_info["max_capacity"]:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Schedule slot has free seats; book it directly.")
+    try:
+        cursor.execute(get_sql("schedule_waitlist_create"), validated_data)
+        waitlist_id = cursor.lastrowid
+        if not waitlist_id:
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to join waitlist.")
+        entry = get_schedule_waitlist_entry_by_id(db_conn, cursor, waitlist_id)
+        cursor.execute(get_sql("schedule_waitlist_get_position"), {"schedule_id": entry["schedule_id"], "waitlist_id": waitlist_id})
+        entry["position"] = cursor.fetchone()["position"]
+        return entry
+    except MySQLError as e:
+        if e.errno == 1062: # UNIQUE (schedule_id, member_id)
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Member is already on the waitlist for this schedule slot.")
+        if e.errno == 1452: # FK violation
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid schedule_id, member_id, or training_plan_day_id.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
+
+def leave_schedule_waitlist(db_conn, cursor, waitlist_id: int):
+    sql = get_sql("schedule_waitlist_delete_by_id")
+    try:
+        cursor.execute(sql, (waitlist_id,))
+        if cursor.rowcount == 0:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Schedule waitlist entry ID {waitlist_id} not found.")
+        return True
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
+
+def promote_from_schedule_waitlist(db_conn, cursor, schedule_id: int):
+    """Assign the head of a session's waitlist to a seat that was just freed, in the caller's transaction.
+
+    Call it after _release_schedule_seat: that UPDATE holds the weekly_schedule row lock, so
+    concurrent cancellations promote one after another and never pick the same entry. A
+    'Pending' email notification is queued. Returns the new schedule_members row, or None.
+    """
+    if get_weekly_schedule_by_id(db_conn, cursor, schedule_id)["status"] == "Cancelled":
+        return None
     try:
-        cursor.execute(delete_sql, {"member_id": member_id, "week_start_date": week_start_date})
-        # No need to check rowcount, it's fine if none existed
+        while True:
+            cursor.execute(get_sql("schedule_waitlist_get_head_for_update"), (schedule_id,))
+            head = cursor.fetchone()
+            if not head:
+                return None
+            try:
+                _reserve_schedule_seat(db_conn, cursor, schedule_id)
+            except HTTPException as e:
+                if e.status_code == status.HTTP_409_CONFLICT:
+                    return None # No seat after all (the counter was already at capacity)
+                raise
+            sm_data = {"schedule_id": schedule_id, "member_id": head["member_id"], "status": "Assigned",
+                       "training_plan_day_id": head["training_plan_day_id"]}
+            try:
+                cursor.execute(get_sql("schedule_members_create"), sm_data)
+            except MySQLError as e:
+                if e.errno != 1062:
+                    raise
+                # Already in the session (e.g. added by a manager meanwhile): drop the stale entry
+                _release_schedule_seat(db_conn, cursor, schedule_id)
+                cursor.execute(get_sql("schedule_waitlist_delete_by_id"), (head["waitlist_id"],))
+                continue
+            sm_id = cursor.lastrowid
+            cursor.execute(get_sql("schedule_waitlist_mark_promoted"), {"schedule_member_id": sm_id, "waitlist_id": head["waitlist_id"]})
+            _sync_active_live_session_member(db_conn, cursor, schedule_id, head["member_id"])
+            session = get_weekly_schedule_by_id(db_conn, cursor, schedule_id)
+            crud_misc.create_email_notification(db_conn, cursor, {
+                "user_id": head["user_id"],
+                "subject": "A spot opened up - you're in",
+                "message": f"You moved up from the waitlist and are now assigned to the {session['day_of_week']} {session['start_time']} session (week of {session['week_start_date']}).",
+                "related_type": "General",
+                "related_id": sm_id,
+            })
+            return get_schedule_member_by_id(db_conn, cursor, sm_id)
     except MySQLError as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error deleting old preferences: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error promoting from waitlist: {str(e)}")
 
-    # Step 2: Insert new preferences
-    created_preferences = []
-    if not preferences_list: # If empty list provided, it means clear all preferences
-        return []
 
-    create_sql = get_sql("training_preferences_create")
+def batch_upsert_training_preferences(db_conn, cursor, member_id: int, week_start_date: str, preferences_list: List[Dict]):
+    """Make the member's preferences for the week exactly `preferences_list`, with set-based writes.
+
+    The submitted grid is diffed against the stored rows (one SELECT): unchanged slots are left
+    alone, removed slots go in one DELETE, and new or changed slots in one multi-row
+    INSERT ... ON DUPLICATE KEY UPDATE. The final set is returned from a single SELECT, so a
+    full grid costs a constant number of round trips instead of 2N+1.
+    """
+    # Validate member_id
+    # crud_user.get_member_by_id_pk(db_conn, cursor, member_id) 
+
     required_pref_fields = ["day_of_week", "start_time", "end_time", "preference_type"]
     optional_pref_fields = ["trainer_id"]
-
-    for pref_data in preferences_list:
+    desired = {} # (day_of_week, start, end) in seconds -> validated row; a repeated slot keeps its last entry
+    for pref_data in preferences_list or []:
         try:
             # Add member_id and week_start_date from function params, not expecting in each pref_data item
             full_pref_data = {
@@ -356,70 +661,158 @@ def batch_upsert_training_preferences(db_conn, cursor, member_id: int, week_star
             validated_data = validate_payload(full_pref_data, 
                                                 ["member_id", "week_start_date"] + required_pref_fields, 
                                                 optional_pref_fields)
+            slot_key = (validated_data["day_of_week"], time_to_seconds(validated_data["start_time"]), time_to_seconds(validated_data["end_time"]))
         except ValueError as e:
             # Skip this invalid preference data or raise an error for the whole batch
             print(f"Skipping invalid preference data: {pref_data} due to {str(e)}")
-            continue # Or raise HTTPException for the batch
+            continue
+        validated_data.setdefault("trainer_id", None)
+        desired[slot_key] = validated_data
 
-        try:
-            cursor.execute(create_sql, validated_data)
-            pref_id = cursor.lastrowid
-            if pref_id:
-                # Fetching each one individually after insert can be slow for large batches.
-                # Consider returning the input data with the new ID, or just a success count.
-                # For now, let's get the created one for consistency.
-                created_preferences.append(get_training_preference_by_id(db_conn, cursor, pref_id))
-            else:
-                # This shouldn't happen if execute was successful and table has autoincrement
-                print(f"Warning: No lastrowid for preference: {validated_data}")
-        except MySQLError as e:
-            # If one insert fails, the whole transaction (managed by the route) should roll back.
-            if e.errno == 1062: # Unique constraint
-                    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Preference slot conflict for {validated_data.get('day_of_week')} {validated_data.get('start_time')}.")
-            if e.errno == 1452: # FK (e.g. bad trainer_id if provided)
-                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid trainer_id for preference.")
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error inserting preference: {str(e)}")
-            
-    return created_preferences
-
-def generate_weekly_schedule_for_week(db_conn, cursor, week_start_date_str: str, created_by_user_id: int):
-    # This is a placeholder for a complex scheduling algorithm.
-    # A real implementation would:
-    # 1. Fetch all preferences for the week.
-    #    sql_prefs = "SELECT * FROM training_preferences WHERE week_start_date = %s AND preference_type IN ('Preferred', 'Available')"
-    #    cursor.execute(sql_prefs, (week_start_date_str,))
-    #    preferences = cursor.fetchall()
-    #
-    # 2. Group preferences by member, then by desired slot (day, time, potentially trainer).
-    #
-    # 3. For each desired slot/member:
-    #    a. Find available trainers (check existing weekly_schedule for conflicts for preferred trainer, or general availability).
-    #    b. Find available halls (check existing weekly_schedule for conflicts).
-    #    c. If match found:
-    #       i. Create a weekly_schedule entry.
-    #          schedule_data = { ... "created_by": created_by_user_id ... }
-    #          created_schedule = create_weekly_schedule(db_conn, cursor, schedule_data) # This create_weekly_schedule already checks for overlap
-    #       ii. Create a schedule_members entry linking the member to this new schedule.
-    #           sm_data = {"schedule_id": created_schedule['schedule_id'], "member_id": pref['member_id'], "status": "Assigned"}
-    #           add_member_to_schedule(db_conn, cursor, sm_data) # This add_member_to_schedule already checks capacity
-    #
-    # 4. Handle conflicts, prioritization, fairness etc. (this is the hard part).
-    #
-    # For this example, we'll just return a success message.
-    # In a real system, this function would modify the database and potentially return stats.
-    
-    print(f"Placeholder: Schedule generation initiated for week {week_start_date_str} by user {created_by_user_id}.")
-    # Simulate some action
-    # Example: Check if any preferences exist for that week.
-    sql_prefs_exist = get_sql("training_preferences_check_for_week") # Needs: SELECT 1 FROM training_preferences WHERE week_start_date = %s LIMIT 1;
-    try:
-        cursor.execute(sql_prefs_exist, (week_start_date_str,))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No training preferences found for week {week_start_date_str} to generate a schedule from.")
+    week_params = {"member_id": member_id, "week_start_date": week_start_date}
+    try:
+        cursor.execute(get_sql("training_preferences_get_by_member_and_week"), week_params)
+        existing = {
+            (row["day_of_week"], time_to_seconds(row["start_time"]), time_to_seconds(row["end_time"])): row
+            for row in cursor.fetchall()
+        }
+
+        stale_ids = [row["preference_id"] for slot_key, row in existing.items() if slot_key not in desired]
+        changed_rows = []
+        for slot_key, validated_data in desired.items():
+            row = existing.get(slot_key)
+            trainer_id = validated_data["trainer_id"]
+            if (row is None or row["preference_type"] != validated_data["preference_type"]
+                    or row["trainer_id"] != (int(trainer_id) if trainer_id is not None else None)):
+                changed_rows.append(validated_data)
+
+        if stale_ids:
+            id_params = {f"id_{i}": preference_id for i, preference_id in enumerate(stale_ids)}
+            delete_sql = get_sql("training_preferences_delete_by_ids").replace(
+                "{id_placeholders}", ", ".join(f"%({name})s" for name in id_params))
+            cursor.execute(delete_sql, {"member_id": member_id, **id_params})
+        if changed_rows:
+            # executemany sends this as one multi-row INSERT ... ON DUPLICATE KEY UPDATE
+            cursor.executemany(get_sql("training_preferences_upsert"), changed_rows)
+
+        cursor.execute(get_sql("training_preferences_get_by_member_and_week"), week_params)
+        return fetch_all_formatted(cursor)
     except MySQLError as e:
-         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error checking preferences: {str(e)}")
+        # If a write fails, the whole transaction (managed by the route) should roll back.
+        if e.errno == 1452: # FK (e.g. bad trainer_id if provided)
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid trainer_id for preference.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error saving preferences: {str(e)}")
 
-    # Actual generation logic would go here.
-    # If successful, it would have made INSERTs. The commit is handled by the route.
-    
-    return {"message": f"Schedule generation process initiated for week {week_start_date_str}. Check the schedule to see results."}
\ No newline at end of file
+def apply_training_preference_changes(db_conn, cursor, upserts: List[Dict], deletes: List[Dict]):
+    """Write buffered single-slot edits of any number of members: multi-row upserts, then slot DELETEs.
+
+    Rows are full training_preferences rows (see preference_buffer.normalize_preference_edit);
+    `deletes` only need the slot columns. The caller owns the transaction.
+    """
+    try:
+        if upserts:
+            _executemany_in_chunks(cursor, get_sql("training_preferences_upsert"), upserts)
+        delete_template = get_sql("training_preferences_delete_by_slots")
+        for offset in range(0, len(deletes), GENERATION_INSERT_CHUNK_SIZE):
+            chunk = deletes[offset:offset + GENERATION_INSERT_CHUNK_SIZE]
+            slot_params, placeholders = {}, []
+            for i, row in enumerate(chunk):
+                for column in ("member_id", "week_start_date", "day_of_week", "start_time", "end_time"):
+                    slot_params[f"{column}_{i}"] = row[column]
+                placeholders.append(f"(%(member_id_{i})s, %(week_start_date_{i})s, %(day_of_week_{i})s, %(start_time_{i})s, %(end_time_{i})s)")
+            cursor.execute(delete_template.replace("{slot_placeholders}", ", ".join(placeholders)), slot_params)
+        return len(upserts) + len(deletes)
+    except MySQLError as e:
+        if e.errno == 1452: # FK: unknown member_id or trainer_id
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid member_id or trainer_id for preference.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error saving preferences: {str(e)}")
+
+def _load_schedule_generation_input(cursor, week_start_date_str: str):
+    """Everything the solver needs for one week, as raw rows (TIME columns stay timedelta)"""
+    week_start = date.fromisoformat(week_start_date_str)
+    week_params = {"week_start_date": week_start_date_str}
+
+    cursor.execute(get_sql("training_preferences_get_for_week"), week_params)
+    preferences = cursor.fetchall()
+    if not preferences:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No training preferences found for week {week_start_date_str} to generate a schedule from.")
+    cursor.execute(get_sql("halls_get_all_active"))
+    halls = cursor.fetchall()
+    cursor.execute(get_sql("trainers_get_all_active"))
+    trainers = cursor.fetchall()
+    cursor.execute(get_sql("gym_hours_get_all"))
+    gym_hours = cursor.fetchall()
+    cursor.execute(get_sql("weekly_schedule_get_active_by_week_with_counts"), week_params)
+    existing_sessions = cursor.fetchall()
+    cursor.execute(get_sql("schedule_members_get_active_by_week"), week_params)
+    existing_assignments = cursor.fetchall()
+    cursor.execute(get_sql("classes_get_blocking_by_date_range"),
+                   {"start_date": week_start, "end_date": week_start + timedelta(days=6)})
+    classes = cursor.fetchall()
+    return preferences, {
+        "halls": halls, "trainers": trainers, "gym_hours": gym_hours, "existing_sessions": existing_sessions,
+        "existing_assignments": existing_assignments, "blocking_events": classes,
+    }
+
+def _executemany_in_chunks(cursor, sql, rows: list):
+    # executemany turns an INSERT ... VALUES into one multi-row statement per chunk
+    for offset in range(0, len(rows), GENERATION_INSERT_CHUNK_SIZE):
+        cursor.executemany(sql, rows[offset:offset + GENERATION_INSERT_CHUNK_SIZE])
+
+def generate_weekly_schedule_for_week(db_conn, cursor, week_start_date_str: str, created_by_user_id: int, progress=None):
+    """Build the week's sessions from training_preferences and book members into them.
+
+    Runs the in-memory solver (utils/schedule_solver.py) over one snapshot of the week, then writes
+    new weekly_schedule and schedule_members rows with multi-row INSERTs. Existing sessions and
+    bookings are kept and filled first, so re-running for the same week only adds what is missing.
+    The commit is handled by the caller (normally the background job runner, which passes
+    `progress(percent, message)`).
+    """
+    progress = progress or (lambda percent, message=None: None)
+    try:
+        date.fromisoformat(week_start_date_str)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid week start date: {week_start_date_str}")
+
+    started = time.perf_counter()
+    try:
+        progress(5, "Loading preferences, halls and trainers")
+        preferences, solver_input = _load_schedule_generation_input(cursor, week_start_date_str)
+        progress(20, f"Solving {len(preferences)} preferences")
+        solver = WeeklyScheduleSolver(**solver_input)
+        new_sessions, new_assignments, stats = solver.solve(preferences)
+        progress(50, f"Saving {stats['sessions_created']} sessions")
+
+        if new_sessions:
+            session_rows = [session_to_row(s, week_start_date_str, created_by_user_id) for s in new_sessions]
+            _executemany_in_chunks(cursor, get_sql("weekly_schedule_create"), session_rows)
+            # Multi-row INSERTs do not report every new id; a hall never has two live sessions
+            # starting at the same time, so (day, start, hall) identifies each new row
+            cursor.execute(get_sql("weekly_schedule_get_active_by_week_with_counts"), {"week_start_date": week_start_date_str})
+            ids_by_slot = {(row["day_of_week"], time_to_seconds(row["start_time"]), row["hall_id"]): row["schedule_id"]
+                           for row in cursor.fetchall()}
+            for session in new_sessions:
+                session["schedule_id"] = ids_by_slot[(session["day_of_week"], session["start"], session["hall_id"])]
+
+        if new_assignments:
+            progress(75, f"Saving {len(new_assignments)} member assignments")
+            member_rows = [
+                {"schedule_id": solver.sessions[ref]["schedule_id"], "member_id": member_id, "status": "Assigned", "training_plan_day_id": None}
+                for ref, member_id in new_assignments
+            ]
+            _executemany_in_chunks(cursor, get_sql("schedule_members_create"), member_rows)
+            added = Counter(row["schedule_id"] for row in member_rows)
+            cursor.executemany(get_sql("weekly_schedule_add_participants"),
+                               [{"schedule_id": schedule_id, "added": count} for schedule_id, count in added.items()])
+        if new_sessions:
+            after_commit(db_conn, lambda: schedule_index.invalidate(week_start_date_str))
+        week_schedule_cache.invalidate_on_commit(db_conn, week_start_date_str)
+    except MySQLError as e:
+        if e.errno == 1452:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid hall, trainer or member reference during schedule generation: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error generating schedule: {str(e)}")
+
+    stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    print(f"DEBUG:scheduling.py, generated week {week_start_date_str}: {stats}")
+    return {"message": f"Generated schedule for week {week_start_date_str}: {stats['sessions_created']} new sessions, {stats['members_assigned']} member assignments.",
+            "week_start_date": week_start_date_str, **stats}
@@ -1,4 +1,5 @@
-from backend.database.db_utils import get_sql, format_records, validate_payload
+from backend.database.db_utils import get_sql, format_records, fetch_all_formatted, validate_payload
+from backend.database.pagination import KeysetSpec, fetch_keyset_page
 from mysql.connector import Error as MySQLError
 from fastapi import HTTPException, status
 
@@ -23,7 +24,16 @@ def get_all_exercises(db_conn, cursor, is_active: bool = None):
         sql = get_sql("exercises_get_all")
     try:
         cursor.execute(sql, params)
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error fetching exercises: {str(e)}")
+
+EXERCISES_KEYSET = KeysetSpec("exercises", [("name", "name", False), ("exercise_id", "exercise_id", False)])
+
+def get_exercises_page(db_conn, cursor, is_active: bool = None, page_token: str = None, limit: int = None):
+    sql = get_sql("exercises_get_page")
+    try:
+        return fetch_keyset_page(cursor, sql, EXERCISES_KEYSET, {"is_active": is_active}, page_token, limit)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error fetching exercises: {str(e)}")
 
@@ -105,12 +115,12 @@ def get_training_plan_by_id(db_conn, cursor, plan_id: int):
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
-def get_training_plan_detailed_by_id(db_conn, cursor, plan_id: int):
-    """Get a training plan with all its days and exercises"""
+def get_training_plan_detailed_by_id(db_conn, cursor, plan_id: int, formatted: bool = True):
+    """Get a training plan with all its days and exercises (formatted=False keeps raw DB values for FastJSONResponse)"""
     sql = get_sql("training_plans_get_detailed_by_id")
     try:
         cursor.execute(sql, (plan_id,))
-        rows = format_records(cursor.fetchall())
+        rows = fetch_all_formatted(cursor) if formatted else cursor.fetchall()
         
         if not rows:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Training plan ID {plan_id} not found.")
@@ -201,7 +211,18 @@ def get_all_training_plans(db_conn, cursor, is_active: bool = None, trainer_id:
 
     try:
         cursor.execute(base_sql, tuple(params))
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
+
+
+TRAINING_PLANS_KEYSET = KeysetSpec("training_plans", [("title", "title", False), ("plan_id", "plan_id", False)])
+
+def get_training_plans_page(db_conn, cursor, is_active: bool = None, trainer_id: int = None, page_token: str = None, limit: int = None):
+    sql = get_sql("training_plans_get_page")
+    params = {"is_active": is_active, "trainer_id": trainer_id}
+    try:
+        return fetch_keyset_page(cursor, sql, TRAINING_PLANS_KEYSET, params, page_token, limit)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
@@ -299,7 +320,7 @@ def get_training_plan_days_by_plan_id(db_conn, cursor, plan_id: int):
     sql = get_sql("training_plan_days_get_by_plan_id")
     try:
         cursor.execute(sql, (plan_id,))
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
@@ -394,7 +415,7 @@ def get_training_day_exercises_by_day_id(db_conn, cursor, day_id: int):
     sql = get_sql("training_day_exercises_get_by_day_id")
     try:
         cursor.execute(sql, (day_id,))
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
@@ -1,7 +1,9 @@
 from typing import Optional
-from backend.database.db_utils import get_sql, format_records, validate_payload
+from backend.database.db_utils import get_sql, format_records, fetch_all_formatted, validate_payload
 from mysql.connector import Error as MySQLError
 from fastapi import HTTPException, status
+from backend.utils.live_events import live_session_hub
+from backend.database.active_session_index import active_session_index
 import datetime # For current time if needed
 
 # Import other CRUDs if FK validation is done explicitly (e.g. for member_id, plan_id)
@@ -30,7 +32,7 @@ def get_member_active_plans_by_member_id(db_conn, cursor, member_id: int, active
         sql = get_sql("member_active_plans_get_by_member_id")
     try:
         cursor.execute(sql, (member_id,))
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
@@ -116,7 +118,7 @@ def start_live_session(db_conn, cursor, schedule_id: int, notes: Optional[str] =
     # Check if there's already an active live session for this schedule_id
     active_sql = get_sql("live_sessions_get_by_schedule_id") # Modify or add a new one for active only
     cursor.execute(active_sql, (schedule_id,))
-    existing_sessions = format_records(cursor.fetchall())
+    existing_sessions = fetch_all_formatted(cursor)
     for sess in existing_sessions:
         if sess['status'] in ['Started', 'In Progress']:
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Schedule ID {schedule_id} already has an active live session (ID: {sess['live_session_id']}).")
@@ -133,12 +135,21 @@ def start_live_session(db_conn, cursor, schedule_id: int, notes: Optional[str] =
         live_session_id = cursor.lastrowid
         if not live_session_id:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to start live session.")
-        return get_live_session_by_id(db_conn, cursor, live_session_id)
+        _index_active_live_session(db_conn, cursor, live_session_id)
+        live_session = get_live_session_by_id(db_conn, cursor, live_session_id)
+        live_session_hub.publish_on_commit(db_conn, "session_status", live_session_id, live_session)
+        return live_session
     except MySQLError as e:
         if e.errno == 1452:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid schedule_id.")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
+def _index_active_live_session(db_conn, cursor, live_session_id: int):
+    # active_live_sessions rows for the trainer and the members (booked or checked in), so /live-sessions/current needs no join
+    cursor.execute(get_sql("active_live_sessions_add_trainer"), (live_session_id,))
+    cursor.execute(get_sql("active_live_sessions_add_members"), {"live_session_id": live_session_id})
+    active_session_index.add_on_commit(db_conn, cursor, live_session_id)
+
 def update_live_session_status(db_conn, cursor, live_session_id: int, new_status: str, notes: Optional[str] = None):
     live_session = get_live_session_by_id(db_conn, cursor, live_session_id) # Existence and fetch current notes
 
@@ -162,7 +173,16 @@ def update_live_session_status(db_conn, cursor, live_session_id: int, new_status
     sql = get_sql("live_sessions_update_status_and_end_time") # Or a more generic update
     try:
         cursor.execute(sql, update_data)
-        return get_live_session_by_id(db_conn, cursor, live_session_id)
+        if new_status in ['Completed', 'Cancelled']:
+            cursor.execute(get_sql("active_live_sessions_delete_by_live_session_id"), (live_session_id,))
+            active_session_index.remove_on_commit(db_conn, live_session_id)
+        elif live_session['status'] in ['Completed', 'Cancelled']: # Reopened
+            _index_active_live_session(db_conn, cursor, live_session_id)
+        else:
+            active_session_index.set_status_on_commit(db_conn, live_session_id, new_status)
+        updated_session = get_live_session_by_id(db_conn, cursor, live_session_id)
+        live_session_hub.publish_on_commit(db_conn, "session_status", live_session_id, updated_session)
+        return updated_session
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
@@ -193,7 +213,12 @@ def member_check_in_live_session(db_conn, cursor, live_session_id: int, member_i
         att_id = cursor.lastrowid
         if not att_id:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to check in member.")
-        return get_live_session_attendance_by_id(db_conn, cursor, att_id)
+        attendance = get_live_session_attendance_by_id(db_conn, cursor, att_id)
+        # Members who check in without a booking are part of the session too
+        cursor.execute(get_sql("active_live_sessions_add_checked_in_member"), {"live_session_id": live_session_id, "member_id": member_id})
+        active_session_index.add_member_on_commit(db_conn, live_session_id, member_id)
+        live_session_hub.publish_on_commit(db_conn, "check_in", live_session_id, attendance)
+        return attendance
     except MySQLError as e:
         if e.errno == 1062: # Unique constraint (live_session_id, member_id)
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Attendance record for this member and session already exists (possibly with different status).")
@@ -226,7 +251,9 @@ def update_live_session_attendance_status(db_conn, cursor, attendance_id: int, n
     sql = get_sql("live_session_attendance_update_check_out_or_status")
     try:
         cursor.execute(sql, update_data)
-        return get_live_session_attendance_by_id(db_conn, cursor, attendance_id)
+        updated_attendance = get_live_session_attendance_by_id(db_conn, cursor, attendance_id)
+        live_session_hub.publish_on_commit(db_conn, "attendance", updated_attendance["live_session_id"], updated_attendance)
+        return updated_attendance
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
@@ -246,8 +273,55 @@ def get_attendance_for_live_session(db_conn, cursor, live_session_id: int):
     sql = get_sql("live_session_attendance_get_by_live_session_id")
     try:
         cursor.execute(sql, (live_session_id,))
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
+
+# --- Live exercise progress ---
+EXERCISE_PROGRESS_REQUIRED_FIELDS = ["member_id", "exercise_id"]
+EXERCISE_PROGRESS_OPTIONAL_FIELDS = ["sets_completed", "actual_reps", "weight_used", "comments", "completed"]
+
+def record_exercise_progress(db_conn, cursor, live_session_id: int, progress_data: dict):
+    """Broadcast a member's progress on one exercise to the dashboards following the session.
+
+    Progress is not stored here; the completed session's workout log is written from the
+    exercises passed when it ends (see log_workouts_for_completed_session).
+    """
+    live_session = get_live_session_by_id(db_conn, cursor, live_session_id)
+    if live_session['status'] not in ['Started', 'In Progress']:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Live session ID {live_session_id} is not active (status: {live_session['status']}).")
+    try:
+        progress = validate_payload(progress_data, EXERCISE_PROGRESS_REQUIRED_FIELDS, EXERCISE_PROGRESS_OPTIONAL_FIELDS)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    progress["live_session_id"] = live_session_id
+    progress["recorded_at"] = datetime.datetime.now().isoformat()
+    live_session_hub.publish_on_commit(db_conn, "progress", live_session_id, progress)
+    return progress
+
+def apply_live_session_checkpoint(db_conn, cursor, session_rows: list, attendance_rows: list):
+    """Write a batch of in-memory live session changes in the caller's transaction.
+
+    `session_rows` update status/end_time/notes; `attendance_rows` are upserted on
+    (live_session_id, member_id), all with one executemany each. Returns the attendance rows of
+    the sessions touched, as stored (with their ids).
+    """
+    try:
+        if session_rows:
+            cursor.executemany(get_sql("live_sessions_update_status_and_end_time"), session_rows)
+        if not attendance_rows:
+            return []
+        cursor.executemany(get_sql("live_session_attendance_upsert"), attendance_rows)
+        # The store indexed these check-ins in memory already; this keeps them across index rebuilds
+        cursor.executemany(get_sql("active_live_sessions_add_checked_in_member"),
+                           [{"live_session_id": row["live_session_id"], "member_id": row["member_id"]} for row in attendance_rows])
+        session_ids = list(dict.fromkeys(row["live_session_id"] for row in attendance_rows))
+        sql, id_params = _sql_with_id_list("live_session_attendance_get_by_live_session_ids", session_ids)
+        cursor.execute(sql, id_params)
+        return fetch_all_formatted(cursor)
     except MySQLError as e:
+        if e.errno == 1452:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid live_session_id or member_id in attendance.")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
 
@@ -305,43 +379,104 @@ def get_logged_workouts_by_member_id(db_conn, cursor, member_id: int):
     sql = get_sql("logged_workouts_get_by_member_id")
     try:
         cursor.execute(sql, (member_id,))
-        workouts = format_records(cursor.fetchall())
+        workouts = fetch_all_formatted(cursor)
         # Optionally, fetch exercises for each workout here if needed in a list view, or do it on demand
         return workouts
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
+LOGGED_EXERCISE_REQUIRED_FIELDS = ["exercise_id", "order_in_workout"]
+LOGGED_EXERCISE_OPTIONAL_FIELDS = [
+    "training_day_exercise_id", "sets_prescribed", "reps_prescribed", "weight_prescribed",
+    "rest_prescribed_seconds", "duration_prescribed_seconds", "sets_completed", "reps_actual_per_set",
+    "weight_actual_per_set", "rest_actual_seconds_per_set", "duration_actual_seconds",
+    "notes_exercise_specific", "completed_at"
+]
+
+def _validate_logged_exercise(exercise_log_data: dict, logged_workout_id: int) -> dict:
+    """logged_workout_exercises_create_single parameters for one exercise (missing optional fields as None)"""
+    try:
+        validated_data = validate_payload(exercise_log_data, LOGGED_EXERCISE_REQUIRED_FIELDS, LOGGED_EXERCISE_OPTIONAL_FIELDS)
+    except ValueError as e:
+        # Rollback should happen at higher level (create_logged_workout)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid exercise log data: {str(e)} for exercise order {exercise_log_data.get('order_in_workout')}")
+    return {**dict.fromkeys(LOGGED_EXERCISE_OPTIONAL_FIELDS), **validated_data, "logged_workout_id": logged_workout_id}
+
+def _sql_with_id_list(sql_name: str, ids) -> tuple:
+    """(sql, params) for a registry query whose IN ({id_placeholders}) list gets `ids`"""
+    id_params = {f"id_{i}": value for i, value in enumerate(ids)}
+    return get_sql(sql_name).replace("{id_placeholders}", ", ".join(f"%({name})s" for name in id_params)), id_params
+
+def _describe_exercise_row(row: dict, several_workouts: bool) -> str:
+    if several_workouts:
+        return f"workout {row['logged_workout_id']} order {row['order_in_workout']}"
+    return f"order {row['order_in_workout']}"
+
+def _insert_logged_exercise_rows(db_conn, cursor, exercise_rows: list):
+    """Insert validated logged_workout_exercises rows with one multi-row INSERT.
+
+    A failed multi-row statement does not say which row was at fault, so on a constraint error
+    the batch is checked with set queries (unknown exercise ids, orders already logged) and the
+    error names the offending order_in_workout values.
+    """
+    several_workouts = len({row['logged_workout_id'] for row in exercise_rows}) > 1
+    try:
+        # executemany sends this as one multi-row INSERT
+        cursor.executemany(get_sql("logged_workout_exercises_create_single"), exercise_rows)
+        return
+    except MySQLError as e:
+        error = e
+    try:
+        if error.errno == 1452: # FK: exercise_id or training_day_exercise_id
+            sql, params = _sql_with_id_list("exercises_get_existing_ids", {row['exercise_id'] for row in exercise_rows})
+            cursor.execute(sql, params)
+            known_exercises = {str(row['exercise_id']) for row in cursor.fetchall()}
+            plan_exercise_ids = {row['training_day_exercise_id'] for row in exercise_rows if row['training_day_exercise_id'] is not None}
+            known_plan_exercises = set()
+            if plan_exercise_ids:
+                sql, params = _sql_with_id_list("training_day_exercises_get_existing_ids", plan_exercise_ids)
+                cursor.execute(sql, params)
+                known_plan_exercises = {str(row['id']) for row in cursor.fetchall()}
+            bad_rows = [_describe_exercise_row(row, several_workouts) for row in exercise_rows
+                        if str(row['exercise_id']) not in known_exercises
+                        or (row['training_day_exercise_id'] is not None and str(row['training_day_exercise_id']) not in known_plan_exercises)]
+            detail = f"Invalid FK for logged exercise ({', '.join(bad_rows)})." if bad_rows else "Invalid FK for logged exercise."
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+        if error.errno == 1062: # Unique constraint on (logged_workout_id, order_in_workout)
+            sql, params = _sql_with_id_list("logged_workout_exercises_get_orders_by_logged_workout_ids", {row['logged_workout_id'] for row in exercise_rows})
+            cursor.execute(sql, params)
+            logged = {(row['logged_workout_id'], str(row['order_in_workout'])) for row in cursor.fetchall()}
+            bad_rows = [_describe_exercise_row(row, several_workouts) for row in exercise_rows
+                        if (row['logged_workout_id'], str(row['order_in_workout'])) in logged]
+            detail = f"Duplicate {', '.join(bad_rows)} in logged workout." if bad_rows else "Duplicate order_in_workout in logged workout."
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
+    except MySQLError:
+        pass # Diagnosis failed; report the original error below
+    raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error logging exercises: {str(error)}")
+
 def create_logged_workout_exercises_batch(db_conn, cursor, logged_workout_id: int, exercises_data: list):
-    # This function assumes it's called within an existing transaction managed by create_logged_workout
-    sql_single = get_sql("logged_workout_exercises_create_single")
+    """Validate every exercise first, then insert them all with one multi-row INSERT.
+
+    Runs in the caller's transaction (normally create_logged_workout's). Problems are reported
+    per order_in_workout: 400 for invalid rows or unknown exercises, 409 for duplicate orders.
+    """
+    rows, errors, seen_orders = [], [], set()
     for exercise_log_data in exercises_data:
-        required_fields = ["exercise_id", "order_in_workout"]
-        optional_fields = [
-            "training_day_exercise_id", "sets_prescribed", "reps_prescribed", "weight_prescribed",
-            "rest_prescribed_seconds", "duration_prescribed_seconds", "sets_completed", "reps_actual_per_set",
-            "weight_actual_per_set", "rest_actual_seconds_per_set", "duration_actual_seconds",
-            "notes_exercise_specific", "completed_at"
-        ]
-        try:
-            validated_data = validate_payload(exercise_log_data, required_fields, optional_fields)
-        except ValueError as e:
-            # Rollback should happen at higher level (create_logged_workout)
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid exercise log data: {str(e)} for exercise order {exercise_log_data.get('order_in_workout')}")
-
-        validated_data["logged_workout_id"] = logged_workout_id
-        # crud_blueprints.get_exercise_by_id(db_conn, cursor, validated_data['exercise_id'])
-        # if validated_data.get('training_day_exercise_id'):
-        #     crud_blueprints.get_training_day_exercise_by_id(db_conn, cursor, validated_data['training_day_exercise_id'])
+        # crud_blueprints.get_exercise_by_id / get_training_day_exercise_by_id are checked by the FKs instead
         try:
-            cursor.execute(sql_single, validated_data)
-            if cursor.lastrowid is None: # Or check affected_rows for executemany
-                 raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to log exercise (order: {validated_data.get('order_in_workout')}).")
-        except MySQLError as e:
-            if e.errno == 1452:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid FK for logged exercise (order: {validated_data.get('order_in_workout')}).")
-            if e.errno == 1062: # Unique constraint on (logged_workout_id, order_in_workout)
-                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Duplicate order {validated_data.get('order_in_workout')} in logged workout.")
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error logging exercise: {str(e)}")
+            validated_data = _validate_logged_exercise(exercise_log_data, logged_workout_id)
+        except HTTPException as e:
+            errors.append({"order_in_workout": exercise_log_data.get("order_in_workout"), "error": e.detail})
+            continue
+        order = str(validated_data["order_in_workout"])
+        if order in seen_orders:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Duplicate order {order} in logged workout.")
+        seen_orders.add(order)
+        rows.append(validated_data)
+    if errors:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={"message": "Invalid exercise log data; nothing was logged.", "errors": errors})
+    if rows:
+        _insert_logged_exercise_rows(db_conn, cursor, rows)
     return True # Indicates success for batch
 
 def get_logged_workout_exercises_by_workout_id(db_conn, cursor, logged_workout_id: int):
@@ -349,10 +484,84 @@ def get_logged_workout_exercises_by_workout_id(db_conn, cursor, logged_workout_i
     sql = get_sql("logged_workout_exercises_get_by_logged_workout_id")
     try:
         cursor.execute(sql, (logged_workout_id,))
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
+def _session_duration_minutes(live_session: dict):
+    # Formatted live_sessions rows carry ISO strings, not datetimes
+    start_time, end_time = live_session.get('start_time'), live_session.get('end_time')
+    if not start_time or not end_time:
+        return None
+    if isinstance(start_time, str):
+        start_time = datetime.datetime.fromisoformat(start_time)
+    if isinstance(end_time, str):
+        end_time = datetime.datetime.fromisoformat(end_time)
+    return round((end_time - start_time).total_seconds() / 60)
+
+def log_workouts_for_completed_session(db_conn, cursor, live_session: dict, exercises_by_member: Optional[dict] = None):
+    """Create a 'from_live_session' logged workout for every member who attended, in bulk.
+
+    A fixed number of statements whatever the session size: attendees, their schedule_members
+    rows (one IN query), the workouts already logged for the session, one multi-row INSERT for
+    the workouts and, when `exercises_by_member` ({member_id: [exercise, ...]}) is given, a
+    re-read of the new ids and one multi-row INSERT for all their exercises. Members that
+    already have a log for the session are skipped, so completing a session twice does not log
+    it twice. Runs in the caller's transaction. Returns the number of workouts created.
+    """
+    live_session_id = live_session['live_session_id']
+    try:
+        cursor.execute(get_sql("live_session_attendance_get_by_live_session_id"), (live_session_id,))
+        attendee_ids = [row['member_id'] for row in cursor.fetchall() if row['status'] in ('Checked In', 'Checked Out')] # Only log for those who attended
+        if not attendee_ids:
+            return 0
+        cursor.execute(get_sql("logged_workouts_get_ids_by_live_session_id"), (live_session_id,))
+        already_logged = {row['member_id'] for row in cursor.fetchall()}
+        member_ids = [member_id for member_id in dict.fromkeys(attendee_ids) if member_id not in already_logged]
+        if not member_ids:
+            return 0
+
+        # Training plan day each member was booked for in this slot
+        sm_sql, id_params = _sql_with_id_list("schedule_members_get_by_schedule_id_and_member_ids", member_ids)
+        cursor.execute(sm_sql, {"schedule_id": live_session['schedule_id'], **id_params})
+        plan_day_by_member = {row['member_id']: row['training_plan_day_id'] for row in cursor.fetchall()}
+
+        workout_date = live_session['start_time']
+        if isinstance(workout_date, str):
+            workout_date = datetime.datetime.fromisoformat(workout_date)
+        duration = _session_duration_minutes(live_session)
+        workout_rows = [{
+            "member_id": member_id,
+            "member_active_plan_id": None, # TODO: Determine this based on the schedule_members row or other logic
+            "training_plan_day_id": plan_day_by_member.get(member_id),
+            "workout_date": workout_date,
+            "duration_minutes_actual": duration,
+            "notes_overall_session": live_session.get('notes'),
+            "source": "from_live_session",
+            "live_session_id": live_session_id,
+        } for member_id in member_ids]
+        # executemany sends each of these as one multi-row INSERT
+        cursor.executemany(get_sql("logged_workouts_create"), workout_rows)
+        created = cursor.rowcount
+
+        exercises_by_member = {int(member_id): exercises for member_id, exercises in (exercises_by_member or {}).items() if exercises}
+        if exercises_by_member:
+            # A multi-row INSERT only reports its first id; (live_session_id, member_id) identifies each new row
+            cursor.execute(get_sql("logged_workouts_get_ids_by_live_session_id"), (live_session_id,))
+            workout_id_by_member = {row['member_id']: row['logged_workout_id'] for row in cursor.fetchall()}
+            exercise_rows = [
+                _validate_logged_exercise(exercise, workout_id_by_member[member_id])
+                for member_id, exercises in exercises_by_member.items() if member_id in member_ids
+                for exercise in exercises
+            ]
+            if exercise_rows:
+                _insert_logged_exercise_rows(db_conn, cursor, exercise_rows)
+        return created
+    except MySQLError as e:
+        if e.errno == 1452:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid FK in logged workout data.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error logging session workouts: {str(e)}")
+
 # ... (update/delete for logged_workouts and logged_workout_exercises can be added if needed)
 
 
@@ -381,7 +590,7 @@ def get_weekly_training_goals_by_member_id(db_conn, cursor, member_id: int):
     sql = get_sql("weekly_training_goals_get_by_member_id")
     try:
         cursor.execute(sql, (member_id,))
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
@@ -389,7 +598,7 @@ def get_weekly_training_goals_by_week(db_conn, cursor, week_start_date: str):
     sql = get_sql("weekly_training_goals_get_by_week")
     try:
         cursor.execute(sql, (week_start_date,))
-        return format_records(cursor.fetchall())
+        return fetch_all_formatted(cursor)
     except MySQLError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
 
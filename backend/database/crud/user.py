@@ -1,4 +1,5 @@
 from backend.database.db_utils import get_sql, format_records, validate_payload
+from backend.database.pagination import KeysetSpec, fetch_keyset_page
 from mysql.connector import Error as MySQLError # Correct import
 from fastapi import HTTPException
 
@@ -9,6 +10,12 @@ def get_user_by_auth_id(db_conn, cursor, auth_id: str):
     user = cursor.fetchone()
     return format_records(user)
 
+def get_user_session_profile_by_auth_id(db_conn, cursor, auth_id: str):
+    """Get a user together with their member/trainer/manager PK in a single query"""
+    sql = get_sql("users_get_session_profile_by_auth_id")
+    cursor.execute(sql, (auth_id,))
+    return format_records(cursor.fetchone())
+
 def get_user_by_email(db_conn, cursor, email: str):
     sql = get_sql("users_get_by_email")
     cursor.execute(sql, (email,))
@@ -21,11 +28,12 @@ def get_user_by_id_pk(db_conn, cursor, user_id_pk: int):
     user = cursor.fetchone()
     return format_records(user)
 
-def get_users(db_conn, cursor, skip: int = 0, limit: int = 100):
-    sql = get_sql("users_get_all")
-    cursor.execute(sql, (limit, skip))
-    users = cursor.fetchall()
-    return format_records(users)
+USERS_KEYSET = KeysetSpec("users", [("user_id", "user_id", False)])
+
+def get_users(db_conn, cursor, page_token: str = None, limit: int = None, user_type: str = None):
+    """One keyset page of users ordered by user_id: {"items", "next_page_token", "limit"}"""
+    sql = get_sql("users_get_page")
+    return fetch_keyset_page(cursor, sql, USERS_KEYSET, {"user_type": user_type}, page_token, limit)
 
 def create_user_and_type(db_conn, user_data: dict):
     required_user_fields = ["auth_id", "email", "first_name", "last_name", "user_type"]
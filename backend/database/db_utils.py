@@ -1,76 +1,172 @@
+import difflib
+import json
 import os
 import re # For parsing named queries
+import threading
+import time as _time
 from datetime import date, datetime, time
 from decimal import Decimal
+from types import MappingProxyType
+
+class SQLQuery(str):
+    """Query text tagged with its registry key (used by the prepared-statement cache).
+
+    Templating it (e.g. .replace("{set_clauses}", ...)) returns a plain str, so dynamically
+    built SQL always stays on the text protocol.
+    """
+
+    __slots__ = ("key",)
+
+    def __new__(cls, text, key):
+        query = super().__new__(cls, text)
+        query.key = key
+        return query
 
-_SQL_QUERIES = {}
 _SQL_DIR = os.path.join(os.path.dirname(__file__), "sql_queries")
+# Modules whose get_sql("...") literals are checked against the registry at startup
+_SQL_CONSUMER_DIRS = [
+    os.path.join(os.path.dirname(__file__), "crud"),
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "routes"),
+]
+
+# "-- NAME: query_name" followed by the SQL up to the next -- NAME: or end of file.
+# Anything after the name on the NAME line (e.g. "-- NAME: check_overlap -- For updates") is a comment.
+_NAME_BLOCK_RE = re.compile(r"--\s*NAME:\s*([a-zA-Z0-9_]+)[^\n]*\n(.*?)(?=(?:--\s*NAME:|$))", re.DOTALL | re.IGNORECASE)
+_GET_SQL_CALL_RE = re.compile(r"get_sql\(\s*[\"']([a-zA-Z0-9_]+)[\"']\s*\)")
+
+SQL_HOT_RELOAD = os.getenv("SQL_HOT_RELOAD", "0").lower() in ("1", "true", "yes") # Dev only: pick up edited .sql files
+SQL_REGISTRY_CACHE = os.getenv("SQL_REGISTRY_CACHE") # Optional JSON artifact path reused while the .sql files are unchanged
+_HOT_RELOAD_CHECK_INTERVAL = 1.0 # Seconds between mtime scans in hot-reload mode
+
+# Immutable mapping, replaced wholesale (never mutated), so readers need no lock
+_SQL_QUERIES = MappingProxyType({})
+_sql_fingerprint = {}
+_registry_lock = threading.Lock()
+_last_reload_check = 0.0
+
+def _sql_files(directory):
+    for root, _, files in os.walk(directory):
+        for file_name in sorted(files):
+            if file_name.endswith(".sql"):
+                yield root, file_name
 
-def _load_queries_from_dir(directory):
+def _fingerprint(directory):
+    """{relative path: [mtime_ns, size]} for every .sql file; cheap enough to compute on each check"""
+    fingerprint = {}
+    for root, file_name in _sql_files(directory):
+        file_path = os.path.join(root, file_name)
+        stat = os.stat(file_path)
+        fingerprint[os.path.relpath(file_path, directory)] = [stat.st_mtime_ns, stat.st_size]
+    return fingerprint
+
+def _parse_queries_from_dir(directory):
+    queries = {}
+    for root, file_name in _sql_files(directory):
+        # entity_name is derived from filename, e.g., "users" from "users.sql"
+        # This will be the prefix for the query keys from this file.
+        entity_prefix = os.path.splitext(file_name)[0]
+
+        with open(os.path.join(root, file_name), "r", encoding="utf-8") as f:
+            content = f.read()
+
+        query_blocks = _NAME_BLOCK_RE.findall(content)
+        if query_blocks:
+            for query_name_in_file, query_sql in query_blocks:
+                # Construct the full key, e.g., "users_get_by_auth_id"
+                full_key = f"{entity_prefix}_{query_name_in_file.lower()}"
+                if full_key in queries:
+                    print(f"Warning: duplicate SQL key '{full_key}' in '{file_name}', the later definition wins.")
+                queries[full_key] = SQLQuery(query_sql.strip(), full_key)
+        elif content.strip(): # File has content but no valid -- NAME: tags
+            print(f"Warning: File '{file_name}' in '{root}' contains SQL but no '-- NAME:' tags or tags are improperly formatted. Queries from this file not loaded with specific names.")
+    return queries
+
+def _read_registry_cache(fingerprint):
+    try:
+        with open(SQL_REGISTRY_CACHE, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("fingerprint") == fingerprint:
+            return {key: SQLQuery(sql, key) for key, sql in cached["queries"].items()}
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+def _write_registry_cache(fingerprint, queries):
+    try:
+        tmp_path = f"{SQL_REGISTRY_CACHE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "queries": queries}, f)
+        os.replace(tmp_path, SQL_REGISTRY_CACHE)
+    except OSError as e:
+        print(f"Warning: could not write SQL registry cache '{SQL_REGISTRY_CACHE}': {e}")
+
+def load_sql_registry(directory=_SQL_DIR):
+    """Build the query registry and swap it in atomically"""
+    global _SQL_QUERIES, _sql_fingerprint
     if not os.path.exists(directory):
         print(f"Warning: SQL queries directory not found: {directory}")
         return
-    
-    _SQL_QUERIES.clear() # Clear existing queries before reloading
+    with _registry_lock:
+        fingerprint = _fingerprint(directory)
+        queries = _read_registry_cache(fingerprint) if SQL_REGISTRY_CACHE else None
+        if queries is None:
+            queries = _parse_queries_from_dir(directory)
+            if SQL_REGISTRY_CACHE:
+                _write_registry_cache(fingerprint, queries)
+        _sql_fingerprint = fingerprint
+        _SQL_QUERIES = MappingProxyType(queries)
 
-    for root, _, files in os.walk(directory):
-        for file_name in files:
-            if file_name.endswith(".sql"):
-                # entity_name is derived from filename, e.g., "users" from "users.sql"
-                # This will be the prefix for the query keys from this file.
-                entity_prefix = os.path.splitext(file_name)[0] 
-                
-                # If you have subdirectories in sql_queries, you might want to include them in the prefix
-                # For example, if you have sql_queries/auth/user_queries.sql
-                # relative_path = os.path.relpath(root, _SQL_DIR)
-                # if relative_path and relative_path != ".":
-                #     entity_prefix = f"{relative_path.replace(os.sep, '_')}_{entity_prefix}"
-
-                file_path = os.path.join(root, file_name)
-                
-                with open(file_path, "r") as f:
-                    content = f.read()
-                
-                # Regex to find "-- NAME: query_name" (case-insensitive for NAME)
-                # and the SQL that follows until the next -- NAME: or end of file.
-                # Captures: 1=query_name_in_file, 2=query_sql
-                query_blocks = re.findall(
-                    r"--\s*NAME:\s*([a-zA-Z0-9_]+)\s*\n(.*?)(?=(?:--\s*NAME:|$))", 
-                    content, 
-                    re.DOTALL | re.IGNORECASE
-                )
-
-                if query_blocks:
-                    for query_name_in_file, query_sql in query_blocks:
-                        # Construct the full key, e.g., "users_get_by_auth_id"
-                        full_key = f"{entity_prefix}_{query_name_in_file.lower()}"
-                        _SQL_QUERIES[full_key] = query_sql.strip()
-                elif content.strip() and not query_blocks: # File has content but no valid -- NAME: tags
-                    print(f"Warning: File '{file_name}' in '{root}' contains SQL but no '-- NAME:' tags or tags are improperly formatted. Queries from this file not loaded with specific names.")
+def _reload_if_changed():
+    global _last_reload_check
+    now = _time.monotonic()
+    if now - _last_reload_check < _HOT_RELOAD_CHECK_INTERVAL:
+        return
+    _last_reload_check = now
+    if _fingerprint(_SQL_DIR) != _sql_fingerprint:
+        print("SQL files changed on disk, reloading query registry (SQL_HOT_RELOAD)")
+        load_sql_registry(_SQL_DIR)
 
 def get_sql(query_key: str) -> str:
-    # Normalize query_key to lowercase to match how keys are stored if needed,
-    # but full_key is already lowercased for the query_name_in_file part.
-    # Let's assume query_key is passed as expected (e.g., "users_get_by_auth_id")
-    
-    # if not _SQL_QUERIES: # Initial load if empty
-    #     _load_queries_from_dir(_SQL_DIR)
-    # The above line can cause issues if called from multiple threads at startup.
-    # Better to ensure _load_queries_from_dir is called once when the module loads.
-
-    query = _SQL_QUERIES.get(query_key) # query_key directly
-    
+    if SQL_HOT_RELOAD:
+        _reload_if_changed()
+    query = _SQL_QUERIES.get(query_key)
     if query is None:
-        # Attempt a reload in case files were added/changed after initial app start (useful for dev)
-        print(f"Query key '{query_key}' not found, attempting to reload queries...")
-        _load_queries_from_dir(_SQL_DIR) # This will clear and reload all queries
-        query = _SQL_QUERIES.get(query_key)
-        if query is None:
-            raise ValueError(f"SQL query with key '{query_key}' not found even after reload. Loaded keys: {list(_SQL_QUERIES.keys())}")
+        # No reload here: the registry is complete after startup, a miss is a bug in the caller
+        suggestions = difflib.get_close_matches(query_key, _SQL_QUERIES.keys(), n=3)
+        hint = f" Did you mean: {', '.join(suggestions)}?" if suggestions else ""
+        raise ValueError(f"SQL query with key '{query_key}' not found.{hint}")
     return query
 
-# Initial load of queries when this module is first imported
-_load_queries_from_dir(_SQL_DIR)
+def find_missing_sql_keys(consumer_dirs=None):
+    """Scan the CRUD/route modules for get_sql("...") literals that have no query in the registry.
+
+    Returns {missing_key: [file:line, ...]}. Keys built dynamically (f-strings) are not checked.
+    """
+    missing = {}
+    for directory in consumer_dirs or _SQL_CONSUMER_DIRS:
+        if not os.path.isdir(directory):
+            continue
+        for file_name in sorted(os.listdir(directory)):
+            if not file_name.endswith(".py"):
+                continue
+            file_path = os.path.join(directory, file_name)
+            with open(file_path, "r", encoding="utf-8") as f:
+                for line_number, line in enumerate(f, start=1):
+                    for key in _GET_SQL_CALL_RE.findall(line):
+                        if key not in _SQL_QUERIES:
+                            missing.setdefault(key, []).append(f"{os.path.relpath(file_path)}:{line_number}")
+    return missing
+
+def validate_sql_registry():
+    """Report (at startup) every referenced query key that is missing from the registry"""
+    missing = find_missing_sql_keys()
+    for key, locations in missing.items():
+        print(f"❌ SQL key '{key}' is referenced but not defined in sql_queries/ ({', '.join(locations)})")
+    print(f"SQL registry: {len(_SQL_QUERIES)} queries loaded, {len(missing)} missing referenced key(s)")
+    return missing
+
+# Build the registry once when this module is first imported
+load_sql_registry(_SQL_DIR)
 
 
 # --- Helper functions for data formatting and validation ---
@@ -95,6 +191,93 @@ def format_records(records):
         return [format_datetime_fields(row) for row in records]
     return format_datetime_fields(records)
 
+# --- Column-wise formatting ---
+# MySQL protocol field type codes (mysql.connector.FieldType), hardcoded so this module stays driver-free
+_TEMPORAL_TYPES = {7, 10, 11, 12, 14}  # TIMESTAMP, DATE, TIME, DATETIME, NEWDATE
+_DECIMAL_TYPES = {0, 246}  # DECIMAL, NEWDECIMAL
+_MAYBE_BYTES_TYPES = {15, 16, 245, 249, 250, 251, 252, 253, 254, 255}  # String/blob/JSON types that can arrive as bytes
+_BINARY_FLAG = 128  # Column flag set on BINARY/VARBINARY/BLOB columns; text columns without it always decode to str
+
+def _convert_temporal(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value  # e.g. TIME columns arrive as timedelta and are left alone, as in format_datetime_fields
+
+def _convert_decimal(value):
+    return float(value) if isinstance(value, Decimal) else value
+
+def _convert_bytes(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+def build_column_converters(description):
+    """[(column_name, converter)] for the columns of a result set that may need conversion.
+
+    Integer, float, enum, ... columns never need one and are skipped entirely.
+    """
+    converters = []
+    for column in description or ():
+        name, type_code = column[0], column[1]
+        if type_code in _TEMPORAL_TYPES:
+            converters.append((name, _convert_temporal))
+        elif type_code in _DECIMAL_TYPES:
+            converters.append((name, _convert_decimal))
+        elif type_code in _MAYBE_BYTES_TYPES:
+            flags = column[7] if len(column) > 7 else None
+            if flags is None or flags & _BINARY_FLAG or type_code == 245:
+                converters.append((name, _convert_bytes))
+    return converters
+
+def format_rows_by_columns(description, rows):
+    """Same output as format_records, but converters are chosen once per column from cursor.description"""
+    if rows is None:
+        return None
+    if description is None:
+        return format_records(rows)
+    converters = build_column_converters(description)
+    single = isinstance(rows, dict)
+    row_list = [rows] if single else rows
+    for name, convert in converters:
+        for row in row_list:
+            value = row[name]
+            if value is not None:
+                row[name] = convert(value)
+    return rows
+
+def fetch_all_formatted(cursor):
+    """cursor.fetchall() formatted column-wise (drop-in for format_records(cursor.fetchall()))"""
+    return format_rows_by_columns(cursor.description, cursor.fetchall())
+
+def fetch_one_formatted(cursor):
+    """cursor.fetchone() formatted column-wise (drop-in for format_records(cursor.fetchone()))"""
+    return format_rows_by_columns(cursor.description, cursor.fetchone())
+
+try:
+    import orjson
+except ImportError:  # Optional dependency: fall back to the stdlib encoder
+    orjson = None
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8')
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if hasattr(value, "total_seconds"):
+        return value.total_seconds()  # timedelta (TIME columns), as FastAPI's jsonable_encoder does
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps_json(data) -> bytes:
+    """Serialize raw DB rows straight to JSON bytes (no format_records pass needed)"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    import json
+    return json.dumps(data, default=_json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def fetch_all_json(cursor) -> bytes:
+    """cursor.fetchall() serialized directly to JSON bytes"""
+    return dumps_json(cursor.fetchall())
+
 def validate_payload(payload: dict, required_fields: list, optional_fields: list = None):
     if optional_fields is None:
         optional_fields = []
@@ -110,8 +293,9 @@ def validate_payload(payload: dict, required_fields: list, optional_fields: list
 
 if __name__ == "__main__":
     print("Attempting to load queries...")
-    # _load_queries_from_dir(_SQL_DIR) # Already called on module load
+    # load_sql_registry(_SQL_DIR) # Already called on module load
     print("Loaded SQL Keys (on module load):", list(_SQL_QUERIES.keys()))
+    validate_sql_registry()
     try:
         print("\nFetching 'users_get_by_auth_id':") # Example key
         print(get_sql("users_get_by_auth_id"))
@@ -0,0 +1,603 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from backend.database.active_session_index import active_session_index
+from backend.database.base import get_pooled_connection
+from backend.database.crud import training_execution as crud_exec
+from backend.database.db_utils import validate_payload
+from backend.database.pool import after_commit
+from backend.utils.file_lock import ExclusiveFileLock, FileLockHeldError
+from backend.utils.live_events import live_session_hub
+
+LIVE_SESSION_CHECKPOINT_SECONDS = float(os.getenv("LIVE_SESSION_CHECKPOINT_SECONDS", "2"))  # 0 disables the store: every event is its own transaction
+LIVE_SESSION_JOURNAL_PATH = os.getenv("LIVE_SESSION_JOURNAL_PATH", "live_session_journal.log")  # One API process per file (locked at start)
+LIVE_SESSION_JOURNAL_FSYNC = os.getenv("LIVE_SESSION_JOURNAL_FSYNC", "1") == "1"
+LIVE_SESSION_JOURNAL_COMPACT_LINES = int(os.getenv("LIVE_SESSION_JOURNAL_COMPACT_LINES", "100000"))
+
+ACTIVE_STATUSES = ("Started", "In Progress")  # live_sessions held in memory; Completed/Cancelled go to the database at once
+ATTENDANCE_STATUSES = ("Checked In", "Checked Out", "No Show")
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+def _db_time(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+class LiveSessionState:
+    """One active live session: its live_sessions row, attendance by member and exercise progress"""
+
+    def __init__(self, session: dict, attendance: list):
+        self.session = session
+        self.attendance = {row["member_id"]: row for row in attendance}
+        self.progress = {}  # member_id -> {exercise_id: progress}, in the order first reported
+        self.dirty_members = {}  # member_id -> seq of its latest change not yet checkpointed
+        self.session_dirty_seq = None
+        self.closing = False  # A completion or cancellation is in flight: events are refused until it commits or fails
+        self.closed = False  # Completed or cancelled; forgotten once nothing is left to checkpoint
+
+
+class LiveSessionStore:
+    """Write-behind state for active live sessions (status 'Started' or 'In Progress').
+
+    Check-ins, attendance changes, Started/In Progress status changes and exercise progress are
+    validated and applied in memory, and reads of a held session are served from memory, so none
+    of them waits on MySQL. A background thread checkpoints the changed sessions and attendance
+    rows every `checkpoint_seconds` in one transaction (one executemany per table); completing
+    or cancelling a session stops its events (begin_close), checkpoints it, runs through the
+    database as before and drops it.
+    Exercise progress has no table of its own: it is kept until the session completes and
+    becomes the default exercise log of the workouts written then.
+
+    Every change is appended (and fsynced) to a journal before it is acknowledged, and each
+    checkpoint appends a marker. start() reloads the journalled sessions from the database and
+    replays the journal over them, so an acknowledged event survives a crash of the API process.
+    Sessions are loaded lazily, on the first event or read that touches them.
+    start() takes an exclusive lock on `journal_path + ".lock"` and refuses to start without it:
+    a second process replaying or compacting the same journal would drop or repeat events.
+    """
+
+    def __init__(self, checkpoint_seconds: float = LIVE_SESSION_CHECKPOINT_SECONDS, journal_path: str = LIVE_SESSION_JOURNAL_PATH,
+                 fsync: bool = LIVE_SESSION_JOURNAL_FSYNC, compact_lines: int = LIVE_SESSION_JOURNAL_COMPACT_LINES):
+        self.checkpoint_seconds = checkpoint_seconds
+        self.journal_path = journal_path
+        self.fsync = fsync
+        self.compact_lines = compact_lines
+        self._sessions = {}  # live_session_id -> LiveSessionState
+        self._attendance_ids = {}  # live_session_attendance.id -> (live_session_id, member_id)
+        self._seq = 0
+        self._lock = threading.Lock()  # Guards the sessions and the journal
+        self._flush_lock = threading.Lock()  # One checkpoint at a time
+        self._journal = None
+        self._journal_lines = 0
+        self._journal_lock = ExclusiveFileLock(journal_path + ".lock")
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.events = 0
+        self.reads = 0
+        self.loads = 0
+        self.checkpoints = 0
+        self.rows_written = 0
+        self.rows_rejected = 0
+        self.checkpoint_failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.checkpoint_seconds > 0
+
+    # --- journal ---
+    def _open_journal(self):
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def _sync_journal(self):
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def _append(self, record: dict):
+        self._open_journal()
+        self._journal.write(json.dumps(record) + "\n")
+        self._sync_journal()
+        self._journal_lines += 1
+
+    def _snapshot_records(self):
+        """Journal records that rebuild the current unwritten state: dirty rows and statuses, and all progress"""
+        for live_session_id, state in self._sessions.items():
+            if state.session_dirty_seq is not None:
+                yield {"seq": state.session_dirty_seq, "op": "status", "live_session_id": live_session_id,
+                       "status": state.session["status"], "notes": state.session.get("notes")}
+            for member_id, seq in state.dirty_members.items():
+                yield {"seq": seq, "op": "attendance", "live_session_id": live_session_id, "member_id": member_id,
+                       "row": self._journal_row(state.attendance[member_id])}
+            for member_id, exercises in state.progress.items():
+                for exercise_id, progress in exercises.items():
+                    yield {"seq": self._seq, "op": "progress", "live_session_id": live_session_id, "member_id": member_id,
+                           "exercise_id": exercise_id, "progress": progress}
+
+    def _rewrite_journal(self):
+        """Replace the journal with a snapshot of what is still unwritten (atomically, via a temp file)"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        temp_path = self.journal_path + ".tmp"
+        lines = 0
+        with open(temp_path, "w", encoding="utf-8") as temp_journal:
+            for record in self._snapshot_records():
+                temp_journal.write(json.dumps(record) + "\n")
+                lines += 1
+            temp_journal.flush()
+            if self.fsync:
+                os.fsync(temp_journal.fileno())
+        os.replace(temp_path, self.journal_path)
+        self._journal_lines = lines
+
+    def _compact_journal(self):
+        if not self._sessions and self._journal is not None:
+            self._journal.seek(0)
+            self._journal.truncate()
+            self._sync_journal()
+            self._journal_lines = 0
+        elif self._journal_lines > self.compact_lines:
+            self._rewrite_journal()
+
+    @staticmethod
+    def _journal_row(row: dict) -> dict:
+        return {key: row.get(key) for key in ("check_in_time", "check_out_time", "status", "notes")}
+
+    def recover(self) -> int:
+        """Reload the sessions with journalled events and replay those events; returns how many sessions"""
+        if not os.path.exists(self.journal_path):
+            return 0
+        records, checkpointed, closed = [], {}, set()
+        with open(self.journal_path, encoding="utf-8") as journal:
+            for line_number, line in enumerate(journal, start=1):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Only the last line can be torn (a crash mid-append); that event was never acknowledged
+                    print(f"❌ Live session journal: skipping unreadable line {line_number}")
+                    continue
+                if "checkpoint" in record:
+                    for live_session_id in record["checkpoint"]:
+                        checkpointed[live_session_id] = record["through"]
+                elif "closed" in record:
+                    closed.add(record["closed"])
+                else:
+                    records.append(record)
+        session_ids = {record["live_session_id"] for record in records} - closed
+        if session_ids:
+            connection = get_pooled_connection()
+            cursor = connection.cursor(dictionary=True)
+            try:
+                for live_session_id in session_ids:
+                    try:
+                        self.load(connection, cursor, live_session_id)
+                    except HTTPException:
+                        pass  # Deleted since; its events have nothing left to apply to
+            finally:
+                cursor.close()
+                connection.close()
+        with self._lock:
+            for record in records:
+                state = self._sessions.get(record["live_session_id"])
+                if state is None or record["live_session_id"] in closed:
+                    continue  # Completed (or gone) since: nothing left to write
+                self._seq = max(self._seq, record["seq"])
+                dirty = record["seq"] > checkpointed.get(record["live_session_id"], 0)
+                self._apply(state, record, dirty)
+            self._rewrite_journal()
+            return len([i for i in session_ids if i in self._sessions])
+
+    # --- state changes ---
+    def _apply(self, state: LiveSessionState, record: dict, dirty: bool = True):
+        if record["op"] == "attendance":
+            member_id = record["member_id"]
+            current = state.attendance.get(member_id) or {"id": None, "live_session_id": record["live_session_id"],
+                                                          "member_id": member_id, "member_name": None}
+            state.attendance[member_id] = {**current, **record["row"]}
+            if dirty:
+                state.dirty_members[member_id] = record["seq"]
+        elif record["op"] == "progress":
+            state.progress.setdefault(record["member_id"], {})[record["exercise_id"]] = record["progress"]
+        elif record["op"] == "status":
+            state.session = {**state.session, "status": record["status"], "notes": record["notes"]}
+            if dirty:
+                state.session_dirty_seq = record["seq"]
+
+    def _record(self, state: LiveSessionState, record: dict):
+        """Journal a change, then apply it; call with the lock held"""
+        self._seq += 1
+        record = {"seq": self._seq, **record}
+        self._append(record)  # Durable before it is acknowledged
+        self._apply(state, record)
+        self.events += 1
+
+    def _held(self, live_session_id: int, for_update: bool = True) -> LiveSessionState:
+        state = self._sessions.get(live_session_id)
+        if state is None or (for_update and state.closed):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Live session ID {live_session_id} is not active.")
+        if for_update and state.closing:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Live session ID {live_session_id} is being completed or cancelled.")
+        return state
+
+    def holds(self, live_session_id: int) -> bool:
+        return live_session_id in self._sessions
+
+    def load(self, db_conn, cursor, live_session_id: int) -> bool:
+        """Hold a session in memory if it is active; returns whether it is held. 404 if it does not exist."""
+        if live_session_id in self._sessions:
+            return True
+        session = crud_exec.get_live_session_by_id(db_conn, cursor, live_session_id)
+        if session["status"] not in ACTIVE_STATUSES:
+            return False
+        attendance = crud_exec.get_attendance_for_live_session(db_conn, cursor, live_session_id)
+        self.add(session, attendance)
+        return True
+
+    def add(self, session: dict, attendance: list = ()):
+        """Hold a session read (or just started) in the database"""
+        with self._lock:
+            if session["live_session_id"] in self._sessions or session["status"] not in ACTIVE_STATUSES:
+                return
+            self._sessions[session["live_session_id"]] = LiveSessionState(dict(session), list(attendance))
+            for row in attendance:
+                self._attendance_ids[row["id"]] = (session["live_session_id"], row["member_id"])
+            self.loads += 1
+
+    def check_in(self, live_session_id: int, member_id: int, notes: str = None) -> dict:
+        member_id = int(member_id)
+        with self._lock:
+            state = self._held(live_session_id)
+            existing = state.attendance.get(member_id)
+            if existing is not None:
+                if existing["status"] == "Checked In":
+                    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Member already checked into this session.")
+                if existing["status"] == "Checked Out":
+                    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Member was previously checked out. Cannot re-check-in this record.")
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Attendance record for this member and session already exists (possibly with different status).")
+            row = {"check_in_time": _now(), "check_out_time": None, "status": "Checked In", "notes": notes}
+            self._record(state, {"op": "attendance", "live_session_id": live_session_id, "member_id": member_id, "row": row})
+            attendance = dict(state.attendance[member_id])
+        active_session_index.add_member(live_session_id, member_id)
+        live_session_hub.publish("check_in", live_session_id, attendance)
+        return attendance
+
+    def attendance_key(self, attendance_id: int):
+        """(live_session_id, member_id) of a held attendance row, or None"""
+        return self._attendance_ids.get(attendance_id)
+
+    def update_attendance(self, live_session_id: int, member_id: int, new_status: str, notes: str = None) -> dict:
+        if new_status not in ATTENDANCE_STATUSES:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid attendance status: {new_status}.")
+        member_id = int(member_id)
+        with self._lock:
+            state = self._held(live_session_id)
+            current = state.attendance.get(member_id)
+            if current is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Member {member_id} has no attendance record in live session {live_session_id}.")
+            check_out_time = current["check_out_time"]
+            if new_status == "Checked Out" and not check_out_time:
+                check_out_time = _now()
+            elif new_status != "Checked Out":  # Clear checkout time if not checking out
+                check_out_time = None
+            row = {**self._journal_row(current), "status": new_status, "check_out_time": check_out_time,
+                   "notes": notes if notes is not None else current.get("notes")}
+            self._record(state, {"op": "attendance", "live_session_id": live_session_id, "member_id": member_id, "row": row})
+            attendance = dict(state.attendance[member_id])
+        live_session_hub.publish("attendance", live_session_id, attendance)
+        return attendance
+
+    def record_progress(self, live_session_id: int, progress_data: dict) -> dict:
+        try:
+            update = validate_payload(progress_data, crud_exec.EXERCISE_PROGRESS_REQUIRED_FIELDS, crud_exec.EXERCISE_PROGRESS_OPTIONAL_FIELDS)
+        except ValueError as ve:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+        member_id, exercise_id = int(update.pop("member_id")), int(update.pop("exercise_id"))
+        with self._lock:
+            state = self._held(live_session_id)
+            previous = state.progress.get(member_id, {}).get(exercise_id, {})
+            progress = {**previous, **update, "recorded_at": _now()}
+            self._record(state, {"op": "progress", "live_session_id": live_session_id, "member_id": member_id,
+                                 "exercise_id": exercise_id, "progress": progress})
+        event = {**progress, "live_session_id": live_session_id, "member_id": member_id, "exercise_id": exercise_id}
+        live_session_hub.publish("progress", live_session_id, event)
+        return event
+
+    def set_status(self, live_session_id: int, new_status: str, notes: str = None) -> dict:
+        """Move a held session between the active statuses; completing or cancelling goes through the database"""
+        if new_status not in ACTIVE_STATUSES:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid status: {new_status}.")
+        with self._lock:
+            state = self._held(live_session_id)
+            updated_notes = notes if notes is not None else state.session.get("notes")
+            self._record(state, {"op": "status", "live_session_id": live_session_id, "status": new_status, "notes": updated_notes})
+            session = dict(state.session)
+        active_session_index.set_status(live_session_id, new_status)
+        live_session_hub.publish("session_status", live_session_id, session)
+        return session
+
+    # --- reads ---
+    def get_session(self, live_session_id: int) -> dict:
+        with self._lock:
+            self.reads += 1
+            return dict(self._held(live_session_id, for_update=False).session)
+
+    def get_attendance(self, live_session_id: int) -> list:
+        with self._lock:
+            self.reads += 1
+            return [dict(row) for row in self._held(live_session_id, for_update=False).attendance.values()]
+
+    def get_progress(self, live_session_id: int) -> list:
+        with self._lock:
+            self.reads += 1
+            return [{**progress, "live_session_id": live_session_id, "member_id": member_id, "exercise_id": exercise_id}
+                    for member_id, exercises in self._held(live_session_id, for_update=False).progress.items()
+                    for exercise_id, progress in exercises.items()]
+
+    def exercises_by_member(self, live_session_id: int) -> dict:
+        """Recorded progress as {member_id: [logged exercise, ...]} for log_workouts_for_completed_session"""
+        with self._lock:
+            state = self._sessions.get(live_session_id)
+            if state is None:
+                return {}
+            return {member_id: [{
+                "exercise_id": exercise_id,
+                "order_in_workout": order,
+                "sets_completed": progress.get("sets_completed"),
+                "reps_actual_per_set": progress.get("actual_reps"),
+                "weight_actual_per_set": progress.get("weight_used"),
+                "notes_exercise_specific": progress.get("comments"),
+                "completed_at": _db_time(progress["recorded_at"]) if progress.get("completed") else None,
+            } for order, (exercise_id, progress) in enumerate(exercises.items(), start=1)]
+                for member_id, exercises in state.progress.items()}
+
+    def begin_close(self, live_session_id: int) -> bool:
+        """Refuse further events for a held session about to be completed or cancelled; returns whether it is held.
+
+        Call before its final checkpoint, so nothing lands between that checkpoint and the completion
+        transaction; close_on_commit() then drops it, and reopen() takes events again if it fails.
+        """
+        with self._lock:
+            state = self._sessions.get(live_session_id)
+            if state is None or state.closed:
+                return False
+            if state.closing:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Live session ID {live_session_id} is being completed or cancelled.")
+            state.closing = True
+            return True
+
+    def reopen(self, live_session_id: int):
+        """Undo begin_close() after the completion transaction did not commit"""
+        with self._lock:
+            state = self._sessions.get(live_session_id)
+            if state is not None and not state.closed:
+                state.closing = False
+
+    def close(self, live_session_id: int, session: dict = None):
+        """Checkpoint and forget a session that has completed or been cancelled (`session` is its final row)"""
+        with self._lock:
+            state = self._sessions.get(live_session_id)
+            if state is None:
+                return
+            state.closed = True
+            if session is not None:
+                state.session = dict(session)
+        try:
+            self.flush([live_session_id])
+        except Exception as e:
+            print(f"❌ Live session store: final checkpoint of session {live_session_id} failed, retried with the next one: {e}")
+
+    def _forget_closed(self):
+        for live_session_id, state in list(self._sessions.items()):
+            if state.closed and state.session_dirty_seq is None and not state.dirty_members:
+                del self._sessions[live_session_id]
+                for row in state.attendance.values():
+                    self._attendance_ids.pop(row["id"], None)
+                self._append({"closed": live_session_id})
+
+    def close_on_commit(self, db_conn, live_session_id: int, session: dict = None):
+        after_commit(db_conn, lambda: self.close(live_session_id, session))
+
+    # --- checkpointing ---
+    def _write(self, session_rows: list, attendance_rows: list) -> list:
+        """Apply a checkpoint batch in one transaction; returns the stored attendance rows"""
+        connection = None
+        cursor = None
+        try:
+            connection = get_pooled_connection()
+            cursor = connection.cursor(dictionary=True)
+            stored = crud_exec.apply_live_session_checkpoint(connection, cursor, session_rows, attendance_rows)
+            connection.commit()
+            return stored
+        except Exception:
+            if connection: connection.rollback()
+            raise
+        finally:
+            if cursor: cursor.close()
+            if connection: connection.close()
+
+    def _drain(self, live_session_ids):
+        """Take the dirty marks of these sessions; returns {live_session_id: (session_row, attendance_rows, marks)}"""
+        batch = {}
+        for live_session_id in live_session_ids:
+            state = self._sessions.get(live_session_id)
+            if state is None or (state.session_dirty_seq is None and not state.dirty_members):
+                continue
+            session_row = None
+            if state.session_dirty_seq is not None:
+                session_row = {"live_session_id": live_session_id, "status": state.session["status"],
+                               "end_time": _db_time(state.session.get("end_time")), "notes": state.session.get("notes")}
+            attendance_rows = [{
+                "live_session_id": live_session_id,
+                "member_id": member_id,
+                "check_in_time": _db_time(state.attendance[member_id]["check_in_time"]),
+                "check_out_time": _db_time(state.attendance[member_id]["check_out_time"]),
+                "status": state.attendance[member_id]["status"],
+                "notes": state.attendance[member_id].get("notes"),
+            } for member_id in state.dirty_members]
+            batch[live_session_id] = (session_row, attendance_rows, (state.session_dirty_seq, dict(state.dirty_members)))
+            state.session_dirty_seq = None
+            state.dirty_members = {}
+        return batch
+
+    def _requeue(self, batch: dict):
+        # Changes made while the batch was in flight are newer and keep their own marks
+        with self._lock:
+            for live_session_id, (_, _, (session_seq, member_seqs)) in batch.items():
+                state = self._sessions.get(live_session_id)
+                if state is None:
+                    continue
+                if session_seq is not None and state.session_dirty_seq is None:
+                    state.session_dirty_seq = session_seq
+                for member_id, seq in member_seqs.items():
+                    state.dirty_members.setdefault(member_id, seq)
+
+    def _write_batch(self, batch: dict) -> list:
+        session_rows = [session_row for session_row, _, _ in batch.values() if session_row is not None]
+        attendance_rows = [row for _, rows, _ in batch.values() for row in rows]
+        return self._write(session_rows, attendance_rows)
+
+    def flush(self, live_session_ids=None) -> int:
+        """Checkpoint changed sessions (all of them, or the given ones); returns the rows written"""
+        with self._flush_lock:
+            with self._lock:
+                batch = self._drain(list(self._sessions) if live_session_ids is None else live_session_ids)
+                through = self._seq
+                if not batch:
+                    self._forget_closed()
+                    self._compact_journal()
+                    return 0
+
+            stored, done, rejected = [], [], []
+            try:
+                stored = self._write_batch(batch)
+                done = list(batch)
+            except HTTPException as e:
+                if e.status_code != status.HTTP_400_BAD_REQUEST:
+                    self._fail(batch)
+                    raise
+                # One session's bad row (e.g. an unknown member_id) must not block the others: retry per session
+                for live_session_id, entry in batch.items():
+                    try:
+                        stored += self._write_batch({live_session_id: entry})
+                        done.append(live_session_id)
+                    except HTTPException as session_error:
+                        if session_error.status_code == status.HTTP_400_BAD_REQUEST:
+                            rejected.append(self._reject(live_session_id, entry, session_error))
+                        else:
+                            self._fail({live_session_id: entry})
+                    except Exception:
+                        self._fail({live_session_id: entry})
+            except Exception:
+                self._fail(batch)
+                raise
+
+            written = sum((session_row is not None) + len(rows) for live_session_id, (session_row, rows, _) in batch.items()
+                          if live_session_id in done)
+            done += rejected
+            with self._lock:
+                for row in stored:
+                    state = self._sessions.get(row["live_session_id"])
+                    current = state.attendance.get(row["member_id"]) if state is not None else None
+                    if current is not None:
+                        current["id"] = row["id"]
+                        current["member_name"] = current.get("member_name") or row["member_name"]
+                        self._attendance_ids[row["id"]] = (row["live_session_id"], row["member_id"])
+                if done:
+                    self._append({"checkpoint": done, "through": through})
+                self._forget_closed()
+                self._compact_journal()
+                self.checkpoints += 1
+                self.rows_written += written
+            return written
+
+    def _reject(self, live_session_id: int, entry, error: HTTPException) -> int:
+        # Invalid rows are dropped from the database write (and checkpointed) rather than retried forever
+        session_row, attendance_rows, _ = entry
+        with self._lock:
+            state = self._sessions.get(live_session_id)
+            for row in attendance_rows:
+                if state is not None and state.attendance.get(row["member_id"], {}).get("id") is None:
+                    state.attendance.pop(row["member_id"], None)  # Never stored, so it never existed
+            self.rows_rejected += len(attendance_rows) + (session_row is not None)
+        print(f"❌ Live session store: dropped {len(attendance_rows)} attendance change(s) of session {live_session_id}: {error.detail}")
+        return live_session_id
+
+    def _fail(self, batch: dict):
+        self.checkpoint_failures += 1
+        self._requeue(batch)
+
+    # --- background checkpointer ---
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.checkpoint_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Live session checkpoint failed (will retry): {e}")
+
+    def start(self):
+        if not self.enabled:
+            return
+        try:
+            self._journal_lock.acquire()
+        except FileLockHeldError as e:
+            raise RuntimeError(f"Live session store: {e}; give each API process its own LIVE_SESSION_JOURNAL_PATH") from e
+        try:
+            recovered = self.recover()
+            if recovered:
+                print(f"Recovered {recovered} live session(s) from {self.journal_path}")
+        except Exception as e:
+            # The journal is left as it is and replayed on the next start
+            print(f"❌ Live session store: could not replay {self.journal_path}: {e}")
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="live-session-checkpointer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the checkpointer and write what is left; anything that cannot be written stays in the journal"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"❌ Live session store: final checkpoint failed, events kept in {self.journal_path}: {e}")
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+        self._journal_lock.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "checkpoint_seconds": self.checkpoint_seconds,
+                "sessions_held": len(self._sessions),
+                "attendance_rows": sum(len(state.attendance) for state in self._sessions.values()),
+                "dirty_rows": sum(len(state.dirty_members) + (state.session_dirty_seq is not None) for state in self._sessions.values()),
+                "progress_entries": sum(len(exercises) for state in self._sessions.values() for exercises in state.progress.values()),
+                "events": self.events,
+                "reads": self.reads,
+                "loads": self.loads,
+                "checkpoints": self.checkpoints,
+                "rows_written": self.rows_written,
+                "rows_rejected": self.rows_rejected,
+                "checkpoint_failures": self.checkpoint_failures,
+                "journal_lines": self._journal_lines,
+            }
+
+
+live_session_store = LiveSessionStore()
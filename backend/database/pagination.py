@@ -0,0 +1,141 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from fastapi import HTTPException, status
+from backend.database.db_utils import dumps_json, format_rows_by_columns
+
+DEFAULT_PAGE_SIZE = int(os.getenv("PAGINATION_DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("PAGINATION_MAX_PAGE_SIZE", "500"))  # Row cap per page, whatever the client asks for
+EXPORT_BATCH_SIZE = int(os.getenv("PAGINATION_EXPORT_BATCH_SIZE", "1000"))
+_TOKEN_SECRET = os.getenv("APP_SECRET_KEY", "your-very-secret-key-for-session").encode("utf-8")
+
+
+class KeysetSpec:
+    """Ordering of a paginated list: [(sql_expression, row_field, descending), ...].
+
+    The last key must be unique (normally the primary key) and key columns must be NOT NULL.
+    `scope` ties continuation tokens to one list so a token cannot be replayed against another.
+    """
+
+    def __init__(self, scope: str, keys: list):
+        self.scope = scope
+        self.keys = keys
+
+    def condition(self, values: list):
+        """SQL condition selecting rows strictly after `values`, plus its parameters"""
+        params = {f"keyset_{i}": value for i, value in enumerate(values)}
+        directions = {descending for _, _, descending in self.keys}
+        if len(directions) == 1:
+            # Single direction: a row constructor comparison, which MySQL can run as an index range scan
+            operator = "<" if directions.pop() else ">"
+            columns = ", ".join(expression for expression, _, _ in self.keys)
+            placeholders = ", ".join(f"%(keyset_{i})s" for i in range(len(self.keys)))
+            return f"({columns}) {operator} ({placeholders})", params
+        # Mixed directions: (k0 > v0) OR (k0 = v0 AND k1 < v1) OR ...
+        alternatives = []
+        for i, (expression, _, descending) in enumerate(self.keys):
+            terms = [f"{self.keys[j][0]} = %(keyset_{j})s" for j in range(i)]
+            terms.append(f"{expression} {'<' if descending else '>'} %(keyset_{i})s")
+            alternatives.append("(" + " AND ".join(terms) + ")")
+        return "(" + " OR ".join(alternatives) + ")", params
+
+
+def _token_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return str(value)  # TIME columns, e.g. "8:30:00"
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _sign(payload: bytes) -> str:
+    return hmac.new(_TOKEN_SECRET, payload, hashlib.sha256).hexdigest()[:32]
+
+
+def encode_page_token(spec: KeysetSpec, row: dict) -> str:
+    """Opaque, tamper-evident continuation token holding the key values of the last row of a page"""
+    payload = json.dumps({"s": spec.scope, "k": [_token_value(row[field]) for _, field, _ in spec.keys]},
+                         separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=") + "." + _sign(payload)
+
+
+def decode_page_token(spec: KeysetSpec, token: str) -> list:
+    try:
+        encoded, signature = token.rsplit(".", 1)
+        payload = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+        if not hmac.compare_digest(signature, _sign(payload)):
+            raise ValueError("bad signature")
+        data = json.loads(payload)
+        if data.get("s") != spec.scope or len(data.get("k", [])) != len(spec.keys):
+            raise ValueError("token belongs to another list")
+        return data["k"]
+    except (ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid page_token: {e}")
+
+
+def clamp_page_size(limit, maximum: int = MAX_PAGE_SIZE) -> int:
+    if limit is None:
+        return min(DEFAULT_PAGE_SIZE, maximum)
+    return max(1, min(int(limit), maximum))
+
+
+def fetch_keyset_page(cursor, sql_template: str, spec: KeysetSpec, params: dict = None, page_token: str = None,
+                      limit: int = None, formatted: bool = True, max_limit: int = MAX_PAGE_SIZE):
+    """Run one page of a keyset-paginated query.
+
+    `sql_template` comes from the registry and contains a `{keyset_condition}` placeholder in its
+    WHERE clause, orders by the spec's keys and ends with `LIMIT %(page_limit)s`.
+    Returns {"items": [...], "next_page_token": str | None, "limit": int}.
+    """
+    limit = clamp_page_size(limit, max_limit)
+    query_params = dict(params or {})
+    if page_token:
+        condition, keyset_params = spec.condition(decode_page_token(spec, page_token))
+        query_params.update(keyset_params)
+    else:
+        condition = "TRUE"
+    query_params["page_limit"] = limit + 1  # One extra row tells us whether another page exists
+
+    cursor.execute(sql_template.replace("{keyset_condition}", condition), query_params)
+    rows = cursor.fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_page_token = encode_page_token(spec, rows[-1]) if has_more else None
+    if formatted:
+        rows = format_rows_by_columns(cursor.description, rows)
+    return {"items": rows, "next_page_token": next_page_token, "limit": limit}
+
+
+def stream_ndjson(get_connection, sql_template: str, spec: KeysetSpec, params: dict = None,
+                  batch_size: int = EXPORT_BATCH_SIZE):
+    """Generator of NDJSON lines (bytes) for a whole keyset-ordered list.
+
+    Each batch takes a pooled connection only for the duration of one page query, so a slow
+    client reading a large export neither holds a connection nor makes the server buffer the table.
+    """
+    page_token = None
+    while True:
+        connection = get_connection()
+        cursor = None
+        try:
+            cursor = connection.cursor(dictionary=True)
+            page = fetch_keyset_page(cursor, sql_template, spec, params, page_token,
+                                     limit=batch_size, formatted=False, max_limit=batch_size)
+        finally:
+            if cursor:
+                cursor.close()
+            connection.close()
+        for row in page["items"]:
+            yield dumps_json(row) + b"\n"
+        page_token = page["next_page_token"]
+        if not page_token:
+            return
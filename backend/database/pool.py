@@ -0,0 +1,289 @@
+import bisect
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector.errors import PoolError
+from backend.database.prepared import PreparedStatementCache, PreparingCursor
+
+# Upper bounds (ms) of the wait-time histogram buckets; the last bucket catches everything slower
+WAIT_BUCKETS_MS = [1, 5, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class PoolTimeoutError(PoolError):
+    """Raised when no connection became available within the pool's wait timeout."""
+
+
+def _run_callbacks(callbacks):
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception as e:
+            print(f"❌ Transaction callback failed: {e}")
+
+
+def after_commit(connection, callback, on_rollback=None):
+    """Run `callback` once the connection's current transaction commits, `on_rollback` if it does not.
+
+    Connections without transaction hooks (anything but a PooledConnection) run `callback` at once.
+    """
+    if isinstance(connection, PooledConnection):
+        connection.on_commit(callback)
+        if on_rollback is not None:
+            connection.on_rollback(on_rollback)
+    else:
+        callback()
+
+
+class PooledConnection:
+    """Proxy handed out by InstrumentedConnectionPool.
+
+    Behaves like the underlying mysql.connector connection; close() returns it to the pool.
+    In-process state derived from the database (indexes, caches) can register on_commit /
+    on_rollback callbacks so it only changes when the transaction's outcome is known.
+    """
+
+    def __init__(self, pool, cnx, created_at):
+        self._pool = pool
+        self._cnx = cnx
+        self._created_at = created_at
+        self._after_commit = []
+        self._after_rollback = []
+
+    def __getattr__(self, name):
+        cnx = self.__dict__.get("_cnx")
+        if cnx is None:
+            raise PoolError("Connection has already been returned to the pool")
+        return getattr(cnx, name)
+
+    # Attribute writes would land on the proxy (only reads are forwarded), so autocommit is passed through explicitly
+    @property
+    def autocommit(self):
+        cnx = self.__dict__.get("_cnx")
+        if cnx is None:
+            raise PoolError("Connection has already been returned to the pool")
+        return cnx.autocommit
+
+    @autocommit.setter
+    def autocommit(self, value):
+        cnx = self.__dict__.get("_cnx")
+        if cnx is None:
+            raise PoolError("Connection has already been returned to the pool")
+        cnx.autocommit = value
+
+    def cursor(self, *args, **kwargs):
+        cnx = self.__dict__.get("_cnx")
+        if cnx is None:
+            raise PoolError("Connection has already been returned to the pool")
+        # The standard cursor(dictionary=True) gets prepared-statement caching when it is enabled
+        if self._pool.stmt_cache_size > 0 and not args and kwargs == {"dictionary": True}:
+            stmt_cache = getattr(cnx, "_stmt_cache", None)
+            if stmt_cache is None:
+                stmt_cache = PreparedStatementCache(cnx, self._pool.stmt_cache_size)
+                cnx._stmt_cache = stmt_cache  # Lives as long as the physical connection
+            return PreparingCursor(cnx.cursor(dictionary=True), stmt_cache)
+        return cnx.cursor(*args, **kwargs)
+
+    def on_commit(self, callback):
+        self._after_commit.append(callback)
+
+    def on_rollback(self, callback):
+        self._after_rollback.append(callback)
+
+    def _take_callbacks(self, committed):
+        callbacks = self._after_commit if committed else self._after_rollback
+        self._after_commit, self._after_rollback = [], []
+        return callbacks
+
+    def commit(self):
+        cnx = self.__dict__.get("_cnx")
+        if cnx is None:
+            raise PoolError("Connection has already been returned to the pool")
+        cnx.commit()
+        _run_callbacks(self._take_callbacks(committed=True))
+
+    def rollback(self):
+        cnx = self.__dict__.get("_cnx")
+        if cnx is None:
+            raise PoolError("Connection has already been returned to the pool")
+        try:
+            cnx.rollback()
+        finally:
+            _run_callbacks(self._take_callbacks(committed=False))
+
+    def close(self):
+        if self._cnx is not None:
+            cnx, self._cnx = self._cnx, None
+            self._pool._release(cnx, self._created_at)  # Rolls back anything left uncommitted
+            _run_callbacks(self._take_callbacks(committed=False))
+
+
+class InstrumentedConnectionPool:
+    """Connection pool with min/max size, a bounded wait queue, health checks and recycling.
+
+    Unlike MySQLConnectionPool, a caller that finds every connection checked out waits up to
+    `wait_timeout` seconds for one to be returned instead of failing immediately.
+    """
+
+    def __init__(self, min_size=2, max_size=10, wait_timeout=10.0, recycle_seconds=1800,
+                 health_check_seconds=30, stmt_cache_size=0, **connect_kwargs):
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.wait_timeout = wait_timeout
+        self.recycle_seconds = recycle_seconds
+        self.health_check_seconds = health_check_seconds  # Ping connections that sat idle longer than this
+        self.stmt_cache_size = stmt_cache_size  # Prepared statements kept per connection; 0 disables them
+        self._connect_kwargs = connect_kwargs
+        self._idle = deque()  # (cnx, created_at, returned_at)
+        self._cond = threading.Condition()
+        self._open = 0  # Connections currently open (idle + in use + being created)
+        self._in_use = 0
+        self._waiters = 0
+        # Counters
+        self._created = 0
+        self._recycled = 0
+        self._failed_health_checks = 0
+        self._timeouts = 0
+        self._wait_counts = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._wait_total_ms = 0.0
+        self._wait_max_ms = 0.0
+        self._prefill()
+
+    def _prefill(self):
+        for _ in range(min(self.min_size, self.max_size)):
+            try:
+                cnx = self._connect()
+            except mysql.connector.Error as e:
+                print(f"❌ DB pool prefill failed: {e}")
+                return
+            with self._cond:
+                self._open += 1
+                self._idle.append((cnx, time.monotonic(), time.monotonic()))
+
+    def _connect(self):
+        cnx = mysql.connector.connect(**self._connect_kwargs)
+        with self._cond:
+            self._created += 1
+        return cnx
+
+    def _discard(self, cnx):
+        try:
+            cnx.close()
+        except Exception:
+            pass
+
+    def _record_wait(self, waited_ms):
+        with self._cond:
+            self._wait_counts[bisect.bisect_left(WAIT_BUCKETS_MS, waited_ms)] += 1
+            self._wait_total_ms += waited_ms
+            self._wait_max_ms = max(self._wait_max_ms, waited_ms)
+
+    def get_connection(self, timeout=None):
+        timeout = self.wait_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        entry = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()  # LIFO keeps the warmest connections in use
+                    break
+                if self._open < self.max_size:
+                    self._open += 1  # Reserve a slot, connect outside the lock
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(f"No database connection available within {timeout:.1f}s")
+                self._waiters += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiters -= 1
+            self._in_use += 1
+
+        try:
+            cnx, created_at = self._checkout(entry)
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        self._record_wait((time.monotonic() - started) * 1000)
+        return PooledConnection(self, cnx, created_at)
+
+    def _checkout(self, entry):
+        """Validate an idle connection (or open a fresh one) for a caller"""
+        now = time.monotonic()
+        if entry is not None:
+            cnx, created_at, returned_at = entry
+            if self.recycle_seconds and now - created_at >= self.recycle_seconds:
+                self._discard(cnx)
+                with self._cond:
+                    self._recycled += 1
+            elif now - returned_at >= self.health_check_seconds and not self._is_healthy(cnx):
+                self._discard(cnx)
+                with self._cond:
+                    self._failed_health_checks += 1
+            else:
+                return cnx, created_at
+        return self._connect(), time.monotonic()
+
+    def _is_healthy(self, cnx):
+        try:
+            cnx.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _release(self, cnx, created_at):
+        keep = True
+        recycled = False
+        try:
+            if not cnx.is_connected():
+                keep = False
+            elif cnx.in_transaction:
+                cnx.rollback()  # Never hand out a connection with someone else's open transaction
+        except Exception:
+            keep = False
+        if keep and self.recycle_seconds and time.monotonic() - created_at >= self.recycle_seconds:
+            keep = False
+            recycled = True
+        if not keep:
+            self._discard(cnx)
+
+        with self._cond:
+            self._in_use -= 1
+            if keep:
+                self._idle.append((cnx, created_at, time.monotonic()))
+            else:
+                self._open -= 1
+                self._recycled += recycled
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            waits = sum(self._wait_counts)
+            histogram = {f"<={bound}ms": count for bound, count in zip(WAIT_BUCKETS_MS, self._wait_counts)}
+            histogram[f">{WAIT_BUCKETS_MS[-1]}ms"] = self._wait_counts[-1]
+            return {
+                "stmt_cache_size": self.stmt_cache_size,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiters": self._waiters,
+                "created_total": self._created,
+                "recycled_total": self._recycled,
+                "failed_health_checks": self._failed_health_checks,
+                "timeouts": self._timeouts,
+                "wait_ms": {
+                    "count": waits,
+                    "mean": round(self._wait_total_ms / waits, 3) if waits else 0.0,
+                    "max": round(self._wait_max_ms, 3),
+                    "histogram": histogram,
+                },
+            }
@@ -0,0 +1,375 @@
+import json
+import os
+import threading
+from datetime import date
+
+from fastapi import HTTPException, status
+from backend.database.base import get_pooled_connection
+from backend.database.crud import scheduling as crud_scheduling
+from backend.database.db_utils import validate_payload
+from backend.utils.file_lock import ExclusiveFileLock, FileLockHeldError
+from backend.utils.intervals import time_to_seconds, seconds_to_time_str
+
+PREFERENCE_BUFFER_FLUSH_SECONDS = float(os.getenv("PREFERENCE_BUFFER_FLUSH_SECONDS", "2"))  # 0 writes every edit through at once
+PREFERENCE_BUFFER_LOG_PATH = os.getenv("PREFERENCE_BUFFER_LOG_PATH", "preference_buffer.log")  # One API process per file (locked at start)
+PREFERENCE_BUFFER_FSYNC = os.getenv("PREFERENCE_BUFFER_FSYNC", "1") == "1"
+PREFERENCE_BUFFER_MAX_PENDING = int(os.getenv("PREFERENCE_BUFFER_MAX_PENDING", "5000"))  # Buffered slots that trigger an early flush
+PREFERENCE_BUFFER_COMPACT_LINES = int(os.getenv("PREFERENCE_BUFFER_COMPACT_LINES", "100000"))
+
+PREFERENCE_TYPES = ("Preferred", "Available", "Not Available")  # training_preferences.preference_type ENUM
+CLEARED_PREFERENCE = "Not Selected"  # What the preferences page sends when a slot is unset
+
+
+def normalize_preference_edit(payload: dict) -> dict:
+    """A validated training_preferences row for one slot edit; preference_type None means "clear the slot"."""
+    required_fields = ["member_id", "week_start_date", "day_of_week", "start_time", "end_time"]
+    edit = validate_payload(payload, required_fields, ["preference_type", "trainer_id"])
+    if edit["day_of_week"] not in crud_scheduling.SCHEDULE_DAYS:
+        raise ValueError(f"Invalid day_of_week: {edit['day_of_week']}")
+    start, end = time_to_seconds(edit["start_time"]), time_to_seconds(edit["end_time"])
+    if end <= start:
+        raise ValueError("end_time must be after start_time")
+    preference_type = edit.get("preference_type")
+    if preference_type == CLEARED_PREFERENCE:
+        preference_type = None
+    if preference_type is not None and preference_type not in PREFERENCE_TYPES:
+        raise ValueError(f"Invalid preference_type: {preference_type}")
+    trainer_id = edit.get("trainer_id")
+    return {
+        "member_id": int(edit["member_id"]),
+        "week_start_date": date.fromisoformat(str(edit["week_start_date"])[:10]).isoformat(),
+        "day_of_week": edit["day_of_week"],
+        "start_time": seconds_to_time_str(start),
+        "end_time": seconds_to_time_str(end),
+        "preference_type": preference_type,
+        "trainer_id": int(trainer_id) if trainer_id is not None and preference_type is not None else None,
+    }
+
+
+def _buffer_key(row: dict):
+    return row["member_id"], row["week_start_date"]
+
+
+def _slot_key(row: dict):
+    return row["day_of_week"], row["start_time"], row["end_time"]
+
+
+class PreferenceWriteBuffer:
+    """Write-behind buffer for single-slot training preference edits.
+
+    Edits are coalesced per (member, week) and slot, so toggling a slot ten times costs one row.
+    A background thread writes everything buffered every `flush_seconds` in one transaction
+    (one multi-row upsert plus one DELETE), and flush(keys) writes a member's week right away,
+    e.g. when they leave the page or before their preferences are read.
+
+    Every edit is appended (and fsynced) to an append-only log before it is acknowledged; flushes
+    append a checkpoint record. recover() replays the log on startup, so an acknowledged edit
+    survives a crash of the API process. The log is truncated whenever the buffer drains.
+    start() takes an exclusive lock on `log_path + ".lock"` and refuses to start without it, since a
+    second process replaying or truncating the same log would lose or double-apply edits.
+    """
+
+    def __init__(self, flush_seconds: float = PREFERENCE_BUFFER_FLUSH_SECONDS, log_path: str = PREFERENCE_BUFFER_LOG_PATH,
+                 fsync: bool = PREFERENCE_BUFFER_FSYNC, max_pending: int = PREFERENCE_BUFFER_MAX_PENDING,
+                 compact_lines: int = PREFERENCE_BUFFER_COMPACT_LINES):
+        self.flush_seconds = flush_seconds
+        self.log_path = log_path
+        self.fsync = fsync
+        self.max_pending = max_pending
+        self.compact_lines = compact_lines
+        self._pending = {}  # (member_id, week_start_date) -> {(day, start, end): (seq, row)}
+        self._pending_slots = 0
+        self._seq = 0
+        self._lock = threading.Lock()  # Guards _pending and the log
+        self._flush_lock = threading.Lock()  # One flush at a time, so a failed batch is re-queued before the next one drains
+        self._log = None
+        self._log_lines = 0
+        self._log_lock = ExclusiveFileLock(log_path + ".lock")
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.edits = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.rows_rejected = 0
+        self.flush_failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.flush_seconds > 0
+
+    # --- log ---
+    def _open_log(self):
+        if self._log is None:
+            self._log = open(self.log_path, "a", encoding="utf-8")
+
+    def _sync_log(self):
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+
+    def _append(self, record: dict):
+        self._open_log()
+        self._log.write(json.dumps(record) + "\n")
+        self._sync_log()
+        self._log_lines += 1
+
+    def _rewrite_log(self):
+        """Replace the log with just the still-buffered edits (atomically, via a temp file)"""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        temp_path = self.log_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as temp_log:
+            for slots in self._pending.values():
+                for seq, row in slots.values():
+                    temp_log.write(json.dumps({"seq": seq, **row}) + "\n")
+            temp_log.flush()
+            if self.fsync:
+                os.fsync(temp_log.fileno())
+        os.replace(temp_path, self.log_path)
+        self._log_lines = self._pending_slots
+
+    def _compact_log(self):
+        if self._pending_slots == 0 and self._log is not None:
+            self._log.seek(0)
+            self._log.truncate()
+            self._sync_log()
+            self._log_lines = 0
+        elif self._log_lines > self.compact_lines:
+            self._rewrite_log()
+
+    def recover(self) -> int:
+        """Reload edits acknowledged but not flushed before the last shutdown or crash; returns how many"""
+        if not os.path.exists(self.log_path):
+            return 0
+        with self._lock:
+            with open(self.log_path, encoding="utf-8") as log:
+                for line_number, line in enumerate(log, start=1):
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Only the last line can be torn (a crash mid-append); that edit was never acknowledged
+                        print(f"❌ Preference buffer log: skipping unreadable line {line_number}")
+                        continue
+                    if "flushed" in record:
+                        for member_id, week in record["flushed"]:
+                            slots = self._pending.get((member_id, week), {})
+                            for slot_key in [k for k, (seq, _) in slots.items() if seq <= record["through"]]:
+                                del slots[slot_key]
+                            if not slots:
+                                self._pending.pop((member_id, week), None)
+                        continue
+                    seq = record.pop("seq")
+                    self._pending.setdefault(_buffer_key(record), {})[_slot_key(record)] = (seq, record)
+                    self._seq = max(self._seq, seq)
+            self._pending_slots = sum(len(slots) for slots in self._pending.values())
+            self._rewrite_log()
+            return self._pending_slots
+
+    # --- edits ---
+    def record(self, payload: dict) -> dict:
+        """Buffer one slot edit; raises ValueError if it is invalid"""
+        row = normalize_preference_edit(payload)
+        key, slot_key = _buffer_key(row), _slot_key(row)
+        with self._lock:
+            self._seq += 1
+            self._append({"seq": self._seq, **row})  # Durable before it is acknowledged
+            slots = self._pending.setdefault(key, {})
+            if slot_key in slots:
+                self.coalesced += 1
+            else:
+                self._pending_slots += 1
+            slots[slot_key] = (self._seq, row)
+            self.edits += 1
+            pending_for_key = len(slots)
+            over_limit = self._pending_slots >= self.max_pending
+
+        buffer_status = "Buffered"
+        if not self.enabled:
+            self.flush([key])
+            buffer_status, pending_for_key = "Written", 0
+        elif over_limit:
+            self._wake.set()
+        return {"status": buffer_status, "member_id": row["member_id"], "week_start_date": row["week_start_date"],
+                "pending_changes": pending_for_key}
+
+    def pending_count(self, member_id: int = None, week_start_date=None) -> int:
+        with self._lock:
+            if member_id is None:
+                return self._pending_slots
+            return len(self._pending.get((int(member_id), str(week_start_date)[:10]), {}))
+
+    # --- flushing ---
+    def _write(self, batch: dict, db_conn, cursor) -> int:
+        """Apply a drained batch in one transaction on db_conn; returns the rows written"""
+        upserts, deletes = [], []
+        for slots in batch.values():
+            for _, row in slots.values():
+                (deletes if row["preference_type"] is None else upserts).append(row)
+        try:
+            crud_scheduling.apply_training_preference_changes(db_conn, cursor, upserts, deletes)
+            db_conn.commit()
+            return len(upserts) + len(deletes)
+        except Exception:
+            db_conn.rollback()
+            raise
+
+    def _requeue(self, batch: dict):
+        # Edits made while the batch was in flight are newer and win
+        with self._lock:
+            for key, slots in batch.items():
+                current = self._pending.setdefault(key, {})
+                for slot_key, entry in slots.items():
+                    if slot_key not in current:
+                        current[slot_key] = entry
+                        self._pending_slots += 1
+
+    @staticmethod
+    def _normalize_keys(keys):
+        return None if keys is None else [(int(m), str(w)[:10]) for m, w in keys]
+
+    def flush(self, keys=None, db_conn=None, cursor=None) -> int:
+        """Write buffered edits (all of them, or those of the given (member_id, week) keys); returns the rows written.
+
+        A route that already holds a connection passes it (and its cursor): the edits are committed
+        through it, before the route's own writes, instead of checking out a second pooled connection.
+        """
+        keys = self._normalize_keys(keys)
+        if db_conn is not None:
+            return self._flush(keys, db_conn, cursor)
+        with self._lock:
+            if not any(self._pending.get(key) for key in (self._pending if keys is None else keys)):
+                return 0
+        # Checked out before _flush_lock, so the lock holder never waits on the pool while
+        # routes holding their own connections wait on the lock
+        connection = None
+        pooled_cursor = None
+        try:
+            connection = get_pooled_connection()
+            pooled_cursor = connection.cursor(dictionary=True)
+            return self._flush(keys, connection, pooled_cursor)
+        finally:
+            if pooled_cursor: pooled_cursor.close()
+            if connection: connection.close()
+
+    def _flush(self, keys, db_conn, cursor) -> int:
+        with self._flush_lock:
+            with self._lock:
+                batch = {}
+                for key in (list(self._pending) if keys is None else keys):
+                    slots = self._pending.pop(key, None)
+                    if slots:
+                        batch[key] = slots
+                        self._pending_slots -= len(slots)
+                through = self._seq
+            if not batch:
+                return 0
+
+            written, done = 0, []
+            try:
+                written = self._write(batch, db_conn, cursor)
+                done = list(batch)
+            except HTTPException as e:
+                if e.status_code != status.HTTP_400_BAD_REQUEST:
+                    self._fail(batch)
+                    raise
+                if len(batch) == 1:
+                    done = self._reject(batch, e)
+                else:
+                    # One member's bad row (e.g. a deleted trainer) must not block everyone else's: retry per key
+                    for key, slots in batch.items():
+                        try:
+                            written += self._write({key: slots}, db_conn, cursor)
+                            done.append(key)
+                        except HTTPException as key_error:
+                            if key_error.status_code == status.HTTP_400_BAD_REQUEST:
+                                done.extend(self._reject({key: slots}, key_error))
+                            else:
+                                self._fail({key: slots})
+                        except Exception:
+                            self._fail({key: slots})
+            except Exception:
+                self._fail(batch)
+                raise
+
+            with self._lock:
+                if done:
+                    self._append({"flushed": [list(key) for key in done], "through": through})
+                self._compact_log()
+                self.flushes += 1
+                self.rows_written += written
+            return written
+
+    def _reject(self, batch: dict, error: HTTPException):
+        # Invalid rows are dropped (and checkpointed) rather than retried forever
+        for (member_id, week), slots in batch.items():
+            self.rows_rejected += len(slots)
+            print(f"❌ Preference buffer: dropped {len(slots)} edit(s) of member {member_id} for week {week}: {error.detail}")
+        return list(batch)
+
+    def _fail(self, batch: dict):
+        self.flush_failures += 1
+        self._requeue(batch)
+
+    # --- background flusher ---
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Preference buffer flush failed (will retry): {e}")
+
+    def start(self):
+        try:
+            self._log_lock.acquire()
+        except FileLockHeldError as e:
+            raise RuntimeError(f"Preference buffer: {e}; give each API process its own PREFERENCE_BUFFER_LOG_PATH") from e
+        recovered = self.recover()
+        if recovered:
+            print(f"Recovered {recovered} buffered training preference edit(s) from {self.log_path}")
+        if self.enabled and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="preference-buffer-flusher", daemon=True)
+            self._thread.start()
+        elif not self.enabled:
+            self.flush()
+
+    def stop(self):
+        """Stop the flusher and write what is left; anything that cannot be written stays in the log"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"❌ Preference buffer: final flush failed, edits kept in {self.log_path}: {e}")
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+        self._log_lock.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "flush_seconds": self.flush_seconds,
+                "pending_slots": self._pending_slots,
+                "pending_weeks": len(self._pending),
+                "edits": self.edits,
+                "coalesced": self.coalesced,
+                "flushes": self.flushes,
+                "rows_written": self.rows_written,
+                "rows_rejected": self.rows_rejected,
+                "flush_failures": self.flush_failures,
+                "log_lines": self._log_lines,
+            }
+
+
+preference_buffer = PreferenceWriteBuffer()
@@ -0,0 +1,133 @@
+import re
+from collections import OrderedDict
+
+# %(name)s, %s or a literal %% in query text written for the text protocol
+_PARAM_RE = re.compile(r"%\((\w+)\)s|%s|%%")
+_LINE_COMMENT_RE = re.compile(r"--[^\n]*")
+
+
+def translate_params(sql: str):
+    """Rewrite %(name)s / %s placeholders to `?`.
+
+    Returns (statement, names); names is the ordered list of named parameters, or None when
+    the query uses positional %s placeholders.
+    """
+    names = []
+    positional = False
+
+    def replace(match):
+        nonlocal positional
+        if match.group(0) == "%%":
+            return "%"
+        if match.group(1):
+            names.append(match.group(1))
+        else:
+            positional = True
+        return "?"
+
+    # COM_STMT_PREPARE takes exactly one statement: drop "-- ..." comments and the trailing semicolon
+    sql = _LINE_COMMENT_RE.sub("", sql).strip().rstrip(";").rstrip()
+    statement = _PARAM_RE.sub(replace, sql)
+    if names and positional:
+        raise ValueError("Query mixes named and positional parameters")
+    return statement, (names if names else None)
+
+
+class PreparedStatementCache:
+    """Bounded LRU of server-side prepared statements for one connection, keyed by query key."""
+
+    def __init__(self, connection, maxsize: int):
+        self._connection = connection
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (prepared cursor, statement, names)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, sql):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        statement, names = translate_params(sql)
+        prepared_cursor = self._connection.cursor(prepared=True)
+        entry = (prepared_cursor, statement, names)
+        self._entries[key] = entry
+        while len(self._entries) > self.maxsize:
+            _, (evicted_cursor, _, _) = self._entries.popitem(last=False)
+            try:
+                evicted_cursor.close()  # Deallocates the statement on the server
+            except Exception:
+                pass
+        return entry
+
+
+class PreparingCursor:
+    """Dictionary cursor that runs registry queries as cached prepared statements.
+
+    Queries that carry a registry key go through the connection's PreparedStatementCache and
+    their rows are returned as dicts, like cursor(dictionary=True). Everything else (inline or
+    templated SQL, executemany) goes through the wrapped text-protocol cursor unchanged.
+    """
+
+    def __init__(self, text_cursor, stmt_cache: PreparedStatementCache):
+        self._text_cursor = text_cursor
+        self._stmt_cache = stmt_cache
+        self._active = text_cursor
+
+    def execute(self, operation, params=None, multi=False):
+        key = getattr(operation, "key", None)
+        if key is not None and not multi and isinstance(params, (tuple, list, dict, type(None))):
+            prepared_cursor, statement, names = self._stmt_cache.get(key, operation)
+            try:
+                if names:
+                    args = tuple(params[name] for name in names)
+                elif params is None:
+                    args = ()
+                elif isinstance(params, dict):
+                    args = None
+                else:
+                    args = tuple(params)
+            except (KeyError, TypeError):
+                args = None
+            # args is None when the params do not fit the statement; the text path reports that as before
+            if args is not None:
+                self._active = prepared_cursor
+                return prepared_cursor.execute(statement, args)
+        self._active = self._text_cursor
+        return self._text_cursor.execute(operation, params, multi)
+
+    def executemany(self, operation, seq_params):
+        # The text cursor already rewrites INSERT executemany into one multi-row statement
+        self._active = self._text_cursor
+        return self._text_cursor.executemany(operation, seq_params)
+
+    def _as_dict(self, row):
+        if row is None or self._active is self._text_cursor:
+            return row
+        return dict(zip(self._active.column_names, row))
+
+    def fetchone(self):
+        return self._as_dict(self._active.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._as_dict(row) for row in self._active.fetchmany(size)]
+
+    def fetchall(self):
+        rows = self._active.fetchall()
+        if self._active is self._text_cursor:
+            return rows
+        names = self._active.column_names
+        return [dict(zip(names, row)) for row in rows]
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        # Prepared cursors belong to the connection's cache and outlive this cursor
+        return self._text_cursor.close()
+
+    def __getattr__(self, name):
+        # lastrowid, rowcount, description, column_names, ... of the cursor that ran last
+        return getattr(self._active, name)
@@ -0,0 +1,205 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from fastapi import HTTPException, status
+from backend.database.db_utils import get_sql
+from backend.database.pool import after_commit
+from backend.utils.intervals import ResourceCalendar, time_to_seconds
+
+SCHEDULE_INDEX_TTL_SECONDS = float(os.getenv("SCHEDULE_INDEX_TTL_SECONDS", "60"))  # 0 disables the index (SQL overlap query instead)
+SCHEDULE_INDEX_MAX_WEEKS = int(os.getenv("SCHEDULE_INDEX_MAX_WEEKS", "16"))
+
+
+def week_key(week_start_date) -> str:
+    if isinstance(week_start_date, date):
+        return week_start_date.isoformat()
+    return str(week_start_date)[:10]
+
+
+class WeekScheduleIndex:
+    """Non-cancelled weekly_schedule rows of one week, indexed per (day, hall) and per (day, trainer)"""
+
+    def __init__(self):
+        self.halls = ResourceCalendar()
+        self.trainers = ResourceCalendar()
+        self._slots = {}  # ref -> (day_of_week, start, end, hall_id, trainer_id)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def add(self, ref, slot):
+        day, start, end, hall_id, trainer_id = slot
+        self._slots[ref] = slot
+        self.halls.add(day, hall_id, start, end, ref)
+        self.trainers.add(day, trainer_id, start, end, ref)
+
+    def remove(self, ref):
+        slot = self._slots.pop(ref, None)
+        if slot is not None:
+            day, _, _, hall_id, trainer_id = slot
+            self.halls.remove(day, hall_id, ref)
+            self.trainers.remove(day, trainer_id, ref)
+        return slot
+
+    def find_conflict(self, slot, exclude_ref=None):
+        """ref of a session sharing the hall or trainer with an overlapping time, or None"""
+        day, start, end, hall_id, trainer_id = slot
+        conflict = self.halls.find_overlap(day, hall_id, start, end, exclude_ref)
+        if conflict is None:
+            conflict = self.trainers.find_overlap(day, trainer_id, start, end, exclude_ref)
+        return conflict
+
+
+class _PendingRef:
+    """Index key of a session whose INSERT has not returned an id yet"""
+    __slots__ = ()
+
+
+class SlotReservation:
+    """A slot held in the index for an open transaction; confirm() swaps in the new schedule_id"""
+
+    def __init__(self, index, ref, slot):
+        self.index = index
+        self.ref = ref
+        self.slot = slot
+
+
+def slot_of(data: dict):
+    """(day_of_week, start, end, hall_id, trainer_id) of a weekly_schedule row or payload, times in seconds"""
+    return (data["day_of_week"], time_to_seconds(data["start_time"]), time_to_seconds(data["end_time"]),
+            int(data["hall_id"]), int(data["trainer_id"]))
+
+
+def load_week_index(cursor, week_start_date, for_update: bool = False) -> WeekScheduleIndex:
+    """A fresh index of one week's non-cancelled sessions, read with `cursor` (as a locking read with for_update)"""
+    sql_name = "weekly_schedule_get_intervals_by_week_for_update" if for_update else "weekly_schedule_get_intervals_by_week"
+    cursor.execute(get_sql(sql_name), (week_key(week_start_date),))
+    index = WeekScheduleIndex()
+    for row in cursor.fetchall():
+        index.add(row["schedule_id"], slot_of(row))
+    return index
+
+
+class ScheduleIndex:
+    """Per-week interval indexes for weekly_schedule overlap checks, built lazily from one query.
+
+    reserve() checks a slot in O(log n) and holds it at once, so concurrent requests in this
+    process cannot book the same hall or trainer; the hold is undone if the transaction rolls
+    back. Deletes leave the index on commit. Other processes (job workers, other API workers)
+    are covered by rebuilding a week once it is older than `ttl_seconds`, and by invalidate().
+
+    The index is a pre-filter, not the guarantee: it turns most conflicts away without a query,
+    and the transaction still runs the SQL overlap check as a locking read before writing, which
+    sees sessions other processes committed since the week was loaded.
+    """
+
+    def __init__(self, ttl_seconds: float = SCHEDULE_INDEX_TTL_SECONDS, max_weeks: int = SCHEDULE_INDEX_MAX_WEEKS):
+        self.ttl_seconds = ttl_seconds
+        self.max_weeks = max_weeks
+        self._weeks = OrderedDict()  # week -> (WeekScheduleIndex, built_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def week(self, cursor, week_start_date) -> WeekScheduleIndex:
+        """The index for a week, (re)built with `cursor` if missing or expired"""
+        week = week_key(week_start_date)
+        with self._lock:
+            entry = self._weeks.get(week)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl_seconds:
+                self._weeks.move_to_end(week)
+                self.hits += 1
+                return entry[0]
+
+        index = load_week_index(cursor, week)
+        with self._lock:
+            self.builds += 1
+            self._weeks[week] = (index, time.monotonic())
+            self._weeks.move_to_end(week)
+            while len(self._weeks) > self.max_weeks:
+                self._weeks.popitem(last=False)
+        return index
+
+    def reserve(self, db_conn, cursor, schedule_data: dict, schedule_id: int = None, previous: dict = None):
+        """Hold a slot for schedule_data (a new session, or `schedule_id` moving from `previous`).
+
+        Raises 409 on overlap. The hold is released if db_conn's transaction does not commit.
+        """
+        index = self.week(cursor, schedule_data["week_start_date"])
+        previous_index = self.week(cursor, previous["week_start_date"]) if previous is not None else None
+        slot = slot_of(schedule_data)
+        cancelled = schedule_data.get("status") == "Cancelled"
+
+        with self._lock:
+            previous_slot = previous_index.remove(schedule_id) if previous_index is not None else None
+            if not cancelled:
+                conflict = index.find_conflict(slot, exclude_ref=schedule_id)
+                if conflict is not None:
+                    if previous_slot is not None:
+                        previous_index.add(schedule_id, previous_slot)
+                    conflict_label = conflict if isinstance(conflict, int) else "(being created)"
+                    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Schedule overlap detected for trainer or hall at this time. Conflicting schedule ID: {conflict_label}")
+            reservation = SlotReservation(index, schedule_id if schedule_id is not None else _PendingRef(), slot)
+            if not cancelled:
+                index.add(reservation.ref, slot)
+
+        def undo():
+            with self._lock:
+                index.remove(reservation.ref)
+                if previous_slot is not None:
+                    previous_index.add(schedule_id, previous_slot)
+
+        after_commit(db_conn, lambda: None, on_rollback=undo)
+        return reservation
+
+    def confirm(self, reservation: SlotReservation, schedule_id: int):
+        """Re-key a new session's hold under the id its INSERT returned"""
+        with self._lock:
+            if reservation.index.remove(reservation.ref) is not None:
+                reservation.index.add(schedule_id, reservation.slot)
+            reservation.ref = schedule_id
+
+    def release(self, reservation: SlotReservation):
+        """Drop a hold right away (the statement it was for failed)"""
+        with self._lock:
+            reservation.index.remove(reservation.ref)
+
+    def remove_on_commit(self, db_conn, week_start_date, schedule_id: int):
+        def remove():
+            with self._lock:
+                entry = self._weeks.get(week_key(week_start_date))
+                if entry is not None:
+                    entry[0].remove(schedule_id)
+        after_commit(db_conn, remove)
+
+    def invalidate(self, week_start_date=None):
+        """Forget one week (or all of them); it is rebuilt from the database on next use"""
+        with self._lock:
+            self.invalidations += 1
+            if week_start_date is None:
+                self._weeks.clear()
+            else:
+                self._weeks.pop(week_key(week_start_date), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "ttl_seconds": self.ttl_seconds,
+                "weeks_indexed": len(self._weeks),
+                "sessions_indexed": sum(len(index) for index, _ in self._weeks.values()),
+                "hits": self.hits,
+                "builds": self.builds,
+                "invalidations": self.invalidations,
+            }
+
+
+schedule_index = ScheduleIndex()
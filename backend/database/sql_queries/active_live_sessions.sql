@@ -0,0 +1,70 @@
+-- NAME: get_all -- Whole index, with the session details /live-sessions/current returns
+SELECT a.member_id, a.trainer_id,
+       ls.live_session_id, ls.schedule_id, ls.start_time, ls.end_time, ls.status, ls.notes, ls.created_at, ls.updated_at,
+       ws.hall_id, h.name as hall_name, CONCAT(u.first_name, ' ', u.last_name) as trainer_name
+FROM active_live_sessions a
+JOIN live_sessions ls ON a.live_session_id = ls.live_session_id
+JOIN weekly_schedule ws ON ls.schedule_id = ws.schedule_id
+JOIN halls h ON ws.hall_id = h.hall_id
+JOIN trainers t ON ws.trainer_id = t.trainer_id
+JOIN users u ON t.user_id = u.user_id;
+
+-- NAME: get_by_live_session_id
+SELECT a.member_id, a.trainer_id,
+       ls.live_session_id, ls.schedule_id, ls.start_time, ls.end_time, ls.status, ls.notes, ls.created_at, ls.updated_at,
+       ws.hall_id, h.name as hall_name, CONCAT(u.first_name, ' ', u.last_name) as trainer_name
+FROM active_live_sessions a
+JOIN live_sessions ls ON a.live_session_id = ls.live_session_id
+JOIN weekly_schedule ws ON ls.schedule_id = ws.schedule_id
+JOIN halls h ON ws.hall_id = h.hall_id
+JOIN trainers t ON ws.trainer_id = t.trainer_id
+JOIN users u ON t.user_id = u.user_id
+WHERE a.live_session_id = %s;
+
+-- NAME: add_trainer
+INSERT IGNORE INTO active_live_sessions (live_session_id, trainer_id, start_time)
+SELECT ls.live_session_id, ws.trainer_id, ls.start_time
+FROM live_sessions ls
+JOIN weekly_schedule ws ON ls.schedule_id = ws.schedule_id
+WHERE ls.live_session_id = %s;
+
+-- NAME: add_members -- Members of the session: booked into the slot (not Cancelled/No Show) or checked in
+INSERT IGNORE INTO active_live_sessions (live_session_id, member_id, start_time)
+SELECT ls.live_session_id, sm.member_id, ls.start_time
+FROM live_sessions ls
+JOIN schedule_members sm ON ls.schedule_id = sm.schedule_id
+WHERE ls.live_session_id = %(live_session_id)s AND sm.status NOT IN ('Cancelled', 'No Show')
+UNION
+SELECT ls.live_session_id, lsa.member_id, ls.start_time
+FROM live_sessions ls
+JOIN live_session_attendance lsa ON ls.live_session_id = lsa.live_session_id
+WHERE ls.live_session_id = %(live_session_id)s;
+
+-- NAME: add_checked_in_member -- A check-in always makes the member part of an active session
+INSERT IGNORE INTO active_live_sessions (live_session_id, member_id, start_time)
+SELECT ls.live_session_id, %(member_id)s, ls.start_time
+FROM live_sessions ls
+WHERE ls.live_session_id = %(live_session_id)s AND ls.status IN ('Started', 'In Progress');
+
+-- NAME: get_live_session_ids_by_schedule -- Active live sessions of a slot whose bookings changed
+SELECT live_session_id
+FROM live_sessions
+WHERE schedule_id = %s AND status IN ('Started', 'In Progress');
+
+-- NAME: delete_member_by_live_session_id
+DELETE FROM active_live_sessions
+WHERE live_session_id = %(live_session_id)s AND member_id = %(member_id)s;
+
+-- NAME: add_member -- Same rule as add_members, for one member after a booking change
+INSERT IGNORE INTO active_live_sessions (live_session_id, member_id, start_time)
+SELECT ls.live_session_id, %(member_id)s, ls.start_time
+FROM live_sessions ls
+WHERE ls.live_session_id = %(live_session_id)s
+  AND (EXISTS (SELECT 1 FROM schedule_members sm
+               WHERE sm.schedule_id = ls.schedule_id AND sm.member_id = %(member_id)s AND sm.status NOT IN ('Cancelled', 'No Show'))
+       OR EXISTS (SELECT 1 FROM live_session_attendance lsa
+                  WHERE lsa.live_session_id = ls.live_session_id AND lsa.member_id = %(member_id)s));
+
+-- NAME: delete_by_live_session_id
+DELETE FROM active_live_sessions
+WHERE live_session_id = %s;
@@ -0,0 +1,43 @@
+-- NAME: get_by_id
+SELECT job_id, job_type, status, progress, progress_message, params, result, error, created_by, created_at, started_at, finished_at, updated_at
+FROM background_jobs
+WHERE job_id = %s;
+
+-- NAME: create
+INSERT INTO background_jobs (job_id, job_type, status, params, created_by, owner)
+VALUES (%(job_id)s, %(job_type)s, 'Queued', %(params)s, %(created_by)s, %(owner)s);
+
+-- NAME: mark_running
+UPDATE background_jobs
+SET status = 'Running', started_at = CURRENT_TIMESTAMP, progress = 0
+WHERE job_id = %s;
+
+-- NAME: update_progress
+UPDATE background_jobs
+SET progress = %(progress)s, progress_message = %(progress_message)s
+WHERE job_id = %(job_id)s;
+
+-- NAME: mark_succeeded
+UPDATE background_jobs
+SET status = 'Succeeded', progress = 100, result = %(result)s, finished_at = CURRENT_TIMESTAMP
+WHERE job_id = %(job_id)s;
+
+-- NAME: mark_failed
+UPDATE background_jobs
+SET status = 'Failed', error = %(error)s, finished_at = CURRENT_TIMESTAMP
+WHERE job_id = %(job_id)s;
+
+-- NAME: get_unfinished_owners
+SELECT DISTINCT owner
+FROM background_jobs
+WHERE status IN ('Queued', 'Running') AND owner IS NOT NULL;
+
+-- NAME: fail_unfinished_by_owner -- At startup: jobs of an API process that is gone can no longer complete
+UPDATE background_jobs
+SET status = 'Failed', error = 'Interrupted by a server restart', finished_at = CURRENT_TIMESTAMP
+WHERE status IN ('Queued', 'Running') AND owner = %s;
+
+-- NAME: fail_unfinished_stale -- Owner unknown or elsewhere: only once the job stopped reporting progress
+UPDATE background_jobs
+SET status = 'Failed', error = 'Interrupted: no progress reported for too long', finished_at = CURRENT_TIMESTAMP
+WHERE status IN ('Queued', 'Running') AND updated_at < NOW() - INTERVAL %s SECOND;
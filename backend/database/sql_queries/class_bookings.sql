@@ -3,6 +3,12 @@ SELECT booking_id, class_id, member_id, booking_date, payment_status, amount_pai
 FROM class_bookings
 WHERE booking_id = %s;
 
+-- NAME: get_by_id_for_update -- Locks the booking so concurrent changes cannot both give back its seat
+SELECT booking_id, class_id, member_id, booking_date, payment_status, amount_paid, attendance_status, cancellation_date, cancellation_reason, email_notification_sent
+FROM class_bookings
+WHERE booking_id = %s
+FOR UPDATE;
+
 -- NAME: get_by_class_id
 SELECT cb.booking_id, cb.class_id, cb.member_id, cb.booking_date, cb.payment_status, cb.amount_paid, cb.attendance_status,
        u.first_name, u.last_name, u.email, u.profile_image_path
@@ -0,0 +1,38 @@
+-- NAME: get_by_id
+SELECT waitlist_id, class_id, member_id, status, booking_id, created_at, promoted_at
+FROM class_waitlist
+WHERE waitlist_id = %s;
+
+-- NAME: get_waiting_by_class_id -- Queue order
+SELECT cw.waitlist_id, cw.class_id, cw.member_id, CONCAT(u.first_name, ' ', u.last_name) as member_name, cw.created_at
+FROM class_waitlist cw
+JOIN members m ON cw.member_id = m.member_id
+JOIN users u ON m.user_id = u.user_id
+WHERE cw.class_id = %s AND cw.status = 'Waiting'
+ORDER BY cw.waitlist_id;
+
+-- NAME: get_position -- 1-based place in the queue
+SELECT COUNT(*) as position
+FROM class_waitlist
+WHERE class_id = %(class_id)s AND status = 'Waiting' AND waitlist_id <= %(waitlist_id)s;
+
+-- NAME: create
+INSERT INTO class_waitlist (class_id, member_id)
+VALUES (%(class_id)s, %(member_id)s);
+
+-- NAME: get_head_for_update -- Oldest waiting entry, locked; one seek on (class_id, status, waitlist_id)
+SELECT cw.waitlist_id, cw.class_id, cw.member_id, m.user_id
+FROM class_waitlist cw
+JOIN members m ON cw.member_id = m.member_id
+WHERE cw.class_id = %s AND cw.status = 'Waiting'
+ORDER BY cw.waitlist_id
+LIMIT 1
+FOR UPDATE;
+
+-- NAME: mark_promoted
+UPDATE class_waitlist
+SET status = 'Promoted', promoted_at = NOW(), booking_id = %(booking_id)s
+WHERE waitlist_id = %(waitlist_id)s;
+
+-- NAME: delete_by_id
+DELETE FROM class_waitlist WHERE waitlist_id = %s;
@@ -1,6 +1,7 @@
 -- NAME: get_by_id
 SELECT class_id, class_type_id, trainer_id, hall_id, date, start_time, end_time, max_participants, current_participants, price, status, notes, created_at, updated_at
-
+FROM classes
+WHERE class_id = %s;
 
 -- NAME: get_detailed_by_id -- New specific query
 SELECT 
@@ -15,9 +16,7 @@ LEFT JOIN class_types ct ON c.class_type_id = ct.class_type_id
 LEFT JOIN halls h ON c.hall_id = h.hall_id
 LEFT JOIN trainers t ON c.trainer_id = t.trainer_id
 LEFT JOIN users u ON t.user_id = u.user_id
-WHERE c.class_id = %s;CT class_id, class_type_id, trainer_id, hall_id, date, start_time, end_time, max_participants, current_participants, price, status, notes, created_at, updated_at
-FROM classes
-WHERE class_id = %s;
+WHERE c.class_id = %s;
 
 -- NAME: get_all
 SELECT class_id, class_type_id, trainer_id, hall_id, date, start_time, end_time, max_participants, current_participants, price, status, notes, created_at, updated_at
@@ -40,6 +39,23 @@ LEFT JOIN trainers t ON c.trainer_id = t.trainer_id
 LEFT JOIN users u ON t.user_id = u.user_id
 ORDER BY c.date DESC, c.start_time ASC;
 
+-- NAME: get_page_detailed -- Keyset pagination, same order as get_all_detailed
+SELECT 
+    c.class_id, c.class_type_id, c.trainer_id, c.hall_id, c.date, c.start_time, c.end_time, 
+    c.max_participants, c.current_participants, c.price, c.status, c.notes, c.created_at, c.updated_at,
+    ct.name AS name, ct.name AS class_type_name, ct.description AS class_type_description,
+    ct.difficulty_level AS class_type_difficulty, ct.duration_minutes AS class_type_duration,
+    h.name AS hall_name, 
+    CONCAT(u.first_name, ' ', u.last_name) AS trainer_name
+FROM classes c
+LEFT JOIN class_types ct ON c.class_type_id = ct.class_type_id
+LEFT JOIN halls h ON c.hall_id = h.hall_id
+LEFT JOIN trainers t ON c.trainer_id = t.trainer_id
+LEFT JOIN users u ON t.user_id = u.user_id
+WHERE {keyset_condition}
+ORDER BY c.date DESC, c.start_time ASC, c.class_id ASC
+LIMIT %(page_limit)s;
+
 -- NAME: create
 INSERT INTO classes (class_type_id, trainer_id, hall_id, date, start_time, end_time, max_participants, current_participants, price, status, notes)
 VALUES (%(class_type_id)s, %(trainer_id)s, %(hall_id)s, %(date)s, %(start_time)s, %(end_time)s, %(max_participants)s, %(current_participants)s, %(price)s, %(status)s, %(notes)s);
@@ -54,6 +70,16 @@ UPDATE classes
 SET current_participants = %(current_participants)s
 WHERE class_id = %(class_id)s;
 
+-- NAME: reserve_seat -- Atomic capacity check: affects 0 rows when the class is full (row stays locked until commit)
+UPDATE classes
+SET current_participants = current_participants + 1
+WHERE class_id = %s AND current_participants < max_participants;
+
+-- NAME: release_seat
+UPDATE classes
+SET current_participants = current_participants - 1
+WHERE class_id = %s AND current_participants > 0;
+
 -- NAME: delete_by_id
 DELETE FROM classes WHERE class_id = %s;
 
@@ -69,4 +95,9 @@ FROM classes WHERE hall_id = %s ORDER BY date DESC, start_time ASC;
 SELECT class_id, class_type_id, trainer_id, hall_id, date, start_time, end_time, max_participants, current_participants, price, status, notes
 FROM classes 
 WHERE date >= %(start_date)s AND date <= %(end_date)s -- Use >= and <= for inclusive range
-ORDER BY date ASC, start_time ASC;
\ No newline at end of file
+ORDER BY date ASC, start_time ASC;
+
+-- NAME: get_blocking_by_date_range -- Trainer/hall occupancy for the weekly schedule generator
+SELECT trainer_id, hall_id, date, DAYNAME(date) as day_of_week, start_time, end_time
+FROM classes
+WHERE date >= %(start_date)s AND date <= %(end_date)s AND status != 'Cancelled';
@@ -9,6 +9,13 @@ FROM email_notifications
 WHERE user_id = %s
 ORDER BY sent_at DESC;
 
+-- NAME: get_page_by_user_id -- Keyset pagination, newest first
+SELECT notification_id, user_id, subject, message, sent_at, status, related_type, related_id
+FROM email_notifications
+WHERE user_id = %(user_id)s AND {keyset_condition}
+ORDER BY sent_at DESC, notification_id DESC
+LIMIT %(page_limit)s;
+
 -- NAME: get_by_status
 SELECT notification_id, user_id, subject, message, sent_at, status, related_type, related_id
 FROM email_notifications
@@ -14,6 +14,17 @@ FROM exercises
 WHERE is_active = %s
 ORDER BY name;
 
+-- NAME: get_page -- Keyset pagination, same order as get_all
+SELECT exercise_id, name, description, instructions, difficulty_level, primary_muscle_group, secondary_muscle_groups, equipment_needed, image_url, video_url, is_active, created_at, updated_at
+FROM exercises
+WHERE {keyset_condition}
+  AND (%(is_active)s IS NULL OR is_active = %(is_active)s)
+ORDER BY name, exercise_id
+LIMIT %(page_limit)s;
+
+-- NAME: get_existing_ids -- Which of a list of exercise ids exist
+SELECT exercise_id FROM exercises WHERE exercise_id IN ({id_placeholders}); -- Placeholder
+
 -- NAME: create
 INSERT INTO exercises (name, description, instructions, difficulty_level, primary_muscle_group, secondary_muscle_groups, equipment_needed, image_url, video_url, is_active)
 VALUES (%(name)s, %(description)s, %(instructions)s, %(difficulty_level)s, %(primary_muscle_group)s, %(secondary_muscle_groups)s, %(equipment_needed)s, %(image_url)s, %(video_url)s, %(is_active)s);
@@ -13,6 +13,13 @@ FROM financial_transactions
 WHERE member_id = %s
 ORDER BY transaction_date DESC;
 
+-- NAME: get_page_by_member_id -- Keyset pagination, newest first
+SELECT transaction_id, member_id, transaction_type, amount, payment_method, transaction_date, status, reference_id, notes
+FROM financial_transactions
+WHERE member_id = %(member_id)s AND {keyset_condition}
+ORDER BY transaction_date DESC, transaction_id DESC
+LIMIT %(page_limit)s;
+
 -- NAME: get_by_type
 SELECT transaction_id, member_id, transaction_type, amount, payment_method, transaction_date, status, reference_id, notes
 FROM financial_transactions
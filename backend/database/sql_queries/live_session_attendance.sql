@@ -23,4 +23,18 @@ VALUES (%(live_session_id)s, %(member_id)s, %(check_in_time)s, 'Checked In', %(n
 -- NAME: update_check_out_or_status
 UPDATE live_session_attendance
 SET status = %(status)s, check_out_time = %(check_out_time)s, notes = %(notes)s, updated_at = NOW()
-WHERE id = %(id)s;
\ No newline at end of file
+WHERE id = %(id)s;
+
+-- NAME: get_by_live_session_ids
+SELECT lsa.id, lsa.live_session_id, lsa.member_id, CONCAT(u.first_name, ' ', u.last_name) as member_name,
+       lsa.check_in_time, lsa.check_out_time, lsa.status, lsa.notes
+FROM live_session_attendance lsa
+JOIN members m ON lsa.member_id = m.member_id
+JOIN users u ON m.user_id = u.user_id
+WHERE lsa.live_session_id IN ({id_placeholders});
+
+-- NAME: upsert -- Live session store checkpoint: one row per (live_session_id, member_id), executemany'd
+INSERT INTO live_session_attendance (live_session_id, member_id, check_in_time, check_out_time, status, notes)
+VALUES (%(live_session_id)s, %(member_id)s, %(check_in_time)s, %(check_out_time)s, %(status)s, %(notes)s)
+ON DUPLICATE KEY UPDATE check_in_time = VALUES(check_in_time), check_out_time = VALUES(check_out_time),
+                        status = VALUES(status), notes = VALUES(notes);
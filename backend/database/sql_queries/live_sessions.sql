@@ -50,4 +50,32 @@ WHERE live_session_id = %(live_session_id)s;
 -- NAME: update_notes -- Example of a more specific update
 UPDATE live_sessions
 SET notes = %(notes)s, updated_at = NOW()
-WHERE live_session_id = %(live_session_id)s;
\ No newline at end of file
+WHERE live_session_id = %(live_session_id)s;
+
+-- NAME: get_current_for_member -- Used when the active session index is disabled
+SELECT ls.live_session_id, ls.schedule_id, ls.start_time, ls.end_time, ls.status, ls.notes, ls.created_at, ls.updated_at,
+       ws.hall_id, h.name as hall_name, CONCAT(u.first_name, ' ', u.last_name) as trainer_name
+FROM live_sessions ls
+JOIN weekly_schedule ws ON ls.schedule_id = ws.schedule_id
+JOIN halls h ON ws.hall_id = h.hall_id
+JOIN trainers t ON ws.trainer_id = t.trainer_id
+JOIN users u ON t.user_id = u.user_id
+WHERE ls.status IN ('Started', 'In Progress')
+  AND (EXISTS (SELECT 1 FROM schedule_members sm -- Same membership rule as active_live_sessions_add_members
+               WHERE sm.schedule_id = ls.schedule_id AND sm.member_id = %(member_id)s AND sm.status NOT IN ('Cancelled', 'No Show'))
+       OR EXISTS (SELECT 1 FROM live_session_attendance lsa
+                  WHERE lsa.live_session_id = ls.live_session_id AND lsa.member_id = %(member_id)s))
+ORDER BY ls.start_time DESC
+LIMIT 1;
+
+-- NAME: get_current_for_trainer -- Used when the active session index is disabled
+SELECT ls.live_session_id, ls.schedule_id, ls.start_time, ls.end_time, ls.status, ls.notes, ls.created_at, ls.updated_at,
+       ws.hall_id, h.name as hall_name, CONCAT(u.first_name, ' ', u.last_name) as trainer_name
+FROM live_sessions ls
+JOIN weekly_schedule ws ON ls.schedule_id = ws.schedule_id
+JOIN halls h ON ws.hall_id = h.hall_id
+JOIN trainers t ON ws.trainer_id = t.trainer_id
+JOIN users u ON t.user_id = u.user_id
+WHERE ws.trainer_id = %s AND ls.status IN ('Started', 'In Progress')
+ORDER BY ls.start_time DESC
+LIMIT 1;
@@ -17,8 +17,13 @@ JOIN exercises ex ON lwe.exercise_id = ex.exercise_id
 WHERE lwe.logged_workout_id = %s
 ORDER BY lwe.`order_in_workout`;
 
+-- NAME: get_orders_by_logged_workout_ids -- Orders already taken, to explain a duplicate-key error of a batch insert
+SELECT logged_workout_id, `order_in_workout`
+FROM logged_workout_exercises
+WHERE logged_workout_id IN ({id_placeholders}); -- Placeholder
+
 -- NAME: create_batch -- For inserting multiple exercises for a workout
--- This is a template; actual execution will loop through items in Python
+-- This is a template; create_single is sent with executemany, which makes it one multi-row INSERT
 -- INSERT INTO logged_workout_exercises (logged_workout_id, exercise_id, training_day_exercise_id, `order_in_workout`, sets_prescribed, reps_prescribed, weight_prescribed, rest_prescribed_seconds, duration_prescribed_seconds, sets_completed, reps_actual_per_set, weight_actual_per_set, rest_actual_seconds_per_set, duration_actual_seconds, notes_exercise_specific, completed_at) VALUES (...);
 
 -- NAME: create_single
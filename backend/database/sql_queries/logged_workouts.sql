@@ -19,6 +19,11 @@ LEFT JOIN training_plan_days tpd ON lw.training_plan_day_id = tpd.day_id
 WHERE lw.member_id = %s
 ORDER BY lw.workout_date DESC;
 
+-- NAME: get_ids_by_live_session_id -- Maps the rows of a bulk INSERT back to their members
+SELECT logged_workout_id, member_id
+FROM logged_workouts
+WHERE live_session_id = %s;
+
 -- NAME: create
 INSERT INTO logged_workouts (member_id, member_active_plan_id, training_plan_day_id, workout_date, duration_minutes_actual, notes_overall_session, source, live_session_id)
 VALUES (%(member_id)s, %(member_active_plan_id)s, %(training_plan_day_id)s, %(workout_date)s, %(duration_minutes_actual)s, %(notes_overall_session)s, %(source)s, %(live_session_id)s);
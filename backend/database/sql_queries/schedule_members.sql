@@ -50,4 +50,16 @@ DELETE FROM schedule_members WHERE schedule_id = %(schedule_id)s AND member_id =
 -- NAME: get_by_schedule_id_and_member_id
 SELECT id, schedule_id, member_id, status, training_plan_day_id
 FROM schedule_members
-WHERE schedule_id = %(schedule_id)s AND member_id = %(member_id)s;
\ No newline at end of file
+WHERE schedule_id = %(schedule_id)s AND member_id = %(member_id)s;
+
+-- NAME: get_by_schedule_id_and_member_ids
+SELECT id, schedule_id, member_id, status, training_plan_day_id
+FROM schedule_members
+WHERE schedule_id = %(schedule_id)s AND member_id IN ({id_placeholders}); -- Placeholder
+
+-- NAME: get_active_by_week
+SELECT sm.schedule_id, sm.member_id
+FROM schedule_members sm
+JOIN weekly_schedule ws ON sm.schedule_id = ws.schedule_id
+WHERE ws.week_start_date = %(week_start_date)s AND ws.status != 'Cancelled'
+  AND sm.status NOT IN ('Cancelled', 'No Show');
@@ -0,0 +1,39 @@
+-- NAME: get_by_id
+SELECT waitlist_id, schedule_id, member_id, training_plan_day_id, status, schedule_member_id, created_at, promoted_at
+FROM schedule_waitlist
+WHERE waitlist_id = %s;
+
+-- NAME: get_waiting_by_schedule_id -- Queue order
+SELECT sw.waitlist_id, sw.schedule_id, sw.member_id, CONCAT(u.first_name, ' ', u.last_name) as member_name,
+       sw.training_plan_day_id, sw.created_at
+FROM schedule_waitlist sw
+JOIN members m ON sw.member_id = m.member_id
+JOIN users u ON m.user_id = u.user_id
+WHERE sw.schedule_id = %s AND sw.status = 'Waiting'
+ORDER BY sw.waitlist_id;
+
+-- NAME: get_position -- 1-based place in the queue
+SELECT COUNT(*) as position
+FROM schedule_waitlist
+WHERE schedule_id = %(schedule_id)s AND status = 'Waiting' AND waitlist_id <= %(waitlist_id)s;
+
+-- NAME: create
+INSERT INTO schedule_waitlist (schedule_id, member_id, training_plan_day_id)
+VALUES (%(schedule_id)s, %(member_id)s, %(training_plan_day_id)s);
+
+-- NAME: get_head_for_update -- Oldest waiting entry, locked; one seek on (schedule_id, status, waitlist_id)
+SELECT sw.waitlist_id, sw.schedule_id, sw.member_id, sw.training_plan_day_id, m.user_id
+FROM schedule_waitlist sw
+JOIN members m ON sw.member_id = m.member_id
+WHERE sw.schedule_id = %s AND sw.status = 'Waiting'
+ORDER BY sw.waitlist_id
+LIMIT 1
+FOR UPDATE;
+
+-- NAME: mark_promoted
+UPDATE schedule_waitlist
+SET status = 'Promoted', promoted_at = NOW(), schedule_member_id = %(schedule_member_id)s
+WHERE waitlist_id = %(waitlist_id)s;
+
+-- NAME: delete_by_id
+DELETE FROM schedule_waitlist WHERE waitlist_id = %s;
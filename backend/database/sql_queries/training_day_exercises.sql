@@ -10,6 +10,9 @@ JOIN exercises ex ON tde.exercise_id = ex.exercise_id
 WHERE tde.day_id = %s
 ORDER BY tde.`order`;
 
+-- NAME: get_existing_ids
+SELECT id FROM training_day_exercises WHERE id IN ({id_placeholders}); -- Placeholder
+
 -- NAME: create
 INSERT INTO training_day_exercises (day_id, exercise_id, `order`, sets, reps, rest_seconds, duration_seconds, notes)
 VALUES (%(day_id)s, %(exercise_id)s, %(order)s, %(sets)s, %(reps)s, %(rest_seconds)s, %(duration_seconds)s, %(notes)s);
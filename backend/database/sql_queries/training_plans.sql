@@ -27,6 +27,15 @@ SELECT plan_id, title, description, difficulty_level, duration_weeks, days_per_w
 FROM training_plans
 ORDER BY title;
 
+-- NAME: get_page -- Keyset pagination with the same optional filters as get_all_training_plans
+SELECT plan_id, title, description, difficulty_level, duration_weeks, days_per_week, primary_focus, secondary_focus, target_gender, min_age, max_age, equipment_needed, created_by, is_custom, is_active, created_at, updated_at
+FROM training_plans
+WHERE {keyset_condition}
+  AND (%(is_active)s IS NULL OR is_active = %(is_active)s)
+  AND (%(trainer_id)s IS NULL OR created_by = %(trainer_id)s)
+ORDER BY title, plan_id
+LIMIT %(page_limit)s;
+
 -- NAME: get_all_by_active_status
 SELECT plan_id, title, description, difficulty_level, duration_weeks, days_per_week, primary_focus, secondary_focus, target_gender, min_age, max_age, equipment_needed, created_by, is_custom, is_active, created_at, updated_at
 FROM training_plans
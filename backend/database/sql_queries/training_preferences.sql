@@ -33,4 +33,22 @@ WHERE member_id = %(member_id)s AND week_start_date = %(week_start_date)s;
 
 
 -- NAME: check_for_week
-SELECT 1 FROM training_preferences WHERE week_start_date = %s LIMIT 1;
\ No newline at end of file
+SELECT 1 FROM training_preferences WHERE week_start_date = %s LIMIT 1;
+
+-- NAME: get_for_week -- Every member's preferences for one week (schedule generator input)
+SELECT member_id, day_of_week, start_time, end_time, preference_type, trainer_id
+FROM training_preferences
+WHERE week_start_date = %(week_start_date)s;
+
+-- NAME: upsert -- Batch insert/update keyed by UNIQUE (member_id, week_start_date, day_of_week, start_time, end_time)
+INSERT INTO training_preferences (member_id, week_start_date, day_of_week, start_time, end_time, preference_type, trainer_id)
+VALUES (%(member_id)s, %(week_start_date)s, %(day_of_week)s, %(start_time)s, %(end_time)s, %(preference_type)s, %(trainer_id)s)
+ON DUPLICATE KEY UPDATE preference_type = VALUES(preference_type), trainer_id = VALUES(trainer_id);
+
+-- NAME: delete_by_ids
+DELETE FROM training_preferences
+WHERE member_id = %(member_id)s AND preference_id IN ({id_placeholders}); -- Placeholder
+
+-- NAME: delete_by_slots -- Buffered "clear slot" edits of many members in one statement
+DELETE FROM training_preferences
+WHERE (member_id, week_start_date, day_of_week, start_time, end_time) IN ({slot_placeholders}); -- Placeholder
@@ -13,11 +13,13 @@ SELECT user_id, auth_id, email, first_name, last_name, phone, date_of_birth, gen
 FROM users
 WHERE user_id = %s;
 
--- NAME: get_all
+-- NAME: get_page -- Keyset pagination, {keyset_condition} is filled in by pagination.fetch_keyset_page
 SELECT user_id, auth_id, email, first_name, last_name, phone, date_of_birth, gender, profile_image_path, user_type, created_at, updated_at, is_active
 FROM users
+WHERE {keyset_condition}
+  AND (%(user_type)s IS NULL OR user_type = %(user_type)s)
 ORDER BY user_id
-LIMIT %s OFFSET %s;
+LIMIT %(page_limit)s;
 
 -- NAME: create
 INSERT INTO users (auth_id, email, first_name, last_name, phone, date_of_birth, gender, profile_image_path, user_type, is_active)
@@ -29,4 +31,13 @@ SET {set_clauses} -- This placeholder will be replaced by Python code
 WHERE auth_id = %(auth_id)s;
 
 -- NAME: delete_by_auth_id
-DELETE FROM users WHERE auth_id = %s;
\ No newline at end of file
+DELETE FROM users WHERE auth_id = %s;
+
+-- NAME: get_session_profile_by_auth_id
+SELECT u.user_id, u.auth_id, u.email, u.first_name, u.last_name, u.user_type,
+       m.member_id, t.trainer_id, mg.manager_id
+FROM users u
+LEFT JOIN members m ON m.user_id = u.user_id
+LEFT JOIN trainers t ON t.user_id = u.user_id
+LEFT JOIN managers mg ON mg.user_id = u.user_id
+WHERE u.auth_id = %s;
@@ -1,14 +1,28 @@
 -- NAME: get_by_id
-SELECT schedule_id, week_start_date, day_of_week, start_time, end_time, hall_id, trainer_id, max_capacity, status, created_by, created_at, updated_at
+SELECT schedule_id, week_start_date, day_of_week, start_time, end_time, hall_id, trainer_id, max_capacity, current_participants, status, created_by, created_at, updated_at
 FROM weekly_schedule
 WHERE schedule_id = %s;
 
+-- NAME: reserve_seat -- Atomic capacity check: affects 0 rows when the session is full (row stays locked until commit)
+UPDATE weekly_schedule
+SET current_participants = current_participants + 1
+WHERE schedule_id = %s AND current_participants < max_capacity;
+
+-- NAME: release_seat
+UPDATE weekly_schedule
+SET current_participants = current_participants - 1
+WHERE schedule_id = %s AND current_participants > 0;
+
+-- NAME: add_participants -- Bulk assignments (schedule generation); capacity was checked by the solver
+UPDATE weekly_schedule
+SET current_participants = current_participants + %(added)s
+WHERE schedule_id = %(schedule_id)s;
+
 -- NAME: get_by_week
 SELECT ws.schedule_id, ws.week_start_date, ws.day_of_week, ws.start_time, ws.end_time, 
        ws.hall_id, h.name as hall_name, 
        ws.trainer_id, CONCAT(u_trainer.first_name, ' ', u_trainer.last_name) as trainer_name,
-       ws.max_capacity, 
-       (SELECT COUNT(*) FROM schedule_members sm WHERE sm.schedule_id = ws.schedule_id AND sm.status NOT IN ('Cancelled', 'No Show')) as current_participants,
+       ws.max_capacity, ws.current_participants,
        ws.status, ws.created_by
 FROM weekly_schedule ws
 JOIN halls h ON ws.hall_id = h.hall_id
@@ -21,8 +35,7 @@ ORDER BY ws.day_of_week, ws.start_time;
 SELECT ws.schedule_id, ws.week_start_date, ws.day_of_week, ws.start_time, ws.end_time, 
        ws.hall_id, h.name as hall_name, 
        ws.trainer_id, CONCAT(u_trainer.first_name, ' ', u_trainer.last_name) as trainer_name,
-       ws.max_capacity, 
-       (SELECT COUNT(*) FROM schedule_members sm WHERE sm.schedule_id = ws.schedule_id AND sm.status NOT IN ('Cancelled', 'No Show')) as current_participants,
+       ws.max_capacity, ws.current_participants,
        ws.status
 FROM weekly_schedule ws
 JOIN halls h ON ws.hall_id = h.hall_id
@@ -35,8 +48,7 @@ ORDER BY ws.day_of_week, ws.start_time;
 SELECT ws.schedule_id, ws.week_start_date, ws.day_of_week, ws.start_time, ws.end_time, 
        ws.hall_id, h.name as hall_name, 
        ws.trainer_id, CONCAT(u_trainer.first_name, ' ', u_trainer.last_name) as trainer_name,
-       ws.max_capacity, 
-       (SELECT COUNT(*) FROM schedule_members sm WHERE sm.schedule_id = ws.schedule_id AND sm.status NOT IN ('Cancelled', 'No Show')) as current_participants,
+       ws.max_capacity, ws.current_participants,
        ws.status
 FROM weekly_schedule ws
 JOIN halls h ON ws.hall_id = h.hall_id
@@ -57,7 +69,7 @@ WHERE schedule_id = %(schedule_id)s;
 -- NAME: delete_by_id
 DELETE FROM weekly_schedule WHERE schedule_id = %s;
 
--- NAME: check_overlap -- For validating new schedule slots
+-- NAME: check_overlap -- For validating new schedule slots; a locking read, so it sees rows other processes committed
 SELECT schedule_id FROM weekly_schedule
 WHERE day_of_week = %(day_of_week)s
   AND week_start_date = %(week_start_date)s
@@ -66,4 +78,38 @@ WHERE day_of_week = %(day_of_week)s
     (%(start_time)s < end_time AND %(end_time)s > start_time)
   )
   AND status != 'Cancelled'
-  AND (%(schedule_id_to_exclude)s IS NULL OR schedule_id != %(schedule_id_to_exclude)s); -- For updates
\ No newline at end of file
+  AND (%(schedule_id_to_exclude)s IS NULL OR schedule_id != %(schedule_id_to_exclude)s) -- For updates
+FOR UPDATE;
+
+-- NAME: get_active_by_week_with_counts -- Input for the weekly schedule generator
+SELECT ws.schedule_id, ws.day_of_week, ws.start_time, ws.end_time, ws.hall_id, ws.trainer_id, ws.max_capacity,
+       ws.current_participants as member_count
+FROM weekly_schedule ws
+WHERE ws.week_start_date = %(week_start_date)s AND ws.status != 'Cancelled';
+
+-- NAME: get_intervals_by_week -- Builds the in-memory overlap index for one week
+SELECT schedule_id, day_of_week, start_time, end_time, hall_id, trainer_id
+FROM weekly_schedule
+WHERE week_start_date = %s AND status != 'Cancelled';
+
+-- NAME: get_intervals_by_week_for_update -- Bulk creation: the week as committed, locked until the transaction ends
+SELECT schedule_id, day_of_week, start_time, end_time, hall_id, trainer_id
+FROM weekly_schedule
+WHERE week_start_date = %s AND status != 'Cancelled'
+FOR UPDATE;
+
+-- NAME: get_participant_count_drift -- Sessions whose stored current_participants differs from their bookings (NULL week = all weeks)
+SELECT ws.schedule_id, ws.week_start_date, ws.current_participants, COUNT(sm.id) as actual_participants
+FROM weekly_schedule ws
+LEFT JOIN schedule_members sm ON sm.schedule_id = ws.schedule_id AND sm.status NOT IN ('Cancelled', 'No Show')
+WHERE (%(week_start_date)s IS NULL OR ws.week_start_date = %(week_start_date)s)
+GROUP BY ws.schedule_id
+HAVING ws.current_participants <> COUNT(sm.id);
+
+-- NAME: recount_participants -- Locks the session row, then recounts from the latest committed bookings
+UPDATE weekly_schedule
+SET current_participants = (
+    SELECT COUNT(*) FROM schedule_members sm
+    WHERE sm.schedule_id = %(schedule_id)s AND sm.status NOT IN ('Cancelled', 'No Show')
+)
+WHERE schedule_id = %(schedule_id)s;
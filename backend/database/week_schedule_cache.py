@@ -0,0 +1,134 @@
+import hashlib
+import os
+import threading
+
+from backend.database.db_utils import dumps_json
+from backend.database.pool import after_commit
+from backend.database.schedule_index import week_key
+from backend.utils.cache import TTLCache
+
+WEEK_SCHEDULE_CACHE_TTL_SECONDS = float(os.getenv("WEEK_SCHEDULE_CACHE_TTL_SECONDS", "30"))  # 0 disables the cache
+WEEK_SCHEDULE_CACHE_MAX_ENTRIES = int(os.getenv("WEEK_SCHEDULE_CACHE_MAX_ENTRIES", "512"))
+
+
+def etag_of(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+class WeekScheduleCache:
+    """Rendered weekly-schedules-for-week responses, keyed by (week, trainer_id, hall_id).
+
+    Scheduling writes invalidate the weeks they touch once their transaction commits (seat
+    changes only know the schedule_id; its week is learnt from the cached rows). Every
+    invalidation bumps a per-week version, and a response read under an older version is
+    not stored, so a read racing a commit can't put stale data back. Writes made by other
+    processes show up within `ttl_seconds`.
+
+    The ETag is a hash of the body, so clients revalidating with If-None-Match get a 304
+    whenever the week is unchanged, even right after an invalidation.
+    """
+
+    def __init__(self, ttl_seconds: float = WEEK_SCHEDULE_CACHE_TTL_SECONDS, max_entries: int = WEEK_SCHEDULE_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self._entries = TTLCache("week_schedule", maxsize=max_entries, ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+        self._versions = {}  # week -> number of invalidations so far
+        self._epoch = 0  # Bumped when a write's week is unknown; fences every read in flight
+        self._keys_by_week = {}  # week -> cache keys stored for it
+        self._schedules_by_week = {}  # week -> schedule_ids seen in its cached rows
+        self._week_by_schedule = {}
+        self.stale_reads = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def lookup(self, week_start_date, trainer_id: int = None, hall_id: int = None):
+        """(body, etag) if cached, else None"""
+        if not self.enabled:
+            return None
+        return self._entries.get((week_key(week_start_date), trainer_id, hall_id))
+
+    def version(self, week_start_date):
+        """Take before reading the rows; pass to store()"""
+        with self._lock:
+            return self._versions.get(week_key(week_start_date), 0), self._epoch
+
+    def store(self, week_start_date, trainer_id, hall_id, rows: list, version):
+        """Render rows to (body, etag), caching them unless the week was invalidated since `version`"""
+        body = dumps_json(rows)
+        entry = (body, etag_of(body))
+        week = week_key(week_start_date)
+        with self._lock:
+            if not self.enabled:
+                return entry
+            if version != (self._versions.get(week, 0), self._epoch):
+                self.stale_reads += 1
+                return entry
+            key = (week, trainer_id, hall_id)
+            self._entries.set(key, entry)
+            self._keys_by_week.setdefault(week, set()).add(key)
+            schedule_ids = self._schedules_by_week.setdefault(week, set())
+            for row in rows:
+                schedule_ids.add(row["schedule_id"])
+                self._week_by_schedule[row["schedule_id"]] = week
+        return entry
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def _invalidate_week_locked(self, week):
+        self._versions[week] = self._versions.get(week, 0) + 1
+        for key in self._keys_by_week.pop(week, ()):
+            self._entries.invalidate(key)
+        for schedule_id in self._schedules_by_week.pop(week, ()):
+            self._week_by_schedule.pop(schedule_id, None)
+
+    def invalidate(self, *weeks):
+        with self._lock:
+            self.invalidations += 1
+            for week in {week_key(week) for week in weeks}:
+                self._invalidate_week_locked(week)
+
+    def invalidate_all(self):
+        with self._lock:
+            self.invalidations += 1
+            self._epoch += 1
+            self._entries.clear()
+            self._keys_by_week.clear()
+            self._schedules_by_week.clear()
+            self._week_by_schedule.clear()
+
+    def invalidate_schedule(self, schedule_id: int):
+        with self._lock:
+            self.invalidations += 1
+            week = self._week_by_schedule.get(schedule_id)
+            if week is not None:
+                self._invalidate_week_locked(week)
+            else:
+                self._epoch += 1  # Not cached, but a read of its week may be in flight
+
+    def invalidate_on_commit(self, db_conn, *weeks):
+        after_commit(db_conn, lambda: self.invalidate(*weeks))
+
+    def invalidate_schedule_on_commit(self, db_conn, schedule_id: int):
+        after_commit(db_conn, lambda: self.invalidate_schedule(schedule_id))
+
+    def stats(self) -> dict:
+        entry_stats = self._entries.stats()
+        with self._lock:
+            return {
+                **entry_stats,
+                "enabled": self.enabled,
+                "ttl_seconds": self.ttl_seconds,
+                "weeks_cached": len(self._keys_by_week),
+                "not_modified": self.not_modified,
+                "stale_reads": self.stale_reads,
+                "invalidations": self.invalidations,
+            }
+
+
+week_schedule_cache = WeekScheduleCache()
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from backend.database.base import get_db_cursor, get_db_connection
+from backend.database.base import get_db_cursor, get_db_connection, get_async_db
 from backend.database.crud import class_mgmt as crud_class
+from backend.utils.responses import FastJSONResponse
 
 router = APIRouter(prefix="/classes", tags=["Classes"])
 
@@ -66,11 +67,13 @@ def delete_class_type_route(class_type_id: int, db_conn = Depends(get_db_connect
         cursor.close()
 
 # === Class Routes ===
-@router.get("/")
-def get_all_classes_route(db_conn_cursor = Depends(get_db_cursor)):
+@router.get("/", response_class=FastJSONResponse)
+def get_all_classes_route(limit: int = None, page_token: str = None, db_conn_cursor = Depends(get_db_cursor)):
     db_conn, cursor = db_conn_cursor
+    if limit is not None or page_token:
+        return FastJSONResponse(crud_class.get_classes_page(db_conn, cursor, page_token, limit, formatted=False))
     # Set detailed=True to get class names and other joined information
-    return crud_class.get_all_classes(db_conn, cursor, detailed=True)
+    return FastJSONResponse(crud_class.get_all_classes(db_conn, cursor, detailed=True, formatted=False))
 
 @router.get("/{class_id}")
 def get_class_route(class_id: int, detailed: bool = False, db_conn_cursor = Depends(get_db_cursor)):
@@ -131,21 +134,15 @@ def delete_class_route(class_id: int, db_conn = Depends(get_db_connection)):
 
 # === ClassBooking Routes ===
 @router.post("/bookings", status_code=status.HTTP_201_CREATED)
-async def create_class_booking_route(request: Request, db_conn = Depends(get_db_connection)):
+async def create_class_booking_route(request: Request, db = Depends(get_async_db)):
     try:
         payload = await request.json()
-        cursor = db_conn.cursor(dictionary=True)
-        result = crud_class.create_class_booking(db_conn, cursor, payload)
-        db_conn.commit()
-        return result
+        # Runs on the DB executor; commits on success, rolls back on error
+        return await db.run_in_transaction(crud_class.create_class_booking, payload)
     except HTTPException as e:
-        db_conn.rollback()
         raise e
     except Exception as e:
-        db_conn.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
-    finally:
-        cursor.close()
 
 @router.get("/bookings/{booking_id}")
 def get_class_booking_route(booking_id: int, db_conn_cursor = Depends(get_db_cursor)):
@@ -195,6 +192,39 @@ def delete_class_booking_route(booking_id: int, db_conn = Depends(get_db_connect
     finally:
         cursor.close()
 
+# === ClassWaitlist Routes ===
+@router.post("/{class_id}/waitlist", status_code=status.HTTP_201_CREATED)
+async def join_class_waitlist_route(class_id: int, request: Request, db = Depends(get_async_db)):
+    """Queue a member for a full class; they are booked automatically when a seat frees up"""
+    try:
+        payload = await request.json()
+        return await db.run_in_transaction(crud_class.join_class_waitlist, {**payload, "class_id": class_id})
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+@router.get("/{class_id}/waitlist")
+def get_class_waitlist_route(class_id: int, db_conn_cursor = Depends(get_db_cursor)):
+    db_conn, cursor = db_conn_cursor
+    return crud_class.get_class_waitlist(db_conn, cursor, class_id)
+
+@router.delete("/waitlist/{waitlist_id}", status_code=status.HTTP_204_NO_CONTENT)
+def leave_class_waitlist_route(waitlist_id: int, db_conn = Depends(get_db_connection)):
+    try:
+        cursor = db_conn.cursor(dictionary=True)
+        crud_class.leave_class_waitlist(db_conn, cursor, waitlist_id)
+        db_conn.commit()
+        return None
+    except HTTPException as e:
+        db_conn.rollback()
+        raise e
+    except Exception as e:
+        db_conn.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    finally:
+        cursor.close()
+
 @router.get("/by-trainer/{trainer_id}")
 def get_classes_by_trainer_route(trainer_id: int, db_conn_cursor = Depends(get_db_cursor)):
     db_conn, cursor = db_conn_cursor
@@ -30,9 +30,11 @@ def get_financial_transaction_route(transaction_id: int, db_conn_cursor = Depend
     return crud_misc.get_financial_transaction_by_id(db_conn, cursor, transaction_id)
 
 @router.get("/transactions/member/{member_id}")
-def get_member_financial_transactions_route(member_id: int, db_conn_cursor = Depends(get_db_cursor)):
+def get_member_financial_transactions_route(member_id: int, limit: Optional[int] = None, page_token: Optional[str] = None, db_conn_cursor = Depends(get_db_cursor)):
     db_conn, cursor = db_conn_cursor
     # Add authorization
+    if limit is not None or page_token:
+        return crud_misc.get_financial_transactions_page_by_member_id(db_conn, cursor, member_id, page_token, limit)
     return crud_misc.get_financial_transactions_by_member_id(db_conn, cursor, member_id)
 
 @router.get("/transactions") # General query endpoint
@@ -0,0 +1,51 @@
+from fastapi import APIRouter
+from backend.utils.cache import get_all_cache_stats
+from backend.database.base import db_pool
+from backend.database.schedule_index import schedule_index
+from backend.database.preference_buffer import preference_buffer
+from backend.database.week_schedule_cache import week_schedule_cache
+from backend.database.live_session_store import live_session_store
+from backend.database.active_session_index import active_session_index
+from backend.utils.live_events import live_session_hub
+
+router = APIRouter(prefix="/internal", tags=["Internal Diagnostics"])
+
+@router.get("/cache-stats")
+def get_cache_stats_route():
+    """Hit/miss statistics for the in-process caches (token verification, etc.)"""
+    return get_all_cache_stats()
+
+@router.get("/db-pool-stats")
+def get_db_pool_stats_route():
+    """Connection pool usage: open/in-use/idle connections, waiters and the checkout wait-time histogram"""
+    return db_pool.stats()
+
+@router.get("/schedule-index-stats")
+def get_schedule_index_stats_route():
+    """Weeks and sessions held by the in-memory schedule overlap index, with hit/build counters"""
+    return schedule_index.stats()
+
+@router.get("/preference-buffer-stats")
+def get_preference_buffer_stats_route():
+    """Buffered training preference edits: pending slots, coalesced edits, flushes and rows written"""
+    return preference_buffer.stats()
+
+@router.get("/week-schedule-cache-stats")
+def get_week_schedule_cache_stats_route():
+    """Cached weekly-schedules-for-week responses: hits/misses, 304s, stale reads and invalidations"""
+    return week_schedule_cache.stats()
+
+@router.get("/live-events-stats")
+def get_live_events_stats_route():
+    """Live session event hub: connected SSE subscribers, events published/delivered and dropped slow subscribers"""
+    return live_session_hub.stats()
+
+@router.get("/live-session-store-stats")
+def get_live_session_store_stats_route():
+    """Active live sessions held in memory: dirty rows awaiting a checkpoint, events, reads and checkpoint counters"""
+    return live_session_store.stats()
+
+@router.get("/active-session-index-stats")
+def get_active_session_index_stats_route():
+    """Active live sessions indexed by member and trainer for /live-sessions/current, with lookup/rebuild counters"""
+    return active_session_index.stats()
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Depends
+from backend.database.base import get_db_cursor
+from backend.database.crud import jobs as crud_jobs
+
+router = APIRouter(prefix="/jobs", tags=["Background Jobs"])
+
+@router.get("/{job_id}")
+def get_job_route(job_id: str, db_conn_cursor = Depends(get_db_cursor)):
+    """Status, progress (0-100) and, once finished, the result or error of a background job"""
+    db_conn, cursor = db_conn_cursor
+    return crud_jobs.get_job_by_id(db_conn, cursor, job_id)
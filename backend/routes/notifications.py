@@ -34,9 +34,11 @@ def get_email_notification_route(notification_id: int, db_conn_cursor = Depends(
     return crud_misc.get_email_notification_by_id(db_conn, cursor, notification_id)
 
 @router.get("/email/user/{user_id}")
-def get_user_email_notifications_route(user_id: int, db_conn_cursor = Depends(get_db_cursor)):
+def get_user_email_notifications_route(user_id: int, limit: Optional[int] = None, page_token: Optional[str] = None, db_conn_cursor = Depends(get_db_cursor)):
     db_conn, cursor = db_conn_cursor
     # Add authorization: user sees their own, admin sees all
+    if limit is not None or page_token:
+        return crud_misc.get_email_notifications_page_by_user_id(db_conn, cursor, user_id, page_token, limit)
     return crud_misc.get_email_notifications_by_user_id(db_conn, cursor, user_id)
 
 @router.put("/email/{notification_id}/status")
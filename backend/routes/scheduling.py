@@ -1,11 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from backend.database.base import get_db_cursor, get_db_connection
+import csv
+import datetime
+import io
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from backend.database.base import get_db_cursor, get_db_connection, get_async_db, run_in_db_executor
 from backend.database.crud import scheduling as crud_scheduling
+from backend.database.crud import jobs as crud_jobs
+from backend.database.schedule_index import schedule_index
+from backend.database.week_schedule_cache import week_schedule_cache
+from backend.database.preference_buffer import preference_buffer
+from backend.utils.jobs import job_runner
 from mysql.connector import Error as MySQLError
 from typing import List, Optional, Dict # For query parameters
 
 router = APIRouter(prefix="/scheduling", tags=["Scheduling"])
 
+# Generation writes sessions from a worker process; this process's overlap index must re-read that week
+job_runner.on_success("generate_weekly_schedule", lambda params: schedule_index.invalidate(params["week_start_date_str"]))
+# Jobs commit in a worker process, whose invalidations never reach this process's cache
+job_runner.on_success("generate_weekly_schedule", lambda params: week_schedule_cache.invalidate(params["week_start_date_str"]))
+job_runner.on_success("reconcile_schedule_participant_counts",
+                      lambda params: week_schedule_cache.invalidate(params["week_start_date"]) if params.get("week_start_date") else week_schedule_cache.invalidate_all())
+
 # === TrainingPreference Routes ===
 @router.post("/preferences", status_code=status.HTTP_201_CREATED)
 async def create_training_preference_route(request: Request, db_conn = Depends(get_db_connection)):
@@ -40,8 +55,30 @@ def get_training_preference_route(preference_id: int, db_conn_cursor = Depends(g
 def get_member_preferences_for_week_route(member_id: int, week_start_date: str, db_conn_cursor = Depends(get_db_cursor)):
     db_conn, cursor = db_conn_cursor
     # Add authorization: ensure current user can view this member's preferences
+    preference_buffer.flush([(member_id, week_start_date)], db_conn, cursor) # Read your own buffered edits
     return crud_scheduling.get_training_preferences_by_member_and_week(db_conn, cursor, member_id, week_start_date)
 
+# Registered before /preferences/{preference_id}, which would otherwise match "buffered"
+@router.put("/preferences/buffered", status_code=status.HTTP_202_ACCEPTED)
+async def buffer_training_preference_route(request: Request):
+    """Record one slot edit in the preference write buffer; it reaches the database with the next flush.
+
+    Payload: member_id, week_start_date, day_of_week, start_time, end_time, preference_type
+    ("Not Selected" clears the slot) and optional trainer_id.
+    """
+    payload = await request.json()
+    # Add authorization: member can only edit their own preferences
+    try:
+        return await run_in_db_executor(preference_buffer.record, payload) # Appends (and fsyncs) the durability log
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.post("/members/{member_id}/preferences-for-week/flush")
+async def flush_member_preferences_route(member_id: int, week_start_date: str):
+    """Write a member's buffered edits for the week now, e.g. when they leave the preferences page"""
+    written = await run_in_db_executor(preference_buffer.flush, [(member_id, week_start_date)])
+    return {"member_id": member_id, "week_start_date": week_start_date, "rows_written": written}
+
 @router.put("/preferences/{preference_id}")
 async def update_training_preference_route(preference_id: int, request: Request, db_conn = Depends(get_db_connection)):
     payload = await request.json()
@@ -111,6 +148,46 @@ async def create_weekly_schedule_route(request: Request, db_conn = Depends(get_d
     finally:
         if cursor: cursor.close()
 
+@router.post("/weekly-schedules/bulk", status_code=status.HTTP_201_CREATED)
+async def create_weekly_schedules_bulk_route(request: Request, created_by: Optional[int] = None, db_conn = Depends(get_db_connection)):
+    """Create a whole week of slots at once, all or nothing.
+
+    Body: JSON {"created_by": int, "slots": [...]} (or a bare list), or text/csv with a header row
+    week_start_date,day_of_week,start_time,end_time,hall_id,trainer_id,max_capacity[,created_by].
+    """
+    if "csv" in request.headers.get("content-type", ""):
+        body = (await request.body()).decode("utf-8-sig")
+        slots = list(csv.DictReader(io.StringIO(body)))
+    else:
+        payload = await request.json()
+        if isinstance(payload, dict):
+            slots = payload.get("slots")
+            created_by = created_by or payload.get("created_by")
+        else:
+            slots = payload
+    if not isinstance(slots, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a list of schedule slots.")
+    # Add authorization: only manager/trainer can create
+    # if created_by is None and current_user: created_by = current_user['user_id_pk']
+
+    cursor = None
+    try:
+        cursor = db_conn.cursor(dictionary=True)
+        created = crud_scheduling.create_weekly_schedules_bulk(db_conn, cursor, slots, created_by)
+        db_conn.commit()
+        return {"created_count": len(created), "schedules": created}
+    except HTTPException:
+        if db_conn: db_conn.rollback()
+        raise
+    except MySQLError as e:
+        if db_conn: db_conn.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
+    except Exception as e:
+        if db_conn: db_conn.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Unexpected error: {str(e)}")
+    finally:
+        if cursor: cursor.close()
+
 @router.get("/weekly-schedules/{schedule_id}")
 def get_weekly_schedule_route(schedule_id: int, db_conn_cursor = Depends(get_db_cursor)):
     db_conn, cursor = db_conn_cursor
@@ -118,14 +195,26 @@ def get_weekly_schedule_route(schedule_id: int, db_conn_cursor = Depends(get_db_
     return crud_scheduling.get_weekly_schedule_by_id(db_conn, cursor, schedule_id)
 
 @router.get("/weekly-schedules-for-week/{week_start_date}")
-def get_schedules_for_week_route(
+async def get_schedules_for_week_route(
     week_start_date: str, 
+    request: Request,
     trainer_id: Optional[int] = None, 
     hall_id: Optional[int] = None, 
-    db_conn_cursor = Depends(get_db_cursor)
+    db = Depends(get_async_db)
 ):
-    db_conn, cursor = db_conn_cursor
-    return crud_scheduling.get_weekly_schedules_by_week(db_conn, cursor, week_start_date, trainer_id, hall_id)
+    """Served from week_schedule_cache; the database connection is only taken on a miss.
+    Send the last ETag as If-None-Match to get a 304 while the week is unchanged."""
+    cached = week_schedule_cache.lookup(week_start_date, trainer_id, hall_id)
+    if cached is None:
+        version = week_schedule_cache.version(week_start_date)
+        rows = await db.run(crud_scheduling.get_weekly_schedule_by_week, week_start_date, trainer_id, hall_id)
+        cached = week_schedule_cache.store(week_start_date, trainer_id, hall_id, rows, version)
+    body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": "no-cache"} # Clients may keep it but must revalidate
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        week_schedule_cache.record_not_modified()
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.put("/weekly-schedules/{schedule_id}")
 async def update_weekly_schedule_route(schedule_id: int, request: Request, db_conn = Depends(get_db_connection)):
@@ -255,6 +344,53 @@ def remove_member_from_schedule_route(sm_id: int, db_conn = Depends(get_db_conne
         if cursor: cursor.close()
 
 
+# === ScheduleWaitlist Routes (members queued for a full weekly_schedule slot) ===
+@router.post("/weekly-schedules/{schedule_id}/waitlist", status_code=status.HTTP_201_CREATED)
+async def join_schedule_waitlist_route(schedule_id: int, request: Request, db_conn = Depends(get_db_connection)):
+    payload = await request.json()
+    cursor = None
+    try:
+        cursor = db_conn.cursor(dictionary=True)
+        entry = crud_scheduling.join_schedule_waitlist(db_conn, cursor, {**payload, "schedule_id": schedule_id})
+        db_conn.commit()
+        return entry
+    except HTTPException:
+        if db_conn: db_conn.rollback()
+        raise
+    except MySQLError as e:
+        if db_conn: db_conn.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
+    except Exception as e:
+        if db_conn: db_conn.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Unexpected error: {str(e)}")
+    finally:
+        if cursor: cursor.close()
+
+@router.get("/weekly-schedules/{schedule_id}/waitlist")
+def get_schedule_waitlist_route(schedule_id: int, db_conn_cursor = Depends(get_db_cursor)):
+    db_conn, cursor = db_conn_cursor
+    return crud_scheduling.get_schedule_waitlist(db_conn, cursor, schedule_id)
+
+@router.delete("/waitlist/{waitlist_id}", status_code=status.HTTP_204_NO_CONTENT)
+def leave_schedule_waitlist_route(waitlist_id: int, db_conn = Depends(get_db_connection)):
+    cursor = None
+    try:
+        cursor = db_conn.cursor(dictionary=True)
+        crud_scheduling.leave_schedule_waitlist(db_conn, cursor, waitlist_id)
+        db_conn.commit()
+        return None
+    except HTTPException:
+        if db_conn: db_conn.rollback()
+        raise
+    except MySQLError as e:
+        if db_conn: db_conn.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
+    except Exception as e:
+        if db_conn: db_conn.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Unexpected error: {str(e)}")
+    finally:
+        if cursor: cursor.close()
+
 @router.post("/preferences/batch", status_code=status.HTTP_200_OK) # Or 201 if you consider it a creation of a state
 async def batch_upsert_training_preferences_route(request: Request, db_conn = Depends(get_db_connection)):
     payload = await request.json() 
@@ -272,6 +408,9 @@ async def batch_upsert_training_preferences_route(request: Request, db_conn = De
         if not all([member_id, week_start_date, isinstance(preferences_list, list)]):
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing member_id, week_start_date, or preferences list in payload.")
 
+        # Edits buffered before this full replacement must not land on top of it
+        await run_in_db_executor(preference_buffer.flush, [(member_id, week_start_date)], db_conn, cursor)
+
         # Add authorization: member can only set their own preferences.
         # current_authenticated_user = await get_current_user_data(request, db_conn) # Example
         # if current_authenticated_user.get('member_id_pk') != member_id:
@@ -295,8 +434,37 @@ async def batch_upsert_training_preferences_route(request: Request, db_conn = De
         if cursor: cursor.close()
 
 
-@router.post("/weekly-schedules/generate/{week_start_date_iso}", status_code=status.HTTP_200_OK)
+@router.post("/weekly-schedules/reconcile-participant-counts", status_code=status.HTTP_202_ACCEPTED)
+def reconcile_participant_counts_route(week_start_date: Optional[str] = None, db_conn = Depends(get_db_connection)):
+    """Queue a repair of weekly_schedule.current_participants (one week, or all); poll GET /jobs/{job_id}"""
+    cursor = None
+    try:
+        cursor = db_conn.cursor(dictionary=True)
+        if week_start_date is not None:
+            try:
+                datetime.date.fromisoformat(week_start_date)
+            except ValueError:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid week start date: {week_start_date}")
+        params = {"week_start_date": week_start_date}
+        job = crud_jobs.create_job(db_conn, cursor, "reconcile_schedule_participant_counts", params)
+        db_conn.commit() # The worker process must see the job row
+        job_runner.submit(job["job_id"], job["job_type"], params)
+        return {"job_id": job["job_id"], "status": job["status"], "status_url": f"/jobs/{job['job_id']}"}
+    except HTTPException:
+        if db_conn: db_conn.rollback()
+        raise
+    except MySQLError as e:
+        if db_conn: db_conn.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error queuing participant count repair: {str(e)}")
+    except Exception as e:
+        if db_conn: db_conn.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Unexpected error: {str(e)}")
+    finally:
+        if cursor: cursor.close()
+
+@router.post("/weekly-schedules/generate/{week_start_date_iso}", status_code=status.HTTP_202_ACCEPTED)
 async def generate_weekly_schedule_route(week_start_date_iso: str, request: Request, db_conn = Depends(get_db_connection)):
+    """Queue schedule generation for a week; poll GET /jobs/{job_id} for progress and the result"""
     cursor = None
     try:
         cursor = db_conn.cursor(dictionary=True)
@@ -308,17 +476,25 @@ async def generate_weekly_schedule_route(week_start_date_iso: str, request: Requ
         # created_by_user_id = current_user.get("user_id_pk")
         created_by_user_id = 1 # Placeholder - replace with actual authenticated user ID
 
-        result = crud_scheduling.generate_weekly_schedule_for_week(db_conn, cursor, week_start_date_iso, created_by_user_id)
-        db_conn.commit() # Commit any changes made by the generation logic
-        return result
+        try:
+            datetime.date.fromisoformat(week_start_date_iso)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid week start date: {week_start_date_iso}")
+
+        await run_in_db_executor(preference_buffer.flush, None, db_conn, cursor) # The worker reads preferences from the database
+        params = {"week_start_date_str": week_start_date_iso, "created_by_user_id": created_by_user_id}
+        job = crud_jobs.create_job(db_conn, cursor, "generate_weekly_schedule", params, created_by_user_id)
+        db_conn.commit() # The worker process must see the job row
+        job_runner.submit(job["job_id"], job["job_type"], params)
+        return {"job_id": job["job_id"], "status": job["status"], "status_url": f"/jobs/{job['job_id']}"}
     except HTTPException:
         if db_conn: db_conn.rollback()
         raise
     except MySQLError as e:
         if db_conn: db_conn.rollback()
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error during schedule generation: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error queuing schedule generation: {str(e)}")
     except Exception as e:
         if db_conn: db_conn.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Unexpected error: {str(e)}")
     finally:
-        if cursor: cursor.close()
\ No newline at end of file
+        if cursor: cursor.close()
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from backend.database.base import get_db_cursor, get_db_connection
 from backend.database.crud import training_blueprints as crud_bp # Renamed for clarity
+from backend.database.preference_buffer import preference_buffer
 from backend.auth import get_current_user_data  # Import the auth function
+from backend.utils.responses import FastJSONResponse
 from mysql.connector import Error as MySQLError
 from typing import Optional
 
@@ -38,8 +40,10 @@ def get_exercise_route(exercise_id: int, db_conn_cursor = Depends(get_db_cursor)
     return crud_bp.get_exercise_by_id(db_conn, cursor, exercise_id)
 
 @router.get("/exercises")
-def get_all_exercises_route(is_active: bool = None, db_conn_cursor = Depends(get_db_cursor)):
+def get_all_exercises_route(is_active: bool = None, limit: int = None, page_token: str = None, db_conn_cursor = Depends(get_db_cursor)):
     db_conn, cursor = db_conn_cursor
+    if limit is not None or page_token:
+        return crud_bp.get_exercises_page(db_conn, cursor, is_active, page_token, limit)
     return crud_bp.get_all_exercises(db_conn, cursor, is_active)
 
 @router.put("/exercises/{exercise_id}")
@@ -111,15 +115,17 @@ def get_training_plan_route(plan_id: int, db_conn_cursor = Depends(get_db_cursor
     db_conn, cursor = db_conn_cursor
     return crud_bp.get_training_plan_by_id(db_conn, cursor, plan_id)
 
-@router.get("/plans/{plan_id}/detailed")
+@router.get("/plans/{plan_id}/detailed", response_class=FastJSONResponse)
 def get_training_plan_detailed_route(plan_id: int, db_conn_cursor = Depends(get_db_cursor)):
     """Get a training plan with all its days and exercises"""
     db_conn, cursor = db_conn_cursor
-    return crud_bp.get_training_plan_detailed_by_id(db_conn, cursor, plan_id)
+    return FastJSONResponse(crud_bp.get_training_plan_detailed_by_id(db_conn, cursor, plan_id, formatted=False))
 
 @router.get("/plans")
-def get_all_training_plans_route(is_active: bool = None, trainer_id: int = None, db_conn_cursor = Depends(get_db_cursor)):
+def get_all_training_plans_route(is_active: bool = None, trainer_id: int = None, limit: int = None, page_token: str = None, db_conn_cursor = Depends(get_db_cursor)):
     db_conn, cursor = db_conn_cursor
+    if limit is not None or page_token:
+        return crud_bp.get_training_plans_page(db_conn, cursor, is_active, trainer_id, page_token, limit)
     return crud_bp.get_all_training_plans(db_conn, cursor, is_active, trainer_id)
 
 @router.put("/plans/{plan_id}")
@@ -438,11 +444,11 @@ def get_training_plan_frontend_route(plan_id: int, db_conn_cursor = Depends(get_
     db_conn, cursor = db_conn_cursor
     return crud_bp.get_training_plan_by_id(db_conn, cursor, plan_id)
 
-@training_plans_router.get("/{plan_id}/detailed")
+@training_plans_router.get("/{plan_id}/detailed", response_class=FastJSONResponse)
 def get_training_plan_detailed_frontend_route(plan_id: int, db_conn_cursor = Depends(get_db_cursor)):
     """Get a training plan with all its days and exercises - frontend compatible route"""
     db_conn, cursor = db_conn_cursor
-    return crud_bp.get_training_plan_detailed_by_id(db_conn, cursor, plan_id)
+    return FastJSONResponse(crud_bp.get_training_plan_detailed_by_id(db_conn, cursor, plan_id, formatted=False))
 
 @training_plans_router.get("/preferences/check")
 def check_training_preferences(current_user: dict = Depends(get_current_user_data), db_conn_cursor = Depends(get_db_cursor)):
@@ -470,6 +476,7 @@ def check_training_preferences(current_user: dict = Depends(get_current_user_dat
             days_until_sunday = 7  # Get next Sunday
         
         next_week_start = today + datetime.timedelta(days=days_until_sunday)
+        preference_buffer.flush([(member_id, next_week_start)], db_conn, cursor) # Include edits still in the write buffer
         
         # Fetch existing preferences for the next week
         cursor.execute("""
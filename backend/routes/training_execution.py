@@ -1,8 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from backend.database.base import get_db_cursor, get_db_connection
+from fastapi.responses import StreamingResponse
+from backend.database.base import get_db_cursor, get_db_connection, get_async_db, run_in_db_executor
 from backend.database.crud import training_execution as crud_exec
 from backend.database.crud import scheduling as crud_scheduling # For live session interaction
 from backend.auth import get_current_user_data  # Import the auth function
+from backend.utils.live_events import live_session_hub
+from backend.database.live_session_store import live_session_store, ACTIVE_STATUSES
+from backend.database.active_session_index import active_session_index
 from mysql.connector import Error as MySQLError
 from typing import List, Optional, Dict, Any
 
@@ -86,6 +90,8 @@ async def start_live_session_route(request: Request, db_conn = Depends(get_db_co
             db_conn, cursor, payload["schedule_id"], payload.get("notes")
         )
         db_conn.commit()
+        if live_session_store.enabled:
+            live_session_store.add(new_live_session)  # No attendance yet, so nothing to load later
         return new_live_session
     except HTTPException:
         if db_conn: db_conn.rollback()
@@ -99,127 +105,223 @@ async def start_live_session_route(request: Request, db_conn = Depends(get_db_co
     finally:
         if cursor: cursor.close()
 
+# Registered before /live-sessions/{live_session_id}, which would otherwise capture "current"
+@router.get("/live-sessions/current")
+async def get_current_user_active_session_route(current_user: dict = Depends(get_current_user_data), db = Depends(get_async_db)):
+    """Get the current user's active live session"""
+    try:
+        user_type = current_user.get("user_type")
+        if user_type == "member":
+            person_id = current_user.get("member_id_pk")
+            if not person_id:
+                return {"active_session": None, "message": "Member ID not found"}
+        elif user_type == "trainer":
+            person_id = current_user.get("trainer_id_pk")
+            if not person_id:
+                return {"active_session": None, "message": "Trainer ID not found"}
+        else:
+            # Manager or other user types don't have "active sessions" in the same way
+            return {"active_session": None, "message": "User type does not have active sessions"}
+
+        if active_session_index.enabled:
+            if not active_session_index.fresh():
+                await db.run(active_session_index.rebuild)
+            if user_type == "member":
+                active_session = active_session_index.lookup(member_id=person_id)
+            else:
+                active_session = active_session_index.lookup(trainer_id=person_id)
+        else:
+            if user_type == "member":
+                active_session = await db.fetch_one(get_sql("live_sessions_get_current_for_member"), {"member_id": person_id})
+            else:
+                active_session = await db.fetch_one(get_sql("live_sessions_get_current_for_trainer"), (person_id,))
+
+        if active_session:
+            return {"active_session": active_session, "message": "Active session found"}
+        return {"active_session": None, "message": "No active session found"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error checking active session: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error checking active session: {str(e)}")
+
+@router.get("/live-sessions/events")
+async def stream_live_session_events_route(request: Request, live_session_id: Optional[int] = None):
+    """Server-Sent Events: status changes, check-ins, attendance and exercise progress of one live session, or all of them.
+
+    Reconnecting clients send Last-Event-ID (EventSource does this itself) and get what they missed;
+    a `resync` event means that could not be replayed and the client should reload its data.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    last_event_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    subscription = live_session_hub.subscribe(live_session_id, last_event_id)
+    return StreamingResponse(
+        live_session_hub.stream(subscription, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def _live_session_in_store(db, live_session_id: int) -> bool:
+    """Whether the live session store holds this session, loading it on first use (active sessions only)"""
+    if not live_session_store.enabled:
+        return False
+    if live_session_store.holds(live_session_id):
+        return True
+    return await db.run(live_session_store.load, live_session_id)
+
 @router.get("/live-sessions/{live_session_id}")
-def get_live_session_route(live_session_id: int, db_conn_cursor = Depends(get_db_cursor)):
-    db_conn, cursor = db_conn_cursor
+async def get_live_session_route(live_session_id: int, db = Depends(get_async_db)):
     # Add authorization
-    return crud_exec.get_live_session_by_id(db_conn, cursor, live_session_id)
+    if await _live_session_in_store(db, live_session_id):
+        return live_session_store.get_session(live_session_id)
+    return await db.run(crud_exec.get_live_session_by_id, live_session_id)
+
+def _update_live_session_status_and_log(db_conn, cursor, live_session_id: int, payload: dict, exercises_by_member: Optional[dict] = None):
+    updated_session = crud_exec.update_live_session_status(
+        db_conn, cursor, live_session_id, payload["status"], payload.get("notes")
+    )
+    
+    # If session completed, log workout for attendees
+    if updated_session['status'] == 'Completed':
+        updated_session['workouts_logged'] = crud_exec.log_workouts_for_completed_session(
+            db_conn, cursor, updated_session, payload.get("exercises_by_member") or exercises_by_member)
+    if live_session_store.holds(live_session_id):
+        live_session_store.close_on_commit(db_conn, live_session_id, updated_session)
+    return updated_session
 
 @router.put("/live-sessions/{live_session_id}/update-status")
-async def update_live_session_status_route(live_session_id: int, request: Request, db_conn = Depends(get_db_connection)):
-    payload = await request.json() # Expected: {"status": "new_status", "notes": "optional"}
-    cursor = None
+async def update_live_session_status_route(live_session_id: int, request: Request, db = Depends(get_async_db)):
+    payload = await request.json() # Expected: {"status": "new_status", "notes": "optional", "exercises_by_member": {member_id: [exercise, ...]} (optional)}
     try:
-        cursor = db_conn.cursor(dictionary=True)
         # Add authorization
         if "status" not in payload:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="New status is required.")
 
-        updated_session = crud_exec.update_live_session_status(
-            db_conn, cursor, live_session_id, payload["status"], payload.get("notes")
-        )
-        
-        # If session completed, log workout for attendees
-        if updated_session['status'] == 'Completed':
-            attendees = crud_exec.get_attendance_for_live_session(db_conn, cursor, live_session_id)
-            for att in attendees:
-                if att['status'] == 'Checked In' or att['status'] == 'Checked Out': # Only log for those who attended
-                    # Find associated training_plan_day_id for this member for this schedule
-                    schedule_member_info = None
-                    try: # This logic might need refinement or its own CRUD helper
-                        sm_sql = get_sql("schedule_members_get_by_schedule_id_and_member_id") # Needs: SELECT * FROM schedule_members WHERE schedule_id = %s AND member_id = %s
-                        cursor.execute(sm_sql, (updated_session['schedule_id'], att['member_id']))
-                        schedule_member_info = cursor.fetchone()
-                    except MySQLError: # If query doesn't exist or fails
-                        pass # Proceed without plan_day_id
-
-                    workout_log_data = {
-                        "member_id": att['member_id'],
-                        "workout_date": updated_session['start_time'], # Or end_time
-                        "duration_minutes_actual": (updated_session['end_time'] - updated_session['start_time']).total_seconds() / 60 if updated_session.get('end_time') else None,
-                        "notes_overall_session": updated_session.get('notes'),
-                        "source": "from_live_session",
-                        "live_session_id": live_session_id,
-                        "member_active_plan_id": None, # TODO: Determine this based on schedule_member_info or other logic
-                        "training_plan_day_id": schedule_member_info.get('training_plan_day_id') if schedule_member_info else None,
-                        "exercises": [] # TODO: Populate exercises performed during the live session
-                                        # This part requires UI input during live session to capture exercise details
-                    }
-                    crud_exec.create_logged_workout(db_conn, cursor, workout_log_data)
-        
-        db_conn.commit()
-        return updated_session
+        if payload["status"] in ACTIVE_STATUSES and await _live_session_in_store(db, live_session_id):
+            return await run_in_db_executor(live_session_store.set_status, live_session_id, payload["status"], payload.get("notes")) # Appends (and fsyncs) the journal
+
+        # Events for a held session are refused from here on, so none arrives after its final checkpoint
+        closing = live_session_store.begin_close(live_session_id)
+        committed = False
+        try:
+            exercises_by_member = None
+            if closing:
+                # Completing reads attendance from the database and logs the progress recorded in memory
+                await run_in_db_executor(live_session_store.flush, [live_session_id])
+                exercises_by_member = live_session_store.exercises_by_member(live_session_id)
+
+            # The whole transaction runs on the DB executor so the event loop is never blocked
+            updated_session = await db.run_in_transaction(_update_live_session_status_and_log, live_session_id, payload, exercises_by_member)
+            committed = True
+            return updated_session
+        finally:
+            if closing and not committed:
+                live_session_store.reopen(live_session_id)
     except HTTPException:
-        if db_conn: db_conn.rollback()
         raise
     except MySQLError as e:
-        if db_conn: db_conn.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
     except Exception as e:
-        if db_conn: db_conn.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if cursor: cursor.close()
 
 # === LiveSessionAttendance Routes ===
+# Active sessions are held by the live session store: these are answered from memory (journalled,
+# checkpointed to the database in batches) and only fall back to a transaction for other sessions.
 @router.post("/live-sessions/{live_session_id}/attendance/check-in", status_code=status.HTTP_201_CREATED)
-async def member_check_in_route(live_session_id: int, request: Request, db_conn = Depends(get_db_connection)):
+async def member_check_in_route(live_session_id: int, request: Request, db = Depends(get_async_db)):
     payload = await request.json() # Expected: {"member_id": int, "notes": "optional"}
-    cursor = None
     try:
-        cursor = db_conn.cursor(dictionary=True)
         # Add authorization
         if "member_id" not in payload:
              raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="member_id is required.")
-        
-        check_in_record = crud_exec.member_check_in_live_session(
-            db_conn, cursor, live_session_id, payload["member_id"], payload.get("notes")
+
+        if await _live_session_in_store(db, live_session_id):
+            return await run_in_db_executor(live_session_store.check_in, live_session_id, payload["member_id"], payload.get("notes")) # Appends (and fsyncs) the journal
+        return await db.run_in_transaction(
+            crud_exec.member_check_in_live_session, live_session_id, payload["member_id"], payload.get("notes")
         )
-        db_conn.commit()
-        return check_in_record
     except HTTPException:
-        if db_conn: db_conn.rollback()
         raise
     except MySQLError as e:
-        if db_conn: db_conn.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
     except Exception as e:
-        if db_conn: db_conn.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if cursor: cursor.close()
 
 @router.put("/live-sessions/attendance/{attendance_id}/update-status")
-async def update_attendance_status_route(attendance_id: int, request: Request, db_conn = Depends(get_db_connection)):
+async def update_attendance_status_route(attendance_id: int, request: Request, db = Depends(get_async_db)):
     payload = await request.json() # Expected: {"status": "new_status", "notes": "optional"}
-    cursor = None
     try:
-        cursor = db_conn.cursor(dictionary=True)
         # Add authorization
         if "status" not in payload:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="New status is required.")
 
-        updated_attendance = crud_exec.update_live_session_attendance_status(
-            db_conn, cursor, attendance_id, payload["status"], payload.get("notes")
+        held = live_session_store.attendance_key(attendance_id)
+        if held is not None:
+            return await run_in_db_executor(live_session_store.update_attendance, *held, payload["status"], payload.get("notes"))
+        return await db.run_in_transaction(
+            crud_exec.update_live_session_attendance_status, attendance_id, payload["status"], payload.get("notes")
+        )
+    except HTTPException:
+        raise
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Unexpected error: {str(e)}")
+
+@router.put("/live-sessions/{live_session_id}/attendance/members/{member_id}/update-status")
+async def update_member_attendance_status_route(live_session_id: int, member_id: int, request: Request, db = Depends(get_async_db)):
+    """Same as the attendance_id route, for a check-in that has not been checkpointed (and given an id) yet"""
+    payload = await request.json() # Expected: {"status": "new_status", "notes": "optional"}
+    try:
+        # Add authorization
+        if "status" not in payload:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="New status is required.")
+
+        if await _live_session_in_store(db, live_session_id):
+            return await run_in_db_executor(live_session_store.update_attendance, live_session_id, member_id, payload["status"], payload.get("notes"))
+        attendance = await db.run(crud_exec.get_attendance_for_live_session, live_session_id)
+        attendance_id = next((row["id"] for row in attendance if row["member_id"] == member_id), None)
+        if attendance_id is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Member {member_id} has no attendance record in live session {live_session_id}.")
+        return await db.run_in_transaction(
+            crud_exec.update_live_session_attendance_status, attendance_id, payload["status"], payload.get("notes")
         )
-        db_conn.commit()
-        return updated_attendance
     except HTTPException:
-        if db_conn: db_conn.rollback()
         raise
     except MySQLError as e:
-        if db_conn: db_conn.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
     except Exception as e:
-        if db_conn: db_conn.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Unexpected error: {str(e)}")
-    finally:
-        if cursor: cursor.close()
 
 @router.get("/live-sessions/{live_session_id}/attendance")
-def get_live_session_attendance_route(live_session_id: int, db_conn_cursor = Depends(get_db_cursor)):
-    db_conn, cursor = db_conn_cursor
-    return crud_exec.get_attendance_for_live_session(db_conn, cursor, live_session_id)
+async def get_live_session_attendance_route(live_session_id: int, db = Depends(get_async_db)):
+    if await _live_session_in_store(db, live_session_id):
+        return live_session_store.get_attendance(live_session_id)
+    return await db.run(crud_exec.get_attendance_for_live_session, live_session_id)
+
+# === Live Exercise Progress Routes ===
+@router.post("/live-sessions/{live_session_id}/progress")
+async def record_exercise_progress_route(live_session_id: int, request: Request, db = Depends(get_async_db)):
+    payload = await request.json() # Expected: {"member_id": int, "exercise_id": int, "sets_completed": int, "actual_reps": "10,8,8", "weight_used": "50,45,40", "comments": str, "completed": bool} (all but the ids optional)
+    try:
+        # Add authorization: the member themselves or the session's trainer
+        if await _live_session_in_store(db, live_session_id):
+            return await run_in_db_executor(live_session_store.record_progress, live_session_id, payload)
+        return await db.run_in_transaction(crud_exec.record_exercise_progress, live_session_id, payload)
+    except HTTPException:
+        raise
+    except MySQLError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"DB error: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Unexpected error: {str(e)}")
+
+@router.get("/live-sessions/{live_session_id}/progress")
+async def get_exercise_progress_route(live_session_id: int, db = Depends(get_async_db)):
+    """Exercise progress recorded so far in an active session (held in memory until the session completes)"""
+    if await _live_session_in_store(db, live_session_id):
+        return live_session_store.get_progress(live_session_id)
+    await db.run(crud_exec.get_live_session_by_id, live_session_id)  # 404 if it does not exist
+    return []
 
 
 # === LoggedWorkout Routes ===
@@ -273,72 +375,6 @@ def get_member_logged_workouts_route(member_id: int, db_conn_cursor = Depends(ge
 # For simplicity, I'll omit PUT/DELETE for logged_workouts and logged_workout_exercises for now.
 # If needed, they would follow similar patterns.
 
-@router.get("/live-sessions/current")
-def get_current_user_active_session_route(current_user: dict = Depends(get_current_user_data), db_conn_cursor = Depends(get_db_cursor)):
-    """Get the current user's active live session"""
-    db_conn, cursor = db_conn_cursor
-    
-    try:
-        user_type = current_user.get("user_type")
-        user_id = current_user.get("user_id")
-        
-        # Check for active live sessions based on user type
-        if user_type == "member":
-            member_id = current_user.get("member_id_pk")
-            if not member_id:
-                return {"active_session": None, "message": "Member ID not found"}
-                
-            # Query for active live sessions where this member is participating
-            cursor.execute("""
-                SELECT ls.*, ws.hall_id, h.name as hall_name, 
-                       CONCAT(u.first_name, ' ', u.last_name) as trainer_name
-                FROM live_sessions ls
-                JOIN weekly_schedule ws ON ls.schedule_id = ws.schedule_id
-                JOIN halls h ON ws.hall_id = h.hall_id
-                JOIN trainers t ON ws.trainer_id = t.trainer_id
-                JOIN users u ON t.user_id = u.user_id
-                JOIN schedule_members sm ON ws.schedule_id = sm.schedule_id
-                WHERE sm.member_id = %s 
-                AND ls.status IN ('Active', 'In Progress')
-                ORDER BY ls.start_time DESC
-                LIMIT 1
-            """, (member_id,))
-            
-        elif user_type == "trainer":
-            trainer_id = current_user.get("trainer_id_pk")
-            if not trainer_id:
-                return {"active_session": None, "message": "Trainer ID not found"}
-                
-            # Query for active live sessions where this trainer is conducting
-            cursor.execute("""
-                SELECT ls.*, ws.hall_id, h.name as hall_name,
-                       CONCAT(u.first_name, ' ', u.last_name) as trainer_name
-                FROM live_sessions ls
-                JOIN weekly_schedule ws ON ls.schedule_id = ws.schedule_id
-                JOIN halls h ON ws.hall_id = h.hall_id
-                JOIN trainers t ON ws.trainer_id = t.trainer_id
-                JOIN users u ON t.user_id = u.user_id
-                WHERE ws.trainer_id = %s 
-                AND ls.status IN ('Active', 'In Progress')
-                ORDER BY ls.start_time DESC
-                LIMIT 1
-            """, (trainer_id,))
-            
-        else:
-            # Manager or other user types don't have "active sessions" in the same way
-            return {"active_session": None, "message": "User type does not have active sessions"}
-            
-        active_session = cursor.fetchone()
-        
-        if active_session:
-            return {"active_session": active_session, "message": "Active session found"}
-        else:
-            return {"active_session": None, "message": "No active session found"}
-        
-    except Exception as e:
-        print(f"Error checking active session: {e}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error checking active session: {str(e)}")
-
 
 # === Weekly Training Goals Routes ===
 @router.post("/weekly-training-goals", status_code=status.HTTP_201_CREATED)
@@ -475,4 +511,8 @@ def get_member_weekly_training_goal_for_week_training_route(member_id: int, week
 
 @training_router.post("/weekly-goals/upsert", status_code=status.HTTP_200_OK)
 async def upsert_weekly_training_goal_training_route(request: Request, db_conn = Depends(get_db_connection)):
-    return await upsert_weekly_training_goal_route(request, db_conn)
\ No newline at end of file
+    return await upsert_weekly_training_goal_route(request, db_conn)
+
+@training_router.get("/live/sessions/current")
+async def get_current_user_active_session_training_route(current_user: dict = Depends(get_current_user_data), db = Depends(get_async_db)):
+    return await get_current_user_active_session_route(current_user, db)
@@ -1,6 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, status
-from backend.database.base import get_db_cursor, get_db_connection # Using both for different scenarios
+from fastapi.responses import StreamingResponse
+from backend.database.base import get_db_cursor, get_db_connection, get_pooled_connection # Using both for different scenarios
+from backend.database.db_utils import get_sql
+from backend.database.pagination import stream_ndjson
 from backend.database.crud import user as crud_user
+from backend.auth import get_current_user_data, invalidate_current_user_cache
 from mysql.connector import Error as MySQLError # Import the correct error type
 
 router = APIRouter(prefix="/users", tags=["Users"])
@@ -19,6 +23,24 @@ def get_all_trainers_endpoint(active_only: bool = True, db_conn_cursor_tuple = D
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error getting trainers: {e}")
 
+@router.get("/")
+def get_users_endpoint(user_type: str = None, limit: int = None, page_token: str = None, db_conn_cursor_tuple = Depends(get_db_cursor)):
+    """Get one page of users; pass next_page_token back as page_token for the next one"""
+    db_conn, cursor = db_conn_cursor_tuple
+    try:
+        return crud_user.get_users(db_conn, cursor, page_token, limit, user_type)
+    except MySQLError as e:
+        raise HTTPException(status_code=500, detail=f"Database query error: {e}")
+
+@router.get("/export")
+def export_users_endpoint(user_type: str = None, current_user: dict = Depends(get_current_user_data)):
+    """Stream every user as NDJSON, one object per line (managers only)"""
+    if current_user.get("user_type") != "manager":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to export users.")
+    # No request-scoped connection here: the generator borrows one per batch while the response streams
+    rows = stream_ndjson(get_pooled_connection, get_sql("users_get_page"), crud_user.USERS_KEYSET, {"user_type": user_type})
+    return StreamingResponse(rows, media_type="application/x-ndjson")
+
 @router.get("/{auth_id_param}")
 def get_user_endpoint(auth_id_param: str, db_conn_cursor_tuple = Depends(get_db_cursor)):
     db_conn, cursor = db_conn_cursor_tuple
@@ -113,6 +135,7 @@ async def update_user_endpoint(auth_id_param: str, request: Request, db_conn = D
             crud_user.update_manager_details_by_manager_id_pk(db_conn, cursor, user_id_pk, manager_update_data)
 
         db_conn.commit()
+        invalidate_current_user_cache(auth_id_param)
 
         final_user_data = crud_user.get_user_by_auth_id(db_conn, cursor, auth_id_param)
         if not final_user_data:
@@ -153,6 +176,7 @@ def delete_user_endpoint(auth_id_param: str, db_conn = Depends(get_db_connection
         if not success:
             raise HTTPException(status_code=404, detail="User not found or could not be deleted")
         db_conn.commit()
+        invalidate_current_user_cache(auth_id_param)
         return None 
     except HTTPException:
         if db_conn: db_conn.rollback()
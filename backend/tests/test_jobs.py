@@ -0,0 +1,109 @@
+"""A finished background job must read back as Succeeded/Failed, not stay Queued.
+
+Runs _run_job in-process against the real InstrumentedConnectionPool, with connections that only
+persist writes on commit (or with autocommit on), the way MySQL does.
+
+    python -m pytest backend/tests
+"""
+import os
+
+import pytest
+
+pytest.importorskip("mysql.connector")
+pytest.importorskip("fastapi")
+os.environ.setdefault("MYSQL_POOL_MIN_SIZE", "0")  # Importing backend.database.base must not try to connect
+
+from backend.database import base  # noqa: E402
+from backend.database.db_utils import get_sql  # noqa: E402
+from backend.database.pool import InstrumentedConnectionPool  # noqa: E402
+from backend.utils import jobs  # noqa: E402
+
+JOB_ID = "job-under-test"
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.jobs = {JOB_ID: "Queued"}
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        new_status = {
+            get_sql("background_jobs_mark_running"): "Running",
+            get_sql("background_jobs_mark_succeeded"): "Succeeded",
+            get_sql("background_jobs_mark_failed"): "Failed",
+        }.get(sql)
+        if new_status is not None:
+            self.connection.pending[JOB_ID] = new_status
+            if self.connection.autocommit:
+                self.connection.commit()
+        self.rowcount = 1
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Keeps writes in `pending` until commit, like a non-autocommit MySQL session"""
+
+    def __init__(self, database):
+        self.database = database
+        self.autocommit = False
+        self.pending = {}
+
+    @property
+    def in_transaction(self):
+        return bool(self.pending)
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.database.jobs.update(self.pending)
+        self.pending = {}
+
+    def rollback(self):
+        self.pending = {}
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+    pool = InstrumentedConnectionPool(min_size=0, max_size=4)
+    monkeypatch.setattr(pool, "_connect", lambda: FakeConnection(database))
+    monkeypatch.setattr(base, "get_pooled_connection", pool.get_connection)
+    return database
+
+
+def test_succeeded_job_is_recorded(database, monkeypatch):
+    monkeypatch.setattr(jobs, "_resolve_handler", lambda job_type: lambda db_conn, cursor, progress, **params: {"ok": True})
+    assert jobs._run_job(JOB_ID, "test_job", {}) == "Succeeded"
+    assert database.jobs[JOB_ID] == "Succeeded"
+
+
+def test_failed_job_is_recorded(database, monkeypatch):
+    def failing_handler(db_conn, cursor, progress, **params):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(jobs, "_resolve_handler", lambda job_type: failing_handler)
+    assert jobs._run_job(JOB_ID, "test_job", {}) == "Failed"
+    assert database.jobs[JOB_ID] == "Failed"
+
+
+def test_autocommit_reaches_the_pooled_connection(database):
+    connection = base.get_pooled_connection()
+    try:
+        connection.autocommit = True
+        assert connection._cnx.autocommit is True
+    finally:
+        connection.autocommit = False
+        connection.close()
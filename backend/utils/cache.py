@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+# Registry of named caches so their statistics can be reported in one place
+_caches: Dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    """Thread-safe bounded LRU cache with a per-entry expiry time and hit/miss counters."""
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl_seconds: Optional[float] = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds  # Default lifetime when set() is not given an explicit expiry
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        _caches[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and time.time() >= expires_at:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None):
+        """Store a value. `expires_at` is a unix timestamp; defaults to now + ttl_seconds."""
+        if expires_at is None and self.ttl_seconds is not None:
+            expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def get_all_cache_stats() -> list:
+    """Statistics for every TTLCache created in this process."""
+    return [cache.stats() for cache in list(_caches.values())]
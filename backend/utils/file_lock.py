@@ -0,0 +1,61 @@
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLockHeldError(RuntimeError):
+    """Another process already holds the lock"""
+
+
+class ExclusiveFileLock:
+    """A non-blocking, process-wide exclusive lock on `path` (created if missing).
+
+    The lock lives on its own file rather than on the log it guards, because the log is replaced
+    (os.replace) when it is compacted and a lock on the old file would no longer cover it.
+    The OS releases the lock if the process dies, so a crash never leaves it stuck.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self):
+        """Take the lock, or raise FileLockHeldError at once if another process has it"""
+        if self._file is not None:
+            return
+        lock_file = open(self.path, "a+", encoding="utf-8")
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            raise FileLockHeldError(f"{self.path} is locked by another process")
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(f"{os.getpid()}\n")  # Who holds it, for whoever is refused
+        lock_file.flush()
+        self._file = lock_file
+
+    def release(self):
+        if self._file is None:
+            return
+        lock_file, self._file = self._file, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            lock_file.close()
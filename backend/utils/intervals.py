@@ -0,0 +1,101 @@
+import bisect
+from datetime import time, timedelta
+
+
+def time_to_seconds(value) -> int:
+    """Seconds since midnight for a TIME column value (timedelta), a datetime.time or an "HH:MM[:SS]" string"""
+    if isinstance(value, timedelta):
+        return int(value.total_seconds())
+    if isinstance(value, time):
+        return value.hour * 3600 + value.minute * 60 + value.second
+    if isinstance(value, (int, float)):
+        return int(value)
+    parts = [int(float(part)) for part in str(value).strip().split(":")]
+    while len(parts) < 3:
+        parts.append(0)
+    return parts[0] * 3600 + parts[1] * 60 + parts[2]
+
+
+def seconds_to_time_str(seconds: int) -> str:
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class IntervalSet:
+    """Half-open [start, end) intervals of one resource (a hall or trainer on one day), sorted by start.
+
+    A running maximum of end times lets find_overlap() bisect straight to the candidates, so an
+    overlap query is O(log n) even if the stored intervals overlap each other (e.g. legacy rows).
+    """
+
+    def __init__(self):
+        self._starts = []
+        self._entries = []  # (start, end, ref), sorted by start
+        self._max_end = []  # _max_end[i] = max end over _entries[:i + 1]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _rebuild_max_end(self, from_index: int):
+        running = self._max_end[from_index - 1] if from_index > 0 else -1
+        del self._max_end[from_index:]
+        for _, end, _ in self._entries[from_index:]:
+            running = max(running, end)
+            self._max_end.append(running)
+
+    def add(self, start: int, end: int, ref=None):
+        index = bisect.bisect_right(self._starts, start)
+        self._starts.insert(index, start)
+        self._entries.insert(index, (start, end, ref))
+        self._rebuild_max_end(index)
+
+    def remove(self, ref) -> bool:
+        for index, entry in enumerate(self._entries):
+            if entry[2] == ref:
+                del self._starts[index]
+                del self._entries[index]
+                self._rebuild_max_end(index)
+                return True
+        return False
+
+    def find_overlap(self, start: int, end: int, exclude_ref=None):
+        """ref of an interval overlapping [start, end), or None"""
+        index = bisect.bisect_left(self._starts, end)  # Only intervals starting before `end` can overlap
+        while index > 0 and self._max_end[index - 1] > start:
+            index -= 1
+            entry_start, entry_end, ref = self._entries[index]
+            if entry_end > start and (exclude_ref is None or ref != exclude_ref):  # ref=None entries (blocks) always count
+                return ref if ref is not None else (entry_start, entry_end)
+        return None
+
+    def overlaps(self, start: int, end: int, exclude_ref=None) -> bool:
+        return self.find_overlap(start, end, exclude_ref) is not None
+
+
+class ResourceCalendar:
+    """IntervalSets keyed by (day_of_week, resource_id), created on first use"""
+
+    def __init__(self):
+        self._sets = {}
+
+    def get(self, day_of_week, resource_id) -> IntervalSet:
+        key = (day_of_week, resource_id)
+        interval_set = self._sets.get(key)
+        if interval_set is None:
+            interval_set = self._sets[key] = IntervalSet()
+        return interval_set
+
+    def add(self, day_of_week, resource_id, start: int, end: int, ref=None):
+        self.get(day_of_week, resource_id).add(start, end, ref)
+
+    def remove(self, day_of_week, resource_id, ref) -> bool:
+        interval_set = self._sets.get((day_of_week, resource_id))
+        return interval_set.remove(ref) if interval_set is not None else False
+
+    def find_overlap(self, day_of_week, resource_id, start: int, end: int, exclude_ref=None):
+        interval_set = self._sets.get((day_of_week, resource_id))
+        if interval_set is None:
+            return None
+        return interval_set.find_overlap(start, end, exclude_ref)
+
+    def is_free(self, day_of_week, resource_id, start: int, end: int, exclude_ref=None) -> bool:
+        return self.find_overlap(day_of_week, resource_id, start, end, exclude_ref) is None
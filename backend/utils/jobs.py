@@ -0,0 +1,163 @@
+import importlib
+import multiprocessing
+import os
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Nothing from backend.database is imported at module level: importing it builds a connection pool,
+# and worker processes must configure theirs (see _init_worker) before that happens.
+
+JOB_WORKER_PROCESSES = int(os.getenv("JOB_WORKER_PROCESSES", "2"))
+JOB_WORKER_DB_CONNECTIONS = os.getenv("JOB_WORKER_DB_CONNECTIONS", "2")  # Per worker: the job's transaction + progress updates
+
+# job_type -> "module:function". The function runs in a worker process as
+# function(db_conn, cursor, progress=callback, **params) and returns a JSON-serializable result.
+JOB_HANDLERS = {
+    "generate_weekly_schedule": "backend.database.crud.scheduling:generate_weekly_schedule_for_week",
+    "reconcile_schedule_participant_counts": "backend.database.crud.scheduling:reconcile_schedule_participant_counts",
+}
+
+
+def _init_worker():
+    # Each worker process gets its own small pool; connections are never shared across processes
+    os.environ["MYSQL_POOL_MIN_SIZE"] = "0"
+    os.environ["MYSQL_POOL_MAX_SIZE"] = JOB_WORKER_DB_CONNECTIONS
+    os.environ["DB_EXECUTOR_WORKERS"] = "1"
+    import backend.database.base  # noqa: F401
+
+
+def _resolve_handler(job_type: str):
+    module_name, function_name = JOB_HANDLERS[job_type].split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _run_job(job_id: str, job_type: str, params: dict):
+    """Worker-process entry point: run one job in its own transaction and record the outcome"""
+    from fastapi import HTTPException
+    from backend.database.base import get_pooled_connection
+    from backend.database.crud import jobs as crud_jobs
+
+    # Progress and status go through a separate autocommit connection so pollers see them
+    # while the job's own transaction is still open
+    status_conn = get_pooled_connection()
+    status_conn.autocommit = True
+    status_cursor = status_conn.cursor(dictionary=True)
+
+    def progress(percent: int, message: str = None):
+        try:
+            crud_jobs.update_job_progress(status_conn, status_cursor, job_id, percent, message)
+        except Exception as e:
+            print(f"❌ Job {job_id}: progress update failed: {e}")  # Best effort, never fails the job
+
+    db_conn = None
+    cursor = None
+    try:
+        crud_jobs.mark_job_running(status_conn, status_cursor, job_id)
+        handler = _resolve_handler(job_type)
+        db_conn = get_pooled_connection()
+        cursor = db_conn.cursor(dictionary=True)
+        result = handler(db_conn, cursor, progress=progress, **params)
+        db_conn.commit()
+        crud_jobs.mark_job_succeeded(status_conn, status_cursor, job_id, result)
+        return "Succeeded"
+    except HTTPException as e:
+        if db_conn: db_conn.rollback()
+        crud_jobs.mark_job_failed(status_conn, status_cursor, job_id, f"{e.status_code}: {e.detail}")
+        return "Failed"
+    except Exception as e:
+        if db_conn: db_conn.rollback()
+        traceback.print_exc()
+        crud_jobs.mark_job_failed(status_conn, status_cursor, job_id, f"Unexpected error: {str(e)}")
+        return "Failed"
+    finally:
+        if cursor: cursor.close()
+        if db_conn: db_conn.close()
+        status_cursor.close()
+        status_conn.autocommit = False
+        status_conn.close()
+
+
+class JobRunner:
+    """Runs registered job types on a process pool; state lives in the background_jobs table.
+
+    The route creates the job row (status 'Queued') and commits it, then calls submit(). The
+    worker process marks it Running, reports progress and stores the result or error, which
+    clients poll through GET /jobs/{job_id}.
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKER_PROCESSES):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._success_hooks = {}  # job_type -> [callback(params)], run in this (the API) process
+
+    def on_success(self, job_type: str, callback):
+        """Run callback(params) here when a job of this type succeeds, e.g. to drop caches it made stale"""
+        self._success_hooks.setdefault(job_type, []).append(callback)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the API process has threads and open sockets that a forked child must not inherit
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context("spawn"),
+                                                     initializer=_init_worker)
+            return self._executor
+
+    def _reset_executor(self, broken):
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+
+    def submit(self, job_id: str, job_type: str, params: dict):
+        if job_type not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job type: {job_type}")
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_run_job, job_id, job_type, params)
+        except BrokenProcessPool:
+            self._reset_executor(executor)
+            future = self._get_executor().submit(_run_job, job_id, job_type, params)
+        future.add_done_callback(lambda f: self._on_done(job_id, job_type, params, executor, f))
+        return future
+
+    def _on_done(self, job_id, job_type, params, executor, future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            if future.result() == "Succeeded":
+                for callback in self._success_hooks.get(job_type, []):
+                    try:
+                        callback(params)
+                    except Exception as e:
+                        print(f"❌ Job {job_id}: success hook failed: {e}")
+            return
+        # The worker died (killed, out of memory, ...) before it could record the outcome itself
+        if isinstance(error, BrokenProcessPool):
+            self._reset_executor(executor)
+        print(f"❌ Job {job_id} crashed: {error!r}")
+        from backend.database.base import get_pooled_connection
+        from backend.database.crud import jobs as crud_jobs
+        connection = None
+        try:
+            connection = get_pooled_connection()
+            cursor = connection.cursor(dictionary=True)
+            crud_jobs.mark_job_failed(connection, cursor, job_id, f"Worker crashed: {error!r}")
+            connection.commit()
+            cursor.close()
+        except Exception as e:
+            print(f"❌ Could not record failure of job {job_id}: {e}")
+        finally:
+            if connection: connection.close()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+job_runner = JobRunner()
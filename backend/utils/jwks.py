@@ -0,0 +1,97 @@
+import json
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import requests
+
+
+def http_jwks_source(jwks_url: str, timeout: float = 5.0) -> Callable[[], dict]:
+    """Key source that downloads the JWKS document from the identity provider."""
+    def fetch() -> dict:
+        response = requests.get(jwks_url, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+    return fetch
+
+
+def file_jwks_source(path: str) -> Callable[[], dict]:
+    """Key source that reads a local JWKS file (useful for tests and offline development)."""
+    def fetch() -> dict:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return fetch
+
+
+class JWKSKeyStore:
+    """In-process JWKS cache keyed by `kid`.
+
+    Keys are served from memory. Once they are older than `ttl_seconds` they are
+    still served, but a background refresh is started. A refetch on the request
+    path only happens when an unknown `kid` shows up (or no keys are loaded yet),
+    and blocks, so callers run it off the event loop. Concurrent callers share
+    one fetch (single-flight), and those refetches are rate limited by
+    `min_refetch_interval` so tokens with random kids cannot hammer the provider.
+    """
+
+    def __init__(self, source: Callable[[], dict], ttl_seconds: float = 3600, min_refetch_interval: float = 30):
+        self._source = source
+        self._ttl_seconds = ttl_seconds
+        self._min_refetch_interval = min_refetch_interval
+        self._keys: Dict[str, dict] = {}
+        self._fetched_at = 0.0
+        self._last_attempt = 0.0
+        self._lock = threading.Lock()  # Guards the fetch itself (single-flight)
+        self._refreshing = False
+
+    def _fetch_and_swap(self):
+        self._last_attempt = time.monotonic()
+        jwks = self._source()
+        keys = {key["kid"]: key for key in jwks.get("keys", []) if "kid" in key}
+        # Swap in a new dict so readers never see a half-built key set
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+        print(f"DEBUG:jwks.py, loaded {len(keys)} signing key(s)")
+
+    def refresh(self):
+        """Fetch the key set now (blocking)."""
+        with self._lock:
+            self._fetch_and_swap()
+
+    def _background_refresh(self):
+        try:
+            with self._lock:
+                if not self._keys or time.monotonic() - self._fetched_at >= self._ttl_seconds:
+                    self._fetch_and_swap()
+        except Exception as e:
+            # Keep serving the stale keys; the next stale read will retry
+            print(f"❌ JWKS background refresh failed: {e}")
+        finally:
+            self._refreshing = False
+
+    def refresh_in_background(self):
+        """Start a refresh on a daemon thread if one is not already running."""
+        if self._refreshing:
+            return
+        self._refreshing = True
+        threading.Thread(target=self._background_refresh, name="jwks-refresh", daemon=True).start()
+
+    def get_key(self, kid: str) -> Optional[dict]:
+        """Return the JWK for `kid`, or None if the provider does not know it."""
+        if self._keys and time.monotonic() - self._fetched_at >= self._ttl_seconds:
+            self.refresh_in_background()
+
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        # Unknown kid (or empty cache): refetch once, shared by all concurrent callers
+        with self._lock:
+            key = self._keys.get(kid)
+            if key is not None:
+                return key  # Another caller fetched it while we waited
+            # Rate limited even with an empty cache, so a provider outage is not one fetch per request
+            if self._last_attempt and time.monotonic() - self._last_attempt < self._min_refetch_interval:
+                return None
+            self._fetch_and_swap()
+        return self._keys.get(kid)
@@ -0,0 +1,149 @@
+import asyncio
+import itertools
+import os
+import threading
+from collections import deque
+
+from backend.database.db_utils import dumps_json
+from backend.database.pool import after_commit
+
+LIVE_EVENTS_QUEUE_SIZE = int(os.getenv("LIVE_EVENTS_QUEUE_SIZE", "256"))  # Per subscriber; a subscriber that falls this far behind is dropped
+LIVE_EVENTS_REPLAY_SIZE = int(os.getenv("LIVE_EVENTS_REPLAY_SIZE", "1024"))  # Recent events kept for reconnects with Last-Event-ID
+LIVE_EVENTS_HEARTBEAT_SECONDS = float(os.getenv("LIVE_EVENTS_HEARTBEAT_SECONDS", "15"))
+
+
+def _frame(event_id: int, event_type: str, body: bytes) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, event_type.encode(), body)
+
+
+class Subscription:
+    """One connected stream: receives the frames for one live session, or for all of them"""
+
+    def __init__(self, live_session_id, maxsize):
+        self.live_session_id = live_session_id
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False  # Fell behind; the stream ends and the client reconnects and resyncs
+
+
+class LiveSessionHub:
+    """In-process pub/sub for live session events, streamed to dashboards as Server-Sent Events.
+
+    CRUD code publishes after its transaction commits (publish_on_commit), usually from a DB
+    executor thread; each event is serialized once and fanned out to the subscribers' queues on
+    the event loop, so every open dashboard is one queue put instead of one polling request.
+    Events are numbered; a client reconnecting with Last-Event-ID is replayed what it missed
+    from a bounded history, or told to resync when that history no longer reaches back.
+
+    Only events published in this process are delivered: with several API workers, a
+    dashboard sees the writes handled by the worker it is connected to.
+    """
+
+    def __init__(self, queue_size: int = LIVE_EVENTS_QUEUE_SIZE, replay_size: int = LIVE_EVENTS_REPLAY_SIZE):
+        self.queue_size = queue_size
+        self._loop = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._history = deque(maxlen=replay_size)  # (event_id, live_session_id, frame)
+        self._subscribers = set()
+        self.published = 0
+        self.delivered = 0
+        self.dropped_subscribers = 0
+
+    def attach(self, loop):
+        """Deliver on this event loop (the API's); call at startup"""
+        self._loop = loop
+
+    def publish(self, event_type: str, live_session_id: int, data: dict):
+        """Broadcast an event; safe to call from any thread"""
+        body = dumps_json({"type": event_type, "live_session_id": live_session_id, "data": data})
+        with self._lock:
+            event_id = next(self._ids)
+            frame = _frame(event_id, event_type, body)
+            self._history.append((event_id, live_session_id, frame))
+            self.published += 1
+            loop = self._loop
+            if loop is not None and not loop.is_closed():
+                # Scheduled under the lock so subscribers get events in id order
+                loop.call_soon_threadsafe(self._fan_out, event_id, live_session_id, frame)
+
+    def publish_on_commit(self, db_conn, event_type: str, live_session_id: int, data: dict):
+        after_commit(db_conn, lambda: self.publish(event_type, live_session_id, data))
+
+    def _fan_out(self, event_id, live_session_id, frame):
+        for subscription in list(self._subscribers):
+            if subscription.live_session_id is not None and subscription.live_session_id != live_session_id:
+                continue
+            try:
+                subscription.queue.put_nowait((event_id, frame))
+                self.delivered += 1
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    def _drop(self, subscription):
+        subscription.dropped = True
+        self._subscribers.discard(subscription)
+        self.dropped_subscribers += 1
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)  # Wakes the stream so it can end
+
+    def subscribe(self, live_session_id: int = None, last_event_id: int = None) -> Subscription:
+        """Register a subscriber; call on the event loop. Events missed since last_event_id are queued first."""
+        subscription = Subscription(live_session_id, self.queue_size)
+        if last_event_id is not None:
+            with self._lock:
+                history = list(self._history)
+            missed = [(event_id, frame) for event_id, event_session_id, frame in history
+                      if event_id > last_event_id and (live_session_id is None or event_session_id == live_session_id)]
+            latest = history[-1][0] if history else 0
+            # Gone from the history, too many to queue, or numbered by an earlier process
+            if (history and history[0][0] > last_event_id + 1) or len(missed) >= self.queue_size or last_event_id > latest:
+                subscription.queue.put_nowait((latest, _frame(latest, "resync", b"{}")))
+            else:
+                for item in missed:
+                    subscription.queue.put_nowait(item)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    async def stream(self, subscription: Subscription, is_disconnected, heartbeat_seconds: float = LIVE_EVENTS_HEARTBEAT_SECONDS):
+        """SSE body for a subscription: its frames, with a comment line as heartbeat while idle"""
+        last_sent = 0
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    item = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        return
+                    yield b": keepalive\n\n"
+                    continue
+                if item is None:
+                    return
+                event_id, frame = item
+                if event_id <= last_sent and last_sent:
+                    continue  # Already covered by the replay (or resync) queued at subscribe time
+                last_sent = event_id
+                yield frame
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self) -> dict:
+        with self._lock:
+            history = len(self._history)
+            oldest = self._history[0][0] if self._history else None
+        return {
+            "subscribers": len(self._subscribers),
+            "per_session_subscribers": sum(1 for s in self._subscribers if s.live_session_id is not None),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped_subscribers": self.dropped_subscribers,
+            "replay_events": history,
+            "oldest_replay_event_id": oldest,
+        }
+
+
+live_session_hub = LiveSessionHub()
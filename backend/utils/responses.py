@@ -0,0 +1,14 @@
+from fastapi.responses import JSONResponse
+from backend.database.db_utils import dumps_json
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson (when installed).
+
+    datetime/date/time/Decimal/bytes/timedelta are encoded natively, producing the same JSON
+    as format_records + FastAPI's encoder, so routes returning it can hand over raw DB rows.
+    Return an instance directly from the route to bypass jsonable_encoder as well.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps_json(content)
@@ -0,0 +1,226 @@
+import os
+from collections import defaultdict
+
+from backend.utils.intervals import ResourceCalendar, time_to_seconds, seconds_to_time_str
+
+MAX_SESSIONS_PER_MEMBER = int(os.getenv("SCHEDULE_MAX_SESSIONS_PER_MEMBER", "3"))  # Per week, existing bookings included
+SESSION_CAPACITY_CAP = int(os.getenv("SCHEDULE_SESSION_CAPACITY", "0"))  # >0 caps a session below its hall's max_capacity
+
+_PREFERENCE_WEIGHT = {"Preferred": 2, "Available": 1}
+
+
+class WeeklyScheduleSolver:
+    """Greedy constraint solver that turns a week of training_preferences into sessions.
+
+    All inputs are plain rows (dicts) so the solver never touches the database. Hard constraints:
+    a trainer or hall is never double-booked (existing sessions and classes included), sessions
+    fit inside gym_hours, sessions never exceed their capacity, and a member gets at most one
+    session per day, none overlapping and at most `max_sessions_per_member` a week.
+    Soft constraints, in order: 'Preferred' over 'Available', the member's preferred trainer,
+    filling existing sessions before opening new ones, and members with fewer sessions first.
+
+    Availability lookups go through per-day interval indexes (ResourceCalendar), so one solve
+    is O(P log P) in the number of preference rows rather than one overlap query per candidate.
+    """
+
+    def __init__(self, halls, trainers, gym_hours=None, existing_sessions=None, existing_assignments=None,
+                 blocking_events=None, max_sessions_per_member=MAX_SESSIONS_PER_MEMBER,
+                 session_capacity_cap=SESSION_CAPACITY_CAP):
+        self.halls = sorted((h for h in halls if h.get("is_active", True) and h["max_capacity"] > 0), key=lambda h: h["max_capacity"])
+        self.trainer_ids = [t["trainer_id"] for t in trainers if t.get("is_active", True)]
+        self.max_sessions_per_member = max_sessions_per_member
+        self.session_capacity_cap = session_capacity_cap
+        self.opening_hours = {}  # day -> (open, close) in seconds; None when closed
+        for row in gym_hours or []:
+            if row.get("is_closed"):
+                self.opening_hours[row["day_of_week"]] = None
+            else:
+                self.opening_hours[row["day_of_week"]] = (time_to_seconds(row["opening_time"]), time_to_seconds(row["closing_time"]))
+
+        self.hall_calendar = ResourceCalendar()
+        self.trainer_calendar = ResourceCalendar()
+        self.member_calendar = ResourceCalendar()
+        self._blocked = ResourceCalendar()  # Members' 'Not Available' ranges
+        self.sessions = []  # Existing and new sessions: {"ref", "schedule_id", "day_of_week", "start", "end", ..., "members"}
+        self._sessions_by_slot = defaultdict(list)
+        self._member_days = defaultdict(set)
+        self._member_load = defaultdict(int)
+
+        for event in blocking_events or []:  # e.g. classes that week: block their trainer and hall
+            start, end = time_to_seconds(event["start_time"]), time_to_seconds(event["end_time"])
+            self.trainer_calendar.add(event["day_of_week"], event["trainer_id"], start, end)
+            self.hall_calendar.add(event["day_of_week"], event["hall_id"], start, end)
+
+        for row in existing_sessions or []:
+            self._add_session(row["day_of_week"], time_to_seconds(row["start_time"]), time_to_seconds(row["end_time"]),
+                              row["hall_id"], row["trainer_id"], row["max_capacity"],
+                              schedule_id=row["schedule_id"], member_count=row.get("member_count", 0))
+
+        sessions_by_id = {s["schedule_id"]: s for s in self.sessions}
+        for row in existing_assignments or []:
+            session = sessions_by_id.get(row["schedule_id"])
+            if session is not None:
+                self._book_member(row["member_id"], session, existing=True)
+
+    # --- bookkeeping ---
+    def _add_session(self, day, start, end, hall_id, trainer_id, capacity, schedule_id=None, member_count=0):
+        session = {
+            "ref": len(self.sessions), "schedule_id": schedule_id, "day_of_week": day, "start": start, "end": end,
+            "hall_id": hall_id, "trainer_id": trainer_id, "max_capacity": capacity,
+            "member_count": member_count, "members": [],
+        }
+        self.sessions.append(session)
+        self._sessions_by_slot[(day, start, end)].append(session)
+        self.hall_calendar.add(day, hall_id, start, end, session["ref"])
+        self.trainer_calendar.add(day, trainer_id, start, end, session["ref"])
+        return session
+
+    def _book_member(self, member_id, session, existing=False):
+        day = session["day_of_week"]
+        self.member_calendar.add(day, member_id, session["start"], session["end"], session["ref"])
+        self._member_days[member_id].add(day)
+        self._member_load[member_id] += 1
+        if not existing:
+            session["member_count"] += 1
+            session["members"].append(member_id)
+
+    def _member_can_take(self, member_id, day, start, end):
+        if self._member_load[member_id] >= self.max_sessions_per_member:
+            return False
+        if day in self._member_days[member_id]:
+            return False
+        if not self.member_calendar.is_free(day, member_id, start, end):
+            return False
+        return self._blocked.is_free(day, member_id, start, end)
+
+    def _within_gym_hours(self, day, start, end):
+        if day not in self.opening_hours:
+            return True  # No gym_hours row for the day: nothing to enforce
+        hours = self.opening_hours[day]
+        return hours is not None and hours[0] <= start and end <= hours[1]
+
+    def _open_session(self, day, start, end, demand, preferred_trainer=None):
+        """Open a session with a free trainer and the smallest free hall that fits the demand"""
+        if preferred_trainer is not None:
+            candidates = [preferred_trainer] if preferred_trainer in self.trainer_ids else []
+        else:
+            candidates = self.trainer_ids
+        trainer_id = None
+        for candidate in candidates:
+            if self.trainer_calendar.is_free(day, candidate, start, end):
+                # Spread load: among free trainers prefer the one with the fewest sessions that day
+                if trainer_id is None or len(self.trainer_calendar.get(day, candidate)) < len(self.trainer_calendar.get(day, trainer_id)):
+                    trainer_id = candidate
+        if trainer_id is None:
+            return None
+
+        free_halls = [h for h in self.halls if self.hall_calendar.is_free(day, h["hall_id"], start, end)]
+        if not free_halls:
+            return None
+        hall = next((h for h in free_halls if self._capacity(h) >= demand), free_halls[-1])
+        return self._add_session(day, start, end, hall["hall_id"], trainer_id, self._capacity(hall))
+
+    def _capacity(self, hall):
+        if self.session_capacity_cap > 0:
+            return min(hall["max_capacity"], self.session_capacity_cap)
+        return hall["max_capacity"]
+
+    # --- solve ---
+    def solve(self, preferences):
+        """Assign members from preference rows. Returns (new_sessions, new_assignments, stats)."""
+        requests_by_slot = defaultdict(list)
+        for pref in preferences:
+            day = pref["day_of_week"]
+            start, end = time_to_seconds(pref["start_time"]), time_to_seconds(pref["end_time"])
+            if end <= start:
+                continue
+            if pref["preference_type"] == "Not Available":
+                self._blocked.add(day, pref["member_id"], start, end)
+            elif pref["preference_type"] in _PREFERENCE_WEIGHT:
+                requests_by_slot[(day, start, end)].append(pref)
+
+        # Most wanted slots first: they get first pick of trainers and halls
+        slot_order = sorted(requests_by_slot, key=lambda slot: (
+            -sum(_PREFERENCE_WEIGHT[p["preference_type"]] for p in requests_by_slot[slot]), slot))
+        stats = {"preference_rows": len(preferences), "slots_considered": len(slot_order),
+                 "skipped_outside_gym_hours": 0, "unplaced_requests": 0}
+
+        for day, start, end in slot_order:
+            slot_requests = requests_by_slot[(day, start, end)]
+            if not self._within_gym_hours(day, start, end):
+                stats["skipped_outside_gym_hours"] += len(slot_requests)
+                continue
+            self._fill_slot(day, start, end, slot_requests, stats)
+
+        new_sessions = [s for s in self.sessions if s["schedule_id"] is None and s["members"]]
+        new_assignments = [(s["ref"], member_id) for s in self.sessions for member_id in s["members"]]
+        stats["sessions_created"] = len(new_sessions)
+        stats["members_assigned"] = len(new_assignments)
+        stats["members_with_sessions"] = len({m for _, m in new_assignments})
+        return new_sessions, new_assignments, stats
+
+    def _fill_slot(self, day, start, end, slot_requests, stats):
+        # Preferred before Available, then the members with the fewest sessions so far
+        slot_requests.sort(key=lambda p: (-_PREFERENCE_WEIGHT[p["preference_type"]], self._member_load[p["member_id"]], p["member_id"]))
+        by_trainer = defaultdict(list)
+        for pref in slot_requests:
+            by_trainer[pref.get("trainer_id")].append(pref["member_id"])
+
+        # Members asking for a specific trainer go first; if that trainer is full or busy they
+        # join the "no preference" members, who fill whatever seats are left
+        fallback = []
+        for trainer_id in [t for t in by_trainer if t is not None]:
+            fallback.extend(self._place(day, start, end, by_trainer[trainer_id], trainer_id, stats))
+        unplaced = self._place(day, start, end, by_trainer.get(None, []) + fallback, None, stats)
+        stats["unplaced_requests"] += len(unplaced)
+
+    def _place(self, day, start, end, members, trainer_id, stats):
+        """Seat members in existing sessions of this slot, then in new ones; returns those left over.
+
+        Members who cannot take the slot at all (session limit, already training that day, busy or
+        not available) are dropped here and counted in stats["unplaced_requests"].
+        """
+        pending = [m for m in members if self._member_can_take(m, day, start, end)]
+        stats["unplaced_requests"] += len(members) - len(pending)
+        for session in self._sessions_by_slot[(day, start, end)]:
+            if not pending:
+                return []
+            if trainer_id is None or session["trainer_id"] == trainer_id:
+                pending = self._seat(session, pending, stats)
+        while pending:
+            session = self._open_session(day, start, end, len(pending), trainer_id)
+            if session is None:
+                break
+            before = len(pending)
+            pending = self._seat(session, pending, stats)
+            if len(pending) == before:
+                break
+        return pending
+
+    def _seat(self, session, members, stats):
+        """Book members into a session until it is full; returns those left over (members who can no
+        longer take it are counted in stats["unplaced_requests"] instead)"""
+        left = []
+        for member_id in members:
+            if session["member_count"] >= session["max_capacity"]:
+                left.append(member_id)
+            elif self._member_can_take(member_id, session["day_of_week"], session["start"], session["end"]):
+                self._book_member(member_id, session)
+            else:
+                stats["unplaced_requests"] += 1
+        return left
+
+
+def session_to_row(session, week_start_date, created_by):
+    """weekly_schedule_create parameters for a session opened by the solver"""
+    return {
+        "week_start_date": week_start_date,
+        "day_of_week": session["day_of_week"],
+        "start_time": seconds_to_time_str(session["start"]),
+        "end_time": seconds_to_time_str(session["end"]),
+        "hall_id": session["hall_id"],
+        "trainer_id": session["trainer_id"],
+        "max_capacity": session["max_capacity"],
+        "status": "Scheduled",
+        "created_by": created_by,
+    }
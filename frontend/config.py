@@ -13,4 +13,6 @@ AUTH0_CLIENT_ID = os.getenv("AUTH0_CLIENT_ID", "your-client-id")
 AUTH0_CLIENT_SECRET = os.getenv("AUTH0_CLIENT_SECRET", "your-client-secret")
 AUTH0_DOMAIN = os.getenv("AUTH0_DOMAIN", "your-auth0-domain")
 AUTH0_AUDIENCE = os.getenv("AUTH0_AUDIENCE", "your-auth0-audience")
+AUTH0_JWKS_FILE = os.getenv("AUTH0_JWKS_FILE")  # Optional local JWKS file used instead of the Auth0 endpoint (tests/offline)
+AUTH0_JWKS_TTL_SECONDS = int(os.getenv("AUTH0_JWKS_TTL_SECONDS", "3600"))
 # AUTH0_AUDIENCE2=https://dev-eyhbmr7bi2rh61op.eu.auth0.com/api/v2/
\ No newline at end of file
@@ -16,6 +16,27 @@ async def user_full_details(user):
             print(f"Error fetching user details: {response.status_code} - {response.text}")
             return None
 
+async def join_class_waitlist(user, gym_class):
+    # Queue the member; when a seat frees up the backend books them (free classes) or creates a booking to pay
+    member_id = ((user or {}).get("member_details") or {}).get("member_id")
+    if not member_id:
+        ui.notify('Only members can join a waitlist', type='warning')
+        return
+    data = {
+        "member_id": member_id,
+    }
+    class_name = gym_class.get('name', f"Class #{gym_class['class_id']}")
+    async with httpx.AsyncClient() as client:
+        response = await client.post(f'http://{API_HOST}:{API_PORT}/classes/{gym_class["class_id"]}/waitlist', json=data)
+    if response.status_code == 201:
+        ui.notify(f'Added to waitlist for {class_name} (position {response.json().get("position")})', type='info')
+    else:
+        try:
+            detail = response.json().get("detail", response.text)
+        except ValueError:
+            detail = response.text
+        ui.notify(f'Could not join waitlist: {detail}', type='negative')
+
 async def classes_page():
     # Apply consistent page styling
     apply_page_style()
@@ -314,7 +335,7 @@ async def classes_page():
                                         'transform hover:scale-105 transition-all duration-200'
                                     )
                                 else:
-                                    ui.button('Join Waitlist', on_click=lambda c=class_name: ui.notify(f'Added to waitlist for {c}', type='info')).classes(
+                                    ui.button('Join Waitlist', on_click=lambda c=gym_class: join_class_waitlist(user, c)).classes(
                                         'bg-gradient-to-r from-gray-500 to-gray-600 hover:from-gray-600 hover:to-gray-700 '
                                         'text-white px-6 py-2 rounded-lg font-semibold text-sm shadow-lg '
                                         'transform hover:scale-105 transition-all duration-200'
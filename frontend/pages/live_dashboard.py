@@ -11,7 +11,7 @@ async def is_preference_day():
     # Simple check for Thursday (weekday 3)
     return datetime.date.today().weekday() == 3
 
-# Placeholder for checking active session - Requires Backend Implementation
+# Served from the backend's active session index (GET /training/live/sessions/current)
 async def user_has_active_session(user):
     if not user:
         return False
@@ -21,10 +21,9 @@ async def user_has_active_session(user):
             return False
         headers = {"Authorization": f"Bearer {token}"}
         async with httpx.AsyncClient() as client:
-            # !!! IMPORTANT: Replace with the actual backend endpoint once created !!!
             # This endpoint should check if the user (member/trainer) has a session NOW.
             response = await client.get(f"http://{API_HOST}:{API_PORT}/training/live/sessions/current", headers=headers)
-            if response.status_code == 200 and response.json():
+            if response.status_code == 200 and response.json().get('active_session'):
                 # Optionally store active session ID if returned by the endpoint
                 # live_session_id = response.json().get('live_session_id')
                 # if live_session_id:
@@ -82,25 +81,20 @@ async def display_live_dashboard():
         }
         '''
         
-        # Auto-refresh controls
-        auto_refresh_enabled = True
-        refresh_rate_seconds = 30
-        
+        # Live updates are pushed by the backend (see follow_live_events); no polling
         with ui.row().classes('w-full items-center justify-between'):
-            ui.label('Auto-refresh settings').classes('text-h6')
-            
-            with ui.row():
-                auto_refresh_checkbox = ui.checkbox('Auto-refresh', value=True)
-                refresh_rate_input = ui.number(
-                    'Refresh rate (seconds)',
-                    min=10,
-                    max=60,
-                    step=5,
-                    value=30
-                ).props('size=8')
-        
-        # Placeholder for countdown timer
-        refresh_timer_display = ui.label('')
+            ui.label('Live updates').classes('text-h6')
+            live_status_label = ui.label('Connecting...').classes('text-grey')
+
+        # Elements patched in place by live events, registered as the dashboard renders
+        live_view = {
+            "sessions_table": None,      # manager: table of active sessions
+            "status_labels": {},         # live_session_id -> status label
+            "member_tables": {},         # live_session_id -> members table (trainer)
+            "exercise_labels": {},       # exercise_id -> {"sets": label, "reps": label, "weight": label, "title": expansion} (member)
+            "member_session_id": None,   # member: the live session shown
+            "user_type": None,
+        }
         
         @ui.refreshable
         async def load_dashboard_content():
@@ -116,6 +110,7 @@ async def display_live_dashboard():
                 return JSON.parse(localStorage.getItem('user_info') || '{}');
             ''')
             user_type = user_info.get('user_type', '')
+            live_view["user_type"] = user_type
 
             # *** Access Control Check ***
             # Add this check if you want to prevent loading if no session is active NOW
@@ -128,6 +123,11 @@ async def display_live_dashboard():
             #     return
 
             # Clear and show loading state
+            live_view["sessions_table"] = None
+            live_view["status_labels"] = {}
+            live_view["member_tables"] = {}
+            live_view["exercise_labels"] = {}
+            live_view["member_session_id"] = None
             dashboard_container.clear()
             with dashboard_container:
                 ui.spinner(size='lg').classes('self-center')
@@ -178,7 +178,7 @@ async def display_live_dashboard():
                         {'name': 'status', 'label': 'Status', 'field': 'status'}
                     ]
                     
-                    ui.table(columns=columns, rows=sessions).classes('w-full')
+                    live_view["sessions_table"] = ui.table(columns=columns, rows=sessions, row_key='live_session_id').classes('w-full')
                     
                     # Show detailed info for each session in cards
                     ui.label("Session Details").classes('text-h6 q-mt-md')
@@ -189,7 +189,7 @@ async def display_live_dashboard():
                                     with ui.column().classes('w-1/2'):
                                         ui.label(f"📍 Hall: {session['hall_name']}")
                                         ui.label(f"👨‍🏫 Trainer: {session['trainer_name']}")
-                                        ui.label(f"📊 Status: {session['status']}")
+                                        live_view["status_labels"][session['live_session_id']] = ui.label(f"📊 Status: {session['status']}")
                                         ui.label(f"⏱️ Started at: {session['start_time']}")
                                     
                                     with ui.column().classes('w-1/2 items-end'):
@@ -228,7 +228,7 @@ async def display_live_dashboard():
                         with ui.card().classes('w-full q-my-md'):
                             ui.label(f"Session in {session['hall_name']}").classes('text-h6')
                             ui.label(f"⏱️ Started at: {session['start_time']}")
-                            ui.label(f"📊 Status: {session['status']}")
+                            live_view["status_labels"][session['live_session_id']] = ui.label(f"📊 Status: {session['status']}")
                             
                             # Try to get members assigned to this session
                             try:
@@ -259,11 +259,14 @@ async def display_live_dashboard():
                                     member_rows = []
                                     for member in members:
                                         member_rows.append({
+                                            'member_id': member.get('member_id'),
                                             'name': f"{member.get('first_name', '')} {member.get('last_name', '')}",
                                             'attendance_status': member.get('attendance_status', 'N/A')
                                         })
                                     
-                                    ui.table(columns=member_columns, rows=member_rows).classes('w-full')
+                                    live_view["member_tables"][session['live_session_id']] = ui.table(
+                                        columns=member_columns, rows=member_rows, row_key='member_id'
+                                    ).classes('w-full')
                             
                             except Exception as e:
                                 ui.label(f"Failed to load members: {str(e)}").classes('text-negative')
@@ -309,8 +312,10 @@ async def display_live_dashboard():
                     # Should typically be only one active session for a member
                     session = sessions[0]
                     
+                    live_view["member_session_id"] = session['live_session_id']
                     ui.label(f"Session in {session['hall_name']} with {session['trainer_name']}").classes('text-h6')
                     ui.label(f"⏱️ Started at: {session['start_time']}")
+                    live_view["status_labels"][session['live_session_id']] = ui.label(f"📊 Status: {session.get('status', 'Started')}")
                     
                     # Get exercises for this member in this session
                     exercises = await ui.run_javascript(f'''
@@ -333,7 +338,7 @@ async def display_live_dashboard():
                         # Display each exercise with progress tracking
                         for i, exercise in enumerate(exercises):
                             with ui.card().classes('w-full q-my-sm'):
-                                with ui.expansion(f"{i+1}. {exercise['exercise_name']} {'✓' if exercise['completed'] else ''}"):
+                                with ui.expansion(f"{i+1}. {exercise['exercise_name']} {'✓' if exercise['completed'] else ''}") as exercise_title:
                                     with ui.row().classes('w-full'):
                                         with ui.column().classes('w-2/3'):
                                             ui.label(f"Exercise: {exercise['exercise_name']}").classes('text-bold')
@@ -345,9 +350,13 @@ async def display_live_dashboard():
                                             
                                             # Show actual progress
                                             ui.label("Current Progress:").classes('text-bold q-mt-sm')
-                                            ui.label(f"Sets Completed: {exercise['sets_completed']}")
-                                            ui.label(f"Reps Performed: {exercise['actual_reps'] or 'Not recorded'}")
-                                            ui.label(f"Weight Used (kg): {exercise['weight_used'] or 'Not recorded'}")
+                                            live_view["exercise_labels"][exercise['exercise_id']] = {
+                                                "title": exercise_title,
+                                                "name": f"{i+1}. {exercise['exercise_name']}",
+                                                "sets": ui.label(f"Sets Completed: {exercise['sets_completed']}"),
+                                                "reps": ui.label(f"Reps Performed: {exercise['actual_reps'] or 'Not recorded'}"),
+                                                "weight": ui.label(f"Weight Used (kg): {exercise['weight_used'] or 'Not recorded'}"),
+                                            }
                                         
                                         with ui.column().classes('w-1/3'):
                                             if exercise['image_url']:
@@ -394,6 +403,8 @@ async def display_live_dashboard():
         """Update a member's exercise progress in a live session"""
         try:
             progress_data = {
+                "member_id": user.get('member_id_pk') if user else None,
+                "exercise_id": exercise_id,
                 "sets_completed": sets_completed,
                 "actual_reps": actual_reps,
                 "weight_used": weight_used,
@@ -402,7 +413,7 @@ async def display_live_dashboard():
             
             response = await ui.run_javascript(f'''
                 async function updateProgress() {{
-                    const response = await fetch("http://{API_HOST}:{API_PORT}/training-plans/live/sessions/{live_session_id}/progress?exercise_id={exercise_id}", {{
+                    const response = await fetch("http://{API_HOST}:{API_PORT}/training-execution/live-sessions/{live_session_id}/progress", {{
                         method: "POST",
                         headers: {{
                             "Authorization": "Bearer " + localStorage.getItem('token'),
@@ -424,8 +435,7 @@ async def display_live_dashboard():
             ''')
             
             if response and not response.get("error"):
-                ui.notify("Progress updated successfully!", color="positive")
-                load_dashboard_content.refresh()
+                ui.notify("Progress updated successfully!", color="positive")  # The progress event updates the page
             else:
                 ui.notify(f"Failed to update progress: {response.get('error', 'Unknown error')}", color="negative")
         
@@ -435,13 +445,20 @@ async def display_live_dashboard():
     async def complete_exercise(live_session_id, exercise_id):
         """Mark an exercise as completed for a member in a live session"""
         try:
+            progress_data = {
+                "member_id": user.get('member_id_pk') if user else None,
+                "exercise_id": exercise_id,
+                "completed": True
+            }
             response = await ui.run_javascript(f'''
                 async function completeExercise() {{
-                    const response = await fetch("http://{API_HOST}:{API_PORT}/training-plans/live/sessions/{live_session_id}/complete/{exercise_id}", {{
+                    const response = await fetch("http://{API_HOST}:{API_PORT}/training-execution/live-sessions/{live_session_id}/progress", {{
                         method: "POST",
                         headers: {{
-                            "Authorization": "Bearer " + localStorage.getItem('token')
-                        }}
+                            "Authorization": "Bearer " + localStorage.getItem('token'),
+                            "Content-Type": "application/json"
+                        }},
+                        body: JSON.stringify({json.dumps(progress_data)})
                     }});
                     if (response.ok) {{
                         return await response.json();
@@ -457,8 +474,7 @@ async def display_live_dashboard():
             ''')
             
             if response and not response.get("error"):
-                ui.notify("Exercise marked as completed!", color="positive")
-                load_dashboard_content.refresh()
+                ui.notify("Exercise marked as completed!", color="positive")  # The progress event updates the page
             else:
                 ui.notify(f"Failed to complete exercise: {response.get('error', 'Unknown error')}", color="negative")
         
@@ -502,20 +518,109 @@ async def display_live_dashboard():
         except Exception as e:
             ui.notify(f"An error occurred: {str(e)}", color="negative")
     
+    
+    def apply_live_event(event_type, event):
+        """Patch the rendered dashboard for one pushed event; reload it only when its shape changes"""
+        live_session_id = event.get('live_session_id')
+        data = event.get('data') or {}
+        if event_type == 'resync':
+            load_dashboard_content.refresh()
+        elif event_type == 'session_status':
+            ended = data.get('status') in ('Completed', 'Cancelled')
+            table = live_view["sessions_table"]
+            if table is not None:
+                rows = [row for row in table.rows if row['live_session_id'] != live_session_id]
+                if not ended:
+                    current = next((row for row in table.rows if row['live_session_id'] == live_session_id), None)
+                    rows.append({**(current or {}), **data})
+                    rows.sort(key=lambda row: row.get('start_time') or '')
+                table.rows[:] = rows
+                table.update()
+            label = live_view["status_labels"].get(live_session_id)
+            if label is not None:
+                label.set_text(f"📊 Status: {data.get('status')}")
+            if (ended and label is not None) or (table is None and label is None and not ended and live_view["user_type"] in ('manager', 'trainer')):
+                load_dashboard_content.refresh()  # A session card appears or goes away
+        elif event_type in ('check_in', 'attendance'):
+            if live_view["user_type"] == 'member' and data.get('member_id') == (user or {}).get('member_id_pk') \
+                    and live_view["member_session_id"] != live_session_id:
+                load_dashboard_content.refresh()  # This member just joined a session
+                return
+            table = live_view["member_tables"].get(live_session_id)
+            if table is not None:
+                row = next((row for row in table.rows if row.get('member_id') == data.get('member_id')), None)
+                if row is None:
+                    load_dashboard_content.refresh()
+                    return
+                row['attendance_status'] = data.get('status')
+                table.update()
+        elif event_type == 'progress':
+            if live_session_id != live_view["member_session_id"] or data.get('member_id') != (user or {}).get('member_id_pk'):
+                return
+            labels = live_view["exercise_labels"].get(data.get('exercise_id'))
+            if labels is None:
+                return
+            if data.get('sets_completed') is not None:
+                labels["sets"].set_text(f"Sets Completed: {data['sets_completed']}")
+            if data.get('actual_reps'):
+                labels["reps"].set_text(f"Reps Performed: {data['actual_reps']}")
+            if data.get('weight_used'):
+                labels["weight"].set_text(f"Weight Used (kg): {data['weight_used']}")
+            if data.get('completed'):
+                labels["title"].props(f'label="{labels["name"]} ✓"')
+
+    async def follow_live_events():
+        """Follow the backend's live event stream for as long as this page is open, reconnecting with Last-Event-ID"""
+        last_event_id = None
+        url = f"http://{API_HOST}:{API_PORT}/training-execution/live-sessions/events"
+        while True:
+            headers = {"Accept": "text/event-stream"}
+            if last_event_id is not None:
+                headers["Last-Event-ID"] = last_event_id
+            try:
+                async with httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=None)) as client:
+                    async with client.stream("GET", url, headers=headers) as response:
+                        response.raise_for_status()
+                        live_status_label.set_text('Connected')
+                        event_type, event_id, data_lines = 'message', None, []
+                        async for line in response.aiter_lines():
+                            if line.startswith(':'):
+                                continue  # Heartbeat
+                            if line:
+                                field, _, value = line.partition(':')
+                                value = value[1:] if value.startswith(' ') else value
+                                if field == 'event':
+                                    event_type = value
+                                elif field == 'id':
+                                    event_id = value
+                                elif field == 'data':
+                                    data_lines.append(value)
+                                continue
+                            if data_lines:
+                                if event_id is not None:
+                                    last_event_id = event_id
+                                try:
+                                    apply_live_event(event_type, json.loads('\n'.join(data_lines)))
+                                except Exception as e:
+                                    print(f"Error applying live event {event_type}: {e}")
+                            event_type, event_id, data_lines = 'message', None, []
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Live event stream interrupted: {e}")
+            live_status_label.set_text('Reconnecting...')
+            await asyncio.sleep(3)
+
     # Add refresh button
     with ui.row().classes('q-mt-md'):
         ui.button('Refresh Now', on_click=load_dashboard_content).props('color=primary')
     
     # Initial load
     await load_dashboard_content()
-    
-    # Remove or keep timer-based auto-refresh
-    # async def auto_refresh_timer():
-    #    ...
-    #    await load_dashboard_content.refresh() # Use await
-    #    ...
 
-    # ui.timer(0.1, lambda: asyncio.create_task(auto_refresh_timer()))
+    # Pushed updates replace the auto-refresh timer; the stream ends with the page
+    live_events_task = asyncio.create_task(follow_live_events())
+    ui.context.client.on_disconnect(live_events_task.cancel)
 
 # Update ui.py registration:
 # ui.page('/live-dashboard')(display_live_dashboard)
\ No newline at end of file
@@ -12,7 +12,7 @@ async def is_preference_day():
     # Simple check for Thursday (weekday 3)
     return datetime.date.today().weekday() == 3
 
-# Placeholder for checking active session - Requires Backend Implementation
+# Served from the backend's active session index (GET /training/live/sessions/current)
 async def user_has_active_session(user):
     if not user:
         return False
@@ -24,7 +24,7 @@ async def user_has_active_session(user):
         async with httpx.AsyncClient() as client:
             # This endpoint should check if the user (member/trainer) has a session NOW.
             response = await client.get(f"http://{API_HOST}:{API_PORT}/training/live/sessions/current", headers=headers)
-            if response.status_code == 200 and response.json():
+            if response.status_code == 200 and response.json().get('active_session'):
                 return True
             return False
     except Exception as e:
@@ -256,19 +256,19 @@ async def display_training_preferences():
                                                                 trainer_select.disable()
                                                             
                                                             # Handle trainer selection change
-                                                            def on_trainer_change(e):
+                                                            async def on_trainer_change(e):
                                                                 selected_label = e.value
                                                                 selected_trainer = next(
                                                                     (t for t in trainer_options if t["label"] == selected_label),
                                                                     trainer_options[0]
                                                                 )
                                                                 trainer_id_state['value'] = selected_trainer["value"]
-                                                                update_preference(day, start_time, end_time, pref_select.value, trainer_id_state['value'], existing)
+                                                                await update_preference(day, start_time, end_time, pref_select.value, trainer_id_state['value'], existing)
                                                             
                                                             trainer_select.on('update:model-value', on_trainer_change)
                                                     
                                                 # Handle preference change
-                                                def on_pref_change(e):
+                                                async def on_pref_change(e):
                                                     preference = e.value
                                                     
                                                     # Clear and update trainer selection when preference changes
@@ -285,18 +285,18 @@ async def display_training_preferences():
                                                                 trainer_select.disable()
                                                             
                                                             # Handle trainer selection change
-                                                            def on_new_trainer_change(e):
+                                                            async def on_new_trainer_change(e):
                                                                 selected_label = e.value
                                                                 selected_trainer = next(
                                                                     (t for t in trainer_options if t["label"] == selected_label),
                                                                     trainer_options[0]
                                                                 )
                                                                 trainer_id_state['value'] = selected_trainer["value"]
-                                                                update_preference(day, start_time, end_time, preference, trainer_id_state['value'], existing)
+                                                                await update_preference(day, start_time, end_time, preference, trainer_id_state['value'], existing)
                                                             
                                                             trainer_select.on('update:model-value', on_new_trainer_change)
                                                     
-                                                    update_preference(day, start_time, end_time, preference, trainer_id_state['value'], existing)
+                                                    await update_preference(day, start_time, end_time, preference, trainer_id_state['value'], existing)
                                                 
                                                 pref_select.on('update:model-value', on_pref_change)
                 else:
@@ -331,123 +331,73 @@ async def display_training_preferences():
                 with preference_container:
                     ui.label(f"An error occurred: {str(e)}").classes('text-negative')
         
+        # Member/week with edits in the server-side write buffer; flushed when this page's client disconnects
+        buffered_week = {}
+
         async def update_preference(day, start_time, end_time, preference, trainer_id, existing):
-            """Update preference via API call"""
+            """Send one slot edit to the preference write buffer (it reaches the database in a batch)"""
             if not await ui.run_javascript(token_script):
                 ui.notify('Please log in to update preferences', color='negative')
                 return
                 
             try:
-                # If changing from Not Selected to a preference
-                if preference != "Not Selected" and (not existing or existing["preference_type"] == "Not Selected"):
-                    # Create new preference
-                    new_pref = {
-                        "member_id": await get_member_id(),
-                        "day_of_week": day,
-                        "start_time": f"{start_time}:00",
-                        "end_time": f"{end_time}:00",
-                        "preference_type": preference,
-                        "trainer_id": trainer_id,
-                        "week_start_date": await get_next_week_start_date()
-                    }
-                    
-                    response = await ui.run_javascript(f'''
-                        async function createPreference() {{
-                            const response = await fetch("http://{API_HOST}:{API_PORT}/training-plans/preferences", {{
-                                method: "POST",
-                                headers: {{
-                                    "Authorization": "Bearer " + localStorage.getItem('token'),
-                                    "Content-Type": "application/json"
-                            }},
-                            body: JSON.stringify({json.dumps(new_pref)})
-                        }});
-                        if (response.ok) {{
-                            return await response.json();
-                        }} else {{
-                            throw new Error("Failed to create preference");
-                        }}
-                    }}
-                    try {{
-                        return await createPreference();
-                    }} catch (e) {{
-                        return {{ error: e.toString() }};
-                    }}
-                    ''')
-                    
-                    if response and not response.get("error"):
-                        ui.notify(f"Preference for {day} {start_time}-{end_time} created", color='positive')
-                    else:
-                        ui.notify(f"Failed to create preference: {response.get('error', 'Unknown error')}", color='negative')
+                edit = {
+                    "member_id": await get_member_id(),
+                    "day_of_week": day,
+                    "start_time": f"{start_time}:00",
+                    "end_time": f"{end_time}:00",
+                    "preference_type": preference, # "Not Selected" clears the slot
+                    "trainer_id": trainer_id if preference != "Not Selected" else None,
+                    "week_start_date": await get_next_week_start_date()
+                }
                 
-                # If changing from a preference to Not Selected
-                elif preference == "Not Selected" and existing and existing["preference_type"] != "Not Selected":
-                    preference_id = existing["preference_id"]
-                    
-                    response = await ui.run_javascript(f'''
-                        async function deletePreference() {{
-                            const response = await fetch("http://{API_HOST}:{API_PORT}/training-plans/preferences/{preference_id}", {{
-                                method: "DELETE",
-                                headers: {{
-                                    "Authorization": "Bearer " + localStorage.getItem('token')
-                            }}
-                        }});
-                        if (response.ok) {{
-                            return await response.json();
-                        }} else {{
-                            throw new Error("Failed to delete preference");
-                        }}
-                    }}
-                    try {{
-                        return await deletePreference();
-                    }} catch (e) {{
-                        return {{ error: e.toString() }};
+                response = await ui.run_javascript(f'''
+                    async function bufferPreference() {{
+                        const response = await fetch("http://{API_HOST}:{API_PORT}/scheduling/preferences/buffered", {{
+                            method: "PUT",
+                            headers: {{
+                                "Authorization": "Bearer " + localStorage.getItem('token'),
+                                "Content-Type": "application/json"
+                        }},
+                        body: JSON.stringify({json.dumps(edit)})
+                    }});
+                    if (response.ok) {{
+                        return await response.json();
+                    }} else {{
+                        throw new Error("Failed to save preference");
                     }}
-                    ''')
-                    
-                    if response and not response.get("error"):
-                        ui.notify(f"Preference for {day} {start_time}-{end_time} deleted", color='positive')
-                    else:
-                        ui.notify(f"Failed to delete preference: {response.get('error', 'Unknown error')}", color='negative')
+                }}
+                try {{
+                    return await bufferPreference();
+                }} catch (e) {{
+                    return {{ error: e.toString() }};
+                }}
+                ''')
                 
-                # If updating an existing preference
-                elif existing and (existing["preference_type"] != preference or existing["trainer_id"] != trainer_id):
-                    preference_id = existing["preference_id"]
-                    update_data = {
-                        "preference_type": preference,
-                        "trainer_id": trainer_id
-                    }
-                    
-                    response = await ui.run_javascript(f'''
-                        async function updatePreference() {{
-                            const response = await fetch("http://{API_HOST}:{API_PORT}/training-plans/preferences/{preference_id}", {{
-                                method: "PUT",
-                                headers: {{
-                                    "Authorization": "Bearer " + localStorage.getItem('token'),
-                                    "Content-Type": "application/json"
-                            }},
-                            body: JSON.stringify({json.dumps(update_data)})
-                        }});
-                        if (response.ok) {{
-                            return await response.json();
-                        }} else {{
-                            throw new Error("Failed to update preference");
-                        }}
-                    }}
-                    try {{
-                        return await updatePreference();
-                    }} catch (e) {{
-                        return {{ error: e.toString() }};
-                    }}
-                    ''')
-                    
-                    if response and not response.get("error"):
-                        ui.notify(f"Preference for {day} {start_time}-{end_time} updated", color='positive')
-                    else:
-                        ui.notify(f"Failed to update preference: {response.get('error', 'Unknown error')}", color='negative')
+                if response and not response.get("error"):
+                    buffered_week.update(member_id=edit["member_id"], week_start_date=edit["week_start_date"])
+                    ui.notify(f"Preference for {day} {start_time}-{end_time} saved", color='positive')
+                else:
+                    ui.notify(f"Failed to save preference: {response.get('error', 'Unknown error')}", color='negative')
             
             except Exception as e:
                 ui.notify(f"An error occurred: {str(e)}", color='negative')
         
+        async def flush_buffered_preferences():
+            """Write this member's buffered edits right away when they leave the page"""
+            if not buffered_week:
+                return
+            try:
+                async with httpx.AsyncClient() as client:
+                    await client.post(
+                        f"http://{API_HOST}:{API_PORT}/scheduling/members/{buffered_week['member_id']}/preferences-for-week/flush",
+                        params={"week_start_date": buffered_week["week_start_date"]},
+                    )
+            except Exception as e:
+                print(f"Could not flush buffered preferences: {e}") # The server flushes on its own interval anyway
+        
+        ui.context.client.on_disconnect(flush_buffered_preferences)
+        
         async def get_member_id():
             """Get the current member ID"""
             user_info = await ui.run_javascript('''
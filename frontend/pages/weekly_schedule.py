@@ -7,6 +7,8 @@ import asyncio
 from ..config import API_HOST, API_PORT
 from frontend.components.navbar import create_navbar_with_conditional_buttons, apply_page_style, get_current_user
 
+SCHEDULE_JOB_MAX_POLLS = 300 # Once a second: stop waiting on a generation job after ~5 minutes
+
 # --- Helper Functions (from your existing code, slightly adapted) ---
 async def get_token_from_storage():
     return await ui.run_javascript("localStorage.getItem('token')", timeout=1.0)
@@ -23,6 +25,25 @@ async def user_has_active_live_session_js(): # Renamed for clarity
     """Checks if active_live_session_id is in localStorage."""
     session_id = await ui.run_javascript("localStorage.getItem('active_live_session_id')", timeout=5.0)
     return bool(session_id)
+
+# (url, params) -> (etag, sessions) of the last schedule responses, revalidated with If-None-Match
+_schedule_responses = {}
+
+async def fetch_schedule(client, api_url, headers, params):
+    """GET a schedule list, reusing the previous body when the backend answers 304 Not Modified.
+    Returns (response, sessions); sessions is None unless the request succeeded."""
+    cache_key = (api_url, tuple(sorted(params.items())))
+    previous = _schedule_responses.get(cache_key)
+    request_headers = {**headers, "If-None-Match": previous[0]} if previous else headers
+    response = await client.get(api_url, headers=request_headers, params=params)
+    if response.status_code == 304 and previous:
+        return response, previous[1]
+    if response.status_code != 200:
+        return response, None
+    sessions = response.json()
+    if response.headers.get("etag"):
+        _schedule_responses[cache_key] = (response.headers["etag"], sessions)
+    return response, sessions
 # --- End Helper Functions ---
 
 @ui.page('/weekly_schedule')
@@ -112,11 +133,28 @@ async def weekly_schedule_page():
                         headers = {"Authorization": f"Bearer {token}"}
                         async with httpx.AsyncClient() as client:
                             response = await client.post(api_url, headers=headers)
-                        if response.status_code == 200 or response.status_code == 201:
-                            ui.notify("Schedule generated successfully! Refreshing...", type='positive')
+                            if response.status_code != 202:
+                                ui.notify(f"Failed to generate schedule: {response.status_code} {response.text}", type='negative')
+                                return
+                            # Generation runs as a background job; poll it instead of holding the request open
+                            job_url = f"http://{API_HOST}:{API_PORT}{response.json()['status_url']}"
+                            job = response.json()
+                            for _ in range(SCHEDULE_JOB_MAX_POLLS):
+                                if job.get("status") not in ("Queued", "Running"):
+                                    break
+                                await asyncio.sleep(1.0)
+                                job_response = await client.get(job_url, headers=headers)
+                                if job_response.status_code != 200:
+                                    ui.notify(f"Could not check generation status: {job_response.status_code}", type='negative')
+                                    return
+                                job = job_response.json()
+                        if job["status"] in ("Queued", "Running"):
+                            ui.notify(f"Schedule generation is still {job['status'].lower()}; check back later or refresh the page.", type='warning')
+                        elif job["status"] == "Succeeded":
+                            ui.notify((job.get("result") or {}).get("message", "Schedule generated successfully!") + " Refreshing...", type='positive')
                             ui.timer(0.1, lambda: refresh_schedule_async(current_week_start['value'], current_user, schedule_container), once=True)
                         else:
-                            ui.notify(f"Failed to generate schedule: {response.status_code} {response.text}", type='negative')
+                            ui.notify(f"Failed to generate schedule: {job.get('error')}", type='negative')
                     except Exception as e:
                         ui.notify(f"Error generating schedule: {str(e)}", type='negative')
 
@@ -165,10 +203,9 @@ async def create_schedule_content(week_start_iso: str, current_user):
     
     try:
         async with httpx.AsyncClient() as client:
-            response = await client.get(api_url, headers=headers, params=params)
+            response, sessions_data = await fetch_schedule(client, api_url, headers, params)
 
-        if response.status_code == 200:
-            sessions_data = response.json()
+        if sessions_data is not None:
             if not sessions_data:
                 ui.label("No sessions found for this week.").classes('text-center p-4')
                 return